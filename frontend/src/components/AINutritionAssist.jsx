@@ -42,6 +42,30 @@ export default function AINutritionAssist({ onBack, userProfile }) {
     throw lastErr || new Error('All API bases failed')
   }
 
+  // Minimal Server-Sent Events reader for fetch() responses (EventSource cannot POST)
+  async function readEventStream(res, onEvent){
+    const reader = res.body.getReader()
+    const decoder = new TextDecoder()
+    let buffer = ''
+    for(;;){
+      const { value, done } = await reader.read()
+      if (done) break
+      buffer += decoder.decode(value, { stream: true })
+      let sep
+      while ((sep = buffer.indexOf('\n\n')) !== -1) {
+        const block = buffer.slice(0, sep)
+        buffer = buffer.slice(sep + 2)
+        let event = 'message'
+        let data = ''
+        for (const line of block.split('\n')) {
+          if (line.startsWith('event: ')) event = line.slice(7)
+          else if (line.startsWith('data: ')) data += line.slice(6)
+        }
+        try { onEvent(event, data ? JSON.parse(data) : {}) } catch (e) { console.error(e) }
+      }
+    }
+  }
+
   const handleSend = async () => {
     if (!input.trim() || loading) return
     const userMsg = { role: 'user', content: input.trim() }
@@ -53,11 +77,26 @@ export default function AINutritionAssist({ onBack, userProfile }) {
       const res = await fetchFirstOk('/api/assistant/chat/', {
         method: 'POST',
         headers: { 'Content-Type': 'application/json' },
-        body: JSON.stringify({ messages: [...messages, userMsg], profile: userProfile })
+        body: JSON.stringify({ messages: [...messages, userMsg], profile: userProfile, stream: true })
       })
-      const data = await res.json()
-      const replyText = data.reply || '回答を取得できませんでした。'
-      setMessages(prev => [...prev, { role: 'assistant', content: replyText }])
+      if ((res.headers.get('content-type') || '').includes('text/event-stream') && res.body) {
+        // Streamed reply: show text as it arrives, then replace with the final reply
+        setMessages(prev => [...prev, { role: 'assistant', content: '' }])
+        const setReply = (update) => setMessages(prev => {
+          const next = prev.slice()
+          const last = next[next.length - 1]
+          next[next.length - 1] = { ...last, content: update(last.content) }
+          return next
+        })
+        await readEventStream(res, (event, data) => {
+          if (event === 'delta') setReply(text => text + (data.text || ''))
+          else if (event === 'done') setReply(() => data.reply || '回答を取得できませんでした。')
+        })
+      } else {
+        const data = await res.json()
+        const replyText = data.reply || '回答を取得できませんでした。'
+        setMessages(prev => [...prev, { role: 'assistant', content: replyText }])
+      }
     } catch (e){
       console.error(e)
       setError(e.message || String(e))
@@ -0,0 +1,32 @@
+"""Gunicorn settings for the Django backend.
+
+Run with ``gunicorn -c gunicorn.conf.py``. By default the app is imported in
+the master and the food dataset / alias indexes are built there once, before
+workers are forked, so every worker shares those pages copy-on-write instead
+of building its own copy. ``gc.freeze()`` moves the preloaded objects out of
+the collector's reach so garbage collection in the workers does not touch
+(and thereby copy) them.
+"""
+import gc
+import os
+
+# GUNICORN_ASGI=1 serves torimo.asgi with uvicorn workers, which routes the
+# Supabase/Gemini-bound endpoints to the async views (settings.ASYNC_API_VIEWS).
+asgi = os.environ.get('GUNICORN_ASGI', '0').strip().lower() in {'1', 'true', 'yes', 'on'}
+wsgi_app = 'torimo.asgi:application' if asgi else 'torimo.wsgi:application'
+if asgi:
+    worker_class = 'uvicorn.workers.UvicornWorker'
+bind = os.environ.get('GUNICORN_BIND', '0.0.0.0:8000')
+workers = int(os.environ.get('WEB_CONCURRENCY', 2))
+preload_app = os.environ.get('GUNICORN_PRELOAD', '1').strip().lower() in {'1', 'true', 'yes', 'on'}
+
+
+def when_ready(server):
+    if not preload_app:
+        return
+    from torimoApp.api_views import get_food_data
+
+    data = get_food_data()
+    gc.collect()
+    gc.freeze()
+    server.log.info('Preloaded food dataset %s (%d foods) in master', data.version, len(data.table))
@@ -0,0 +1,67 @@
+import os, sys, time, signal, socket, asyncio, threading, subprocess, pathlib, urllib.request  # 標準ライブラリを読み込み
+from concurrent.futures import ThreadPoolExecutor  # 並列リクエスト用
+import jwt  # テスト用トークン生成
+import uvicorn  # 疑似Supabaseサーバー
+
+ROOT = pathlib.Path(__file__).resolve().parents[1]  # プロジェクトルート
+CONCURRENCY = int(sys.argv[1]) if len(sys.argv) > 1 else 100  # 同時リクエスト数
+UPSTREAM_DELAY = float(sys.argv[2]) if len(sys.argv) > 2 else 0.5  # 疑似Supabaseの応答遅延(秒)
+SECRET = 'bench-secret'  # HS256署名鍵
+
+
+def free_port():  # 空きポートを取得
+    with socket.socket() as s:  # 一時ソケット
+        s.bind(('127.0.0.1', 0))  # OSに割り当てさせる
+        return s.getsockname()[1]  # ポート番号
+
+
+async def fake_supabase(scope, receive, send):  # 遅延してから空配列を返すASGIアプリ
+    if scope['type'] != 'http':  # lifespan等は無視
+        return  # 何もしない
+    await asyncio.sleep(UPSTREAM_DELAY)  # 上流の待ち時間を再現
+    await send({'type': 'http.response.start', 'status': 200, 'headers': [(b'content-type', b'application/json')]})  # ヘッダ
+    await send({'type': 'http.response.body', 'body': b'[]'})  # 本文
+
+
+def start_upstream(port):  # 疑似Supabaseを別スレッドで起動
+    server = uvicorn.Server(uvicorn.Config(fake_supabase, host='127.0.0.1', port=port, log_level='warning', backlog=4096))  # サーバー
+    threading.Thread(target=server.run, daemon=True).start()  # 起動
+    return server  # 返す
+
+
+def run(asgi, upstream_port, token):  # 1構成分を計測
+    port = free_port()  # ポート確保
+    env = dict(os.environ, GUNICORN_ASGI='1' if asgi else '0', WEB_CONCURRENCY='1', GUNICORN_BIND=f'127.0.0.1:{port}',
+               SUPABASE_URL=f'http://127.0.0.1:{upstream_port}', SUPABASE_ANON_KEY='anon', SUPABASE_SERVICE_ROLE_KEY='',
+               SUPABASE_JWT_SECRET=SECRET, DEBUG='0')  # 環境変数(トークンはローカル検証)
+    proc = subprocess.Popen([sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py', '--backlog', '4096'], cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)  # gunicorn起動
+    url = f'http://127.0.0.1:{port}/api/notes/'  # Supabaseを呼ぶAPI
+    req = lambda: urllib.request.urlopen(urllib.request.Request(url, headers={'Authorization': f'Bearer {token}'}), timeout=120).read()  # 1リクエスト
+    try:  # 終了処理を保証
+        for _ in range(150):  # 起動待ち
+            try:  # 接続試行
+                req()  # 1回呼ぶ
+                break  # 起動完了
+            except Exception:  # まだ起動中
+                time.sleep(0.2)  # 待機
+        with ThreadPoolExecutor(CONCURRENCY) as pool:  # 同時に送る
+            t0 = time.perf_counter()  # 開始
+            list(pool.map(lambda _: req(), range(CONCURRENCY)))  # 全リクエスト
+            return time.perf_counter() - t0  # 所要時間
+    finally:  # 後片付け
+        proc.send_signal(signal.SIGTERM)  # 停止
+        proc.wait(timeout=30)  # 終了待ち
+
+
+def main():  # メイン処理
+    upstream_port = free_port()  # 疑似Supabaseのポート
+    start_upstream(upstream_port)  # 起動
+    token = jwt.encode({'sub': 'bench-user', 'aud': 'authenticated', 'exp': int(time.time()) + 3600}, SECRET, algorithm='HS256')  # トークン
+    for asgi in (False, True):  # WSGI(同期)/ASGI(非同期)
+        elapsed = run(asgi, upstream_port, token)  # 計測
+        label = 'asgi async views' if asgi else 'wsgi sync views'  # 表示名
+        print(f'[{label:<16}] 1 worker, {CONCURRENCY} concurrent /api/notes/ with {UPSTREAM_DELAY * 1000:.0f} ms upstream: {elapsed:6.2f} s ({CONCURRENCY / elapsed:6.1f} req/s)')  # 結果
+
+
+if __name__ == '__main__':  # 直接実行時
+    main()  # メイン実行
@@ -0,0 +1,74 @@
+import os, sys, time, random, difflib, pathlib  # 標準ライブラリを読み込み
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parents[1]))  # ルートパスを検索パスへ追加
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'torimo.settings')  # Django設定を指定
+import django  # Django本体を読み込み
+django.setup()  # Djangoを初期化
+from torimoApp.api_views import get_food_data, load_csv_dataset, normalize_food_name, canonicalize_name  # データと正規化
+from torimoApp.food_index import Autocomplete, SubstringIndex  # 補完用索引
+
+QUERIES = 300  # 検索数
+LIMIT = 8  # 候補数
+
+
+def legacy_search(rows, q):  # 旧 search_foods: 全件正規化+全件ソート
+    qn = normalize_food_name(q)  # 検索語を正規化
+    res = []  # 結果
+    for idx, e in enumerate(rows):  # 全件走査
+        nn = normalize_food_name(e['name'])  # 毎回正規化
+        if qn in nn:  # 部分一致
+            p = nn.index(qn)  # 一致位置
+            res.append((0 if nn == qn else (1 if p == 0 else 2), p, len(nn), idx))  # 並び順キー
+    res.sort()  # 全件ソート
+    return [rows[r[3]]['name'] for r in res[:LIMIT * 2]]  # 上位のみ
+
+
+def legacy_suggest(rows, alias_map, match_index, q):  # 旧 suggest_nutrition: 別名全走査+difflib全件
+    key = normalize_food_name(canonicalize_name(q))  # 検索語を正規化
+    names = [a for a in alias_map if key in normalize_food_name(a)][:LIMIT]  # 別名を全走査
+    if len(names) < LIMIT:  # 足りなければCSV名
+        names += [r['name'] for r in rows if key in normalize_food_name(r['name'])][:LIMIT - len(names)]  # CSV全走査
+    if len(names) < LIMIT:  # さらに足りなければ曖昧一致
+        names += difflib.get_close_matches(key, match_index, n=LIMIT, cutoff=0.6)  # difflib全件
+    return names[:LIMIT]  # 上位のみ
+
+
+def new_search(fd, q):  # 新方式: 接尾辞配列から上位K件
+    return [fd.table.names[i] for i in fd.autocomplete.rows.ranked(normalize_food_name(q), LIMIT * 2)]  # 上位のみ
+
+
+def new_suggest(fd, q):  # 新方式: 索引を使った候補生成
+    key = normalize_food_name(canonicalize_name(q))  # 検索語を正規化
+    ac = fd.autocomplete  # 索引
+    names = [ac.alias_names[i] for i in ac.aliases.containing(key)[:LIMIT]]  # 別名
+    if len(names) < LIMIT:  # 足りなければCSV名
+        names += [fd.table.names[i] for i in ac.rows.containing(key)][:LIMIT - len(names)]  # CSV名
+    if len(names) < LIMIT:  # さらに足りなければ曖昧一致
+        names += ac.close.close_matches(key, n=LIMIT, cutoff=0.6)  # 候補絞り込み付き
+    return names[:LIMIT]  # 上位のみ
+
+
+def bench(label, fn, queries):  # 1件あたり時間を計測
+    t0 = time.perf_counter()  # 計測開始
+    out = [fn(q) for q in queries]  # 実行
+    print(f'{label:<16} {(time.perf_counter() - t0) / len(queries) * 1000:8.3f} ms/q')  # 結果
+    return out  # 結果を返す(一致確認用)
+
+
+def main():  # メイン処理
+    random.seed(0)  # 乱数固定
+    fd = get_food_data()  # 実データ
+    rows = load_csv_dataset()  # 旧形式の行(dict)
+    names = fd.table.names  # 食品名
+    queries = [n[:random.randint(1, 3)] for n in random.sample(names, min(QUERIES, len(names)))]  # 入力途中の語(1〜3文字)
+    t0 = time.perf_counter()  # 構築計測
+    Autocomplete(SubstringIndex(fd.match_index), list(fd.alias_map), [normalize_food_name(a) for a in fd.alias_map])  # 索引構築
+    print(f'rows={len(fd.table)} aliases={len(fd.alias_map)} build={(time.perf_counter() - t0) * 1000:.1f} ms')  # 構築時間
+    a = bench('search legacy', lambda q: legacy_search(rows, q), queries)  # 旧search
+    b = bench('search index', lambda q: new_search(fd, q), queries)  # 新search
+    c = bench('suggest legacy', lambda q: legacy_suggest(rows, fd.alias_map, fd.match_index, q), queries)  # 旧suggest
+    d = bench('suggest index', lambda q: new_suggest(fd, q), queries)  # 新suggest
+    print(f'parity search={sum(x == y for x, y in zip(a, b))}/{len(queries)} suggest={sum(x == y for x, y in zip(c, d))}/{len(queries)}')  # 一致数
+
+
+if __name__ == '__main__':  # 直接実行時
+    main()  # メイン実行
@@ -0,0 +1,55 @@
+import os, sys, time, random, pathlib  # 標準ライブラリを読み込み
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parents[1]))  # ルートパスを検索パスへ追加
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'torimo.settings')  # Django設定を指定
+import django  # Django本体を読み込み
+django.setup()  # Djangoを初期化
+from torimoApp.api_views import load_csv_dataset, normalize_food_name, canonicalize_name  # 正規化関数
+from torimoApp.food_index import FoodIndex  # 索引クラス
+
+SIZES = [int(x) for x in (sys.argv[1:] or ['500', '2500', '10000', '25000'])]  # 計測するデータ件数
+QUERIES = 300  # 1回あたりの検索数
+
+
+def synth_names(base_names, n):  # 実データ名から合成データを生成
+    out = list(base_names)  # 実データを先頭に
+    i = 0  # 連番
+    while len(out) < n:  # 件数に達するまで
+        out.append(f'{base_names[i % len(base_names)]}{i // len(base_names)}号')  # 番号付き別名を追加
+        i += 1  # 次へ
+    return out[:n]  # 指定件数で切る
+
+
+def linear_lookup(norm_keys, key):  # 旧実装: 完全一致→部分一致の線形走査
+    for i, name in enumerate(norm_keys):  # 完全一致
+        if normalize_food_name(name) == key:  # 毎回正規化(旧実装と同じ)
+            return i  # 見つかった
+    for i, name in enumerate(norm_keys):  # 部分一致
+        nm = normalize_food_name(name)  # 毎回正規化
+        if nm in key or key in nm:  # 包含判定
+            return i  # 見つかった
+    return None  # 見つからない
+
+
+def main():  # メイン処理
+    base = [r['name'] for r in load_csv_dataset()] or ['ご飯', '鶏胸肉', '卵']  # 実データ名
+    random.seed(0)  # 乱数固定
+    print(f'{"rows":>7} {"build ms":>9} {"linear us/item":>15} {"index us/item":>14} {"speedup":>8}')  # 見出し
+    for n in SIZES:  # 件数ごとに計測
+        names = synth_names(base, n)  # 合成データ
+        norm = [normalize_food_name(x) for x in names]  # 正規化キー
+        t0 = time.perf_counter()  # 計測開始
+        index = FoodIndex(norm, [canonicalize_name(x) for x in names])  # 索引構築
+        build_ms = (time.perf_counter() - t0) * 1000  # 構築時間
+        queries = [random.choice(norm)[:random.randint(2, 6)] + random.choice(['', '焼き', '150']) for _ in range(QUERIES)]  # 検索語を生成
+        t0 = time.perf_counter()  # 線形走査の計測
+        lin = [linear_lookup(names, q) for q in queries]  # 旧方式
+        lin_us = (time.perf_counter() - t0) / QUERIES * 1e6  # 1件あたり
+        t0 = time.perf_counter()  # 索引の計測
+        idx = [index.exact(q) if index.exact(q) is not None else index.substring(q) for q in queries]  # 新方式
+        idx_us = (time.perf_counter() - t0) / QUERIES * 1e6  # 1件あたり
+        assert lin == idx, 'index result differs from linear scan'  # 結果一致を確認
+        print(f'{n:>7} {build_ms:>9.1f} {lin_us:>15.1f} {idx_us:>14.1f} {lin_us / max(idx_us, 1e-9):>7.0f}x')  # 結果を出力
+
+
+if __name__ == '__main__':  # 直接実行時
+    main()  # メイン実行
@@ -0,0 +1,59 @@
+import os, sys, time, random, pathlib  # 標準ライブラリを読み込み
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parents[1]))  # ルートパスを検索パスへ追加
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'torimo.settings')  # Django設定を指定
+import django  # Django本体を読み込み
+django.setup()  # Djangoを初期化
+from torimoApp.api_views import load_csv_dataset, _norm_alias_key  # データ読み込みと正規化
+from torimoApp.food_index import NgramIndex, similarity  # n-gram索引と類似度
+from build_food_aliases import variants_for_name  # 別名生成(エイリアス辞書と同じ展開)
+
+CUTOFF = 0.68  # alias_lookup と同じしきい値
+QUERIES = 200  # 検索数
+KANA = 'あいうえおかきくけこさしすせそアイウエオカキクケコ'  # タイポ用文字
+
+
+def typo(s):  # 1文字の削除/置換/挿入でタイポを作る
+    if len(s) < 2:  # 短すぎる場合
+        return s + random.choice(KANA)  # 1文字足す
+    i = random.randrange(len(s))  # 位置
+    op = random.choice('dsi')  # 操作
+    c = random.choice(KANA)  # 文字
+    return s[:i] + ('' if op == 'd' else c) + s[i + (0 if op == 'i' else 1):]  # 変形結果
+
+
+def brute_force(keys, q):  # 旧実装: 全キーを類似度計算
+    best, best_score = None, 0.0  # 最良候補
+    for i, k in enumerate(keys):  # 全走査
+        sc = similarity(q, k)  # 類似度
+        if sc > best_score:  # 更新判定
+            best, best_score = i, sc  # 更新
+    return best if best is not None and best_score >= CUTOFF else None  # しきい値判定
+
+
+def main():  # メイン処理
+    random.seed(0)  # 乱数固定
+    keys = {}  # 正規化済み別名キー(挿入順)
+    for r in load_csv_dataset():  # データ名ごとに
+        for v in variants_for_name(r['name']):  # 別名を展開
+            keys.setdefault(_norm_alias_key(v), None)  # 重複を除いて追加
+    keys = list(keys)  # リスト化
+    scale = int(sys.argv[1]) if len(sys.argv) > 1 else 8  # 合成で増やす倍率
+    grown = keys + [f'{k}{n}' for n in range(1, scale) for k in keys]  # 番号付きで件数を増やす
+    for size in (len(keys), len(grown)):  # 実データ相当と拡大版
+        pool = grown[:size]  # 対象キー
+        t0 = time.perf_counter()  # 構築計測
+        index = NgramIndex(pool)  # 索引構築
+        build_ms = (time.perf_counter() - t0) * 1000  # 構築時間
+        queries = [typo(random.choice(pool)) for _ in range(QUERIES)]  # タイポ検索語
+        t0 = time.perf_counter()  # 全走査計測
+        expect = [brute_force(pool, q) for q in queries]  # 旧方式
+        brute_ms = (time.perf_counter() - t0) / QUERIES * 1000  # 1件あたり
+        t0 = time.perf_counter()  # 索引計測
+        got = [index.best_match(q, CUTOFF) for q in queries]  # 新方式
+        index_ms = (time.perf_counter() - t0) / QUERIES * 1000  # 1件あたり
+        same = sum(1 for a, b in zip(expect, got) if a == b)  # 一致数
+        print(f'keys={size:>6} build={build_ms:7.1f}ms brute={brute_ms:8.2f}ms/q index={index_ms:6.3f}ms/q parity={same}/{QUERIES}')  # 結果
+
+
+if __name__ == '__main__':  # 直接実行時
+    main()  # メイン実行
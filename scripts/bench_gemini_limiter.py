@@ -0,0 +1,70 @@
+import sys, time, threading, pathlib  # 標準ライブラリを読み込み
+from concurrent.futures import ThreadPoolExecutor  # ワーカースレッド(gunicornスレッドの代わり)
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parents[1]))  # ルートパスを検索パスへ追加
+from torimo.rate_limit import Overloaded, RateLimiter, TokenBucket  # 制限器
+
+REQUESTS = int(sys.argv[1]) if len(sys.argv) > 1 else 300  # バースト内のリクエスト数
+WORKERS = 64  # 同時に処理できるワーカースレッド数
+QUOTA = 20.0  # 上流(Gemini)が受け付ける呼び出し/秒
+LATENCY = 0.2  # 上流の応答時間(秒)
+BACKOFF = (0.5, 1.0, 2.0)  # 429時のリトライ待ち(SDKの再試行相当)
+
+
+class FakeUpstream:  # クォータを超えると429を返す上流
+    def __init__(self):  # 初期化
+        self.quota = TokenBucket(QUOTA, QUOTA)  # 上流側のクォータ
+        self.calls = 0  # 呼び出し数
+        self.rejected = 0  # 429数
+        self.lock = threading.Lock()  # カウンタ用ロック
+
+    def call(self):  # 1回の生成呼び出し
+        with self.lock:  # カウント
+            self.calls += 1  # 呼び出し+1
+        granted, _ = self.quota.reserve(0)  # 今すぐ枠があるか
+        time.sleep(LATENCY if granted else LATENCY / 4)  # 応答(429は速い)
+        if not granted:  # 枠なし
+            with self.lock:  # カウント
+                self.rejected += 1  # 429+1
+            return 429  # 429
+        return 200  # 成功
+
+
+def handle(upstream, limiter):  # 1リクエストの処理(戻り値: ステータス, 所要秒)
+    t0 = time.perf_counter()  # 開始
+    if limiter is not None:  # 制限あり
+        try:  # 枠の取得
+            limiter.acquire()  # 待ち行列で待つ
+        except Overloaded:  # 混雑
+            return 503, time.perf_counter() - t0  # 即座に503
+    for delay in BACKOFF + (None,):  # 初回 + リトライ
+        if upstream.call() == 200:  # 成功
+            return 200, time.perf_counter() - t0  # 200
+        if delay is None:  # リトライ切れ
+            break  # 失敗
+        time.sleep(delay)  # バックオフ
+    return 500, time.perf_counter() - t0  # 429のまま失敗
+
+
+def run(limiter):  # バーストを流して集計
+    upstream = FakeUpstream()  # 上流
+    t0 = time.perf_counter()  # 開始
+    with ThreadPoolExecutor(WORKERS) as pool:  # ワーカー
+        results = list(pool.map(lambda _: handle(upstream, limiter), range(REQUESTS)))  # 全リクエスト
+    wall = time.perf_counter() - t0  # 全体時間
+    codes = {c: sum(1 for code, _ in results if code == c) for c in (200, 500, 503)}  # ステータス別件数
+    busy = sum(s for _, s in results)  # ワーカーが占有された延べ秒数
+    ok = sorted(s for code, s in results if code == 200) or [0.0]  # 成功リクエストの所要時間
+    return {'codes': codes, 'upstream_calls': upstream.calls, 'upstream_429': upstream.rejected,
+            'worker_seconds': round(busy, 1), 'ok_p95_s': round(ok[int(len(ok) * 0.95) - 1 if len(ok) > 1 else 0], 2), 'wall_s': round(wall, 1)}
+
+
+def main():  # メイン処理
+    print(f'{REQUESTS} requests at once, {WORKERS} workers, upstream quota {QUOTA:g}/s')  # 条件
+    print('unbounded:', run(None))  # 制限なし
+    limiter = RateLimiter(TokenBucket(QUOTA, QUOTA), max_queue=32, max_wait=3.0)  # 上流クォータに合わせた制限
+    print('limited:  ', run(limiter))  # 制限あり
+    print('limiter:  ', limiter.stats())  # 待ち行列の指標
+
+
+if __name__ == '__main__':  # 直接実行時
+    main()  # メイン実行
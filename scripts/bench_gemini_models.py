@@ -0,0 +1,48 @@
+import os, sys, time, pathlib  # 標準ライブラリを読み込み
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parents[1]))  # ルートパスを検索パスへ追加
+os.environ.setdefault('GOOGLE_API_KEY', 'bench-key')  # ネットワークには出ない(クライアント生成まで)
+import google.generativeai as genai  # Gemini SDK
+from google.generativeai import client as genai_client  # SDK内部のクライアント管理
+from torimo import gemini_client  # モデルハンドルのレジストリ
+
+MODEL = 'gemini-1.5-flash'  # モデル名
+CONFIG = {'max_output_tokens': 720, 'temperature': 0.4}  # 生成設定
+N = int(sys.argv[1]) if len(sys.argv) > 1 else 200  # 呼び出し回数
+
+
+def legacy_call():  # 旧実装: 毎回 import確認 + configure + GenerativeModel生成
+    try:  # SDKの有無を毎回確認
+        import google.generativeai as _genai  # 再import
+        _ = _genai  # 未使用警告回避
+    except Exception:  # 未インストール
+        return None  # 何もしない
+    genai.configure(api_key=os.environ.get('GOOGLE_API_KEY'))  # 既定クライアントを作り直す
+    model = genai.GenerativeModel(MODEL)  # モデル生成
+    return genai_client.get_default_generative_client()  # 初回generate_content相当(gRPCクライアント生成)
+
+
+def registry_call():  # 新実装: レジストリから取得
+    if not gemini_client.configured():  # 設定確認(import済み)
+        return None  # 何もしない
+    model = gemini_client.get_model(MODEL, CONFIG)  # 使い回しのモデル
+    return genai_client.get_default_generative_client()  # 既存クライアント
+
+
+def bench(fn):  # 1回あたりの平均時間(ms)
+    fn()  # ウォームアップ
+    t0 = time.perf_counter()  # 開始
+    for _ in range(N):  # 繰り返し
+        fn()  # 実行
+    return (time.perf_counter() - t0) / N * 1000  # ms
+
+
+def main():  # メイン処理
+    legacy = bench(legacy_call)  # 旧実装
+    gemini_client.reset()  # レジストリ初期化
+    registry = bench(registry_call)  # 新実装
+    print(f'per-call setup before the request: legacy={legacy:.3f} ms  registry={registry:.4f} ms  (saved {legacy - registry:.3f} ms/call, {N} calls)')  # 結果
+    print(f'registry: {gemini_client.stats()}')  # 生成回数など
+
+
+if __name__ == '__main__':  # 直接実行時
+    main()  # メイン実行
@@ -0,0 +1,61 @@
+import os, sys, time, random, pathlib  # 標準ライブラリを読み込み
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parents[1]))  # ルートパスを検索パスへ追加
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'torimo.settings')  # Django設定を指定
+import django  # Django本体を読み込み
+django.setup()  # Djangoを初期化
+from torimoApp.api_views import get_food_data, compute_serving_grams, analyze_items, _item_quantity, UNIT_GRAMS  # 解析処理
+
+
+def legacy(foods, resolved):  # 旧実装: 1品ずつ4栄養素を丸めて合計に加算
+    analyzed = []  # 結果
+    totals = {'calories': 0.0, 'protein': 0.0, 'fat': 0.0, 'carbs': 0.0}  # 合計
+    for it in foods:  # 品目ごと
+        name, base = resolved[it['name']]  # 解決済み食品
+        qty_val = _item_quantity(it)  # 数量
+        unit_lower = (it.get('unit') or '').lower()  # 単位
+        grams = compute_serving_grams(name.lower(), qty_val, unit_lower, base)  # グラム換算
+        unit = base.per_unit  # 単位データ
+        if unit and unit_lower not in UNIT_GRAMS:  # 単位当たり
+            ug = unit.get('grams') or 100.0  # 1単位の重さ
+            vals = [round((float(unit['nutrients'][k]) if (unit.get('nutrients') or {}).get(k) is not None else (getattr(base, k) or 0.0) * (ug / 100.0)) * qty_val, 1) for k in ('calories', 'protein', 'fat', 'carbs')]  # 栄養素
+        else:  # グラム当たり
+            vals = [round((getattr(base, k) or 0.0) * (grams / 100.0), 1) for k in ('calories', 'protein', 'fat', 'carbs')]  # 栄養素
+        for k, v in zip(('calories', 'protein', 'fat', 'carbs'), vals):  # 合計へ加算
+            totals[k] += v  # 加算
+        analyzed.append(vals)  # 追加
+    return analyzed, {k: round(v, 1) for k, v in totals.items()}  # 返す
+
+
+def workload(n):  # データセットからランダムな食事を合成
+    random.seed(0)  # 乱数固定
+    table = get_food_data().table  # 列指向テーブル
+    foods, resolved = [], {}  # 品目と解決結果
+    for i in range(n):  # 品目ごと
+        idx = random.randrange(len(table))  # 食品ID
+        name = f'{table.names[idx]}#{i}'  # 一意な名前
+        unit = random.choice(['g', '個', '杯', ''])  # 単位
+        foods.append({'name': name, 'quantity': random.choice([1, 2, 0.5, 150]), 'unit': unit})  # 品目
+        resolved[name] = (name, table.record(idx, source='csv'))  # 解決済み扱い
+    return foods, resolved  # 返す
+
+
+def bench(fn, *args, repeat=5):  # 最速時間(ms)
+    best = float('inf')  # 最良値
+    for _ in range(repeat):  # 繰り返し
+        t0 = time.perf_counter()  # 開始
+        fn(*args)  # 実行
+        best = min(best, time.perf_counter() - t0)  # 更新
+    return best * 1000  # ms
+
+
+def main():  # メイン処理
+    for n in (10, 1000, int(sys.argv[1]) if len(sys.argv) > 1 else 50000):  # 品目数
+        foods, resolved = workload(n)  # 入力
+        old_items, old_totals = legacy(foods, resolved)  # 旧実装
+        new_items, new_totals = analyze_items(foods, resolved)  # 新実装
+        mismatches = sum(o != [a['calories'], a['protein'], a['fat'], a['carbs']] for o, a in zip(old_items, new_items)) + (old_totals != new_totals)  # 差分数
+        print(f'items={n:>6}  legacy={bench(legacy, foods, resolved):8.2f} ms  batch={bench(analyze_items, foods, resolved):8.2f} ms  mismatches={mismatches}')  # 結果
+
+
+if __name__ == '__main__':  # 直接実行時
+    main()  # メイン実行
@@ -0,0 +1,79 @@
+import os, sys, re, time, random, tempfile, tracemalloc, pathlib  # 標準ライブラリを読み込み
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parents[1]))  # ルートパスを検索パスへ追加
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'torimo.settings')  # Django設定を指定
+import django  # Django本体を読み込み
+django.setup()  # Djangoを初期化
+from torimoApp.api_views import _read_mext_csv, _sniff_csv_encoding  # 新しいストリーミング読込
+
+ROWS = int(sys.argv[1]) if len(sys.argv) > 1 else 2500  # 成分表の食品数(八訂は約2500)
+CODES = ['REFUSE', 'ENERC', 'ENERC_KCAL', 'WATER', 'PROTCAA', 'PROT-', 'FATNLEA', 'CHOLE', 'FAT-', 'CHOAVLM', 'CHOAVL', 'CHOAVLDF-', 'FIB-', 'POLYL', 'CHOCDF-', 'OA', 'ASH']  # 主要成分コード
+CODES += [f'X{i:02d}' for i in range(40)]  # ミネラル・ビタミン等の列(ダミー)
+CELLS = ['12.3', '0', 'Tr', '(0)', '(1.2)', '-', '45*', '(Tr)', '230', '7.5']  # 実データに現れる値の形
+
+
+def make_csv(path, encoding):  # 合成した成分表CSVを書き出す
+    random.seed(0)  # 乱数固定
+    lines = ['日本食品標準成分表2020年版（八訂）', '食品群,食品番号,索引番号,食品名,廃棄率,エネルギー', '成分識別子,' + ','.join(CODES)]  # 表題・見出し・コード行
+    for k in range(ROWS):  # 食品行
+        vals = [random.choice(CELLS) for _ in CODES]  # 成分値
+        lines.append(f'{k % 18 + 1:02d},{k + 1:05d},{k + 1},食品{k} 生,' + ','.join(vals))  # データ行
+    lines.append('注) 成分値は可食部100g当たり')  # 脚注
+    pathlib.Path(path).write_text('\n'.join(lines) + '\n', encoding=encoding)  # 保存
+
+
+def legacy_parse(path):  # 旧実装: 全文読込→行分割→split(',')→セルごとに正規表現
+    content = pathlib.Path(path).read_text(encoding='utf-8-sig')  # 全文読込
+    lines = [ln.strip('\n\r') for ln in content.splitlines() if ln.strip() != '']  # 行リスト
+    header_idx = next(i for i, ln in enumerate(lines) if '成分識別子' in ln and 'ENERC_KCAL' in ln)  # コード行
+    idx_map = {h: i for i, h in enumerate(h.strip().strip('"') for h in lines[header_idx].split(',')) if h}  # 列対応
+
+    def parse_num(cell):  # 数値変換(旧)
+        s = (cell or '').replace('Tr', '0').replace('−', '0').replace('-', '0').replace('*', '')  # 記号置換
+        m = re.search(r'-?\d+(?:\.\d+)?', re.sub(r'\(.*?\)', '', s)) or re.search(r'-?\d+(?:\.\d+)?', s)  # 数値抽出
+        return float(m.group()) if m else 0.0  # 変換
+
+    def get(cells, code):  # コードで値を取得(旧)
+        h = idx_map.get(code)  # 見出し位置
+        return parse_num(cells[h + 3]) if h is not None and h + 3 < len(cells) else 0.0  # 3列ずれ
+
+    out = []  # 結果
+    for ln in lines[header_idx + 1:]:  # データ行
+        if not re.match(r'^\d{2},\d+,\d+,', ln):  # 脚注など
+            continue  # 読み飛ばし
+        cells = [c.strip().strip('"') for c in ln.split(',')]  # 単純分割
+        if len(cells) < 10 or not cells[3].strip():  # 不正行
+            continue  # 読み飛ばし
+        carbs = next((v for v in (get(cells, c) for c in ('CHOCDF-', 'CHOAVL', 'CHOAVLM', 'CHOAVLDF-')) if v > 0), 0.0)  # 炭水化物
+        out.append((cells[3].strip(), {'per': '100g', 'calories': get(cells, 'ENERC_KCAL'), 'protein': get(cells, 'PROT-'), 'fat': get(cells, 'FAT-'), 'carbs': carbs, 'source': 'jp-standard'}))  # 追加
+    return out  # 返す
+
+
+def streaming_parse(path):  # 新実装
+    out = []  # 結果
+    _read_mext_csv(pathlib.Path(path), _sniff_csv_encoding(pathlib.Path(path)), lambda name, base, _: out.append((name, base)))  # ストリーミング
+    return out  # 返す
+
+
+def measure(label, fn, path):  # 時間とピークメモリ
+    t0 = time.perf_counter()  # 時間計測開始(tracemalloc無しで)
+    out = fn(path)  # 実行
+    ms = (time.perf_counter() - t0) * 1000  # 経過時間
+    tracemalloc.start()  # メモリ計測開始
+    fn(path)  # もう一度実行
+    peak = tracemalloc.get_traced_memory()[1] / 1024 / 1024  # ピーク(MB)
+    tracemalloc.stop()  # 計測終了
+    print(f'{label:<10} {ms:8.1f} ms  peak {peak:6.2f} MB  rows={len(out)}')  # 結果
+    return out  # 返す
+
+
+def main():  # メイン処理
+    path = os.path.join(tempfile.mkdtemp(), 'mext.csv')  # 一時ファイル
+    make_csv(path, 'utf-8')  # 合成データ作成
+    print(f'{ROWS} foods x {len(CODES)} components, {os.path.getsize(path) / 1024:.0f} KB')  # 規模
+    old = measure('legacy', legacy_parse, path)  # 旧実装
+    new = measure('streaming', streaming_parse, path)  # 新実装
+    print('identical' if old == new else 'MISMATCH')  # 一致確認
+
+
+if __name__ == '__main__':  # 直接実行時
+    main()  # メイン実行
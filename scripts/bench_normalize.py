@@ -0,0 +1,72 @@
+import os, sys, re, time, pathlib, unicodedata  # 標準ライブラリを読み込み
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parents[1]))  # ルートパスを検索パスへ追加
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'torimo.settings')  # Django設定を指定
+import django  # Django本体を読み込み
+django.setup()  # Djangoを初期化
+from torimoApp import api_views  # 正規化関数
+from torimoApp.api_views import get_food_data, normalize_food_name, canonicalize_name, _norm_alias_key  # 新実装
+
+LEGACY_REPL = dict(api_views.CANONICAL_REPLACEMENTS)  # 旧実装と同じ置換表(順序も同じ)
+
+
+def legacy_normalize(name):  # 旧 normalize_food_name(毎回importと正規表現)
+    if not name:  # 空文字
+        return ''  # 空を返す
+    s = name.strip().lower()  # 小文字化
+    import unicodedata as u  # 関数内import(旧実装どおり)
+    s = u.normalize('NFKC', s)  # NFKC正規化
+    return re.sub(r'[\s　]+', '', s)  # 空白除去
+
+
+def legacy_canonicalize(name):  # 旧 canonicalize_name(毎回置換表を作りループ)
+    if not name:  # 空文字
+        return ''  # 空を返す
+    import unicodedata as u  # 関数内import(旧実装どおり)
+    s = u.normalize('NFKC', name.strip())  # NFKC正規化
+    s = re.sub(r'[\s　・._\-—－‐]+', '', s)  # 記号除去
+    repl = dict(LEGACY_REPL)  # 毎回辞書を作る
+    for k, v in repl.items():  # 順に置換
+        if k in s:  # 含む場合
+            s = s.replace(k, v)  # 置換
+    return s  # 結果
+
+
+def legacy_alias_key(s):  # 旧 _norm_alias_key
+    base = legacy_canonicalize(s)  # 正規化
+    import unicodedata as u  # 関数内import(旧実装どおり)
+    base = u.normalize('NFKC', base)  # 再正規化
+    base = re.sub(r'[\s　・_\-—－‐]+', '', base)  # 記号除去
+    return base.lower()  # 小文字化
+
+
+def clear():  # LRUキャッシュを空にする
+    for f in (normalize_food_name, canonicalize_name, _norm_alias_key):  # 対象関数
+        f.cache_clear()  # 消去
+
+
+def bench(label, fn, inputs, rounds):  # 1呼び出しあたりの時間
+    t0 = time.perf_counter()  # 計測開始
+    for _ in range(rounds):  # 繰り返し
+        for x in inputs:  # 全入力
+            fn(x)  # 呼び出し
+    us = (time.perf_counter() - t0) / (rounds * len(inputs)) * 1e6  # マイクロ秒
+    print(f'{label:<28} {us:7.2f} us/call')  # 結果
+
+
+def main():  # メイン処理
+    fd = get_food_data()  # 実データ
+    inputs = list(fd.table.names) + list(fd.alias_map)  # 食品名と別名
+    inputs += [f' {x}　' for x in inputs[:500]] + ['ごはん', '白ごはん', 'ﾐﾝﾁ', 'チキン ステーキ', '']  # 空白付き・特殊例
+    pairs = [(legacy_normalize, normalize_food_name), (legacy_canonicalize, canonicalize_name), (legacy_alias_key, _norm_alias_key)]  # 比較対象
+    for old, new in pairs:  # 各関数
+        diff = sum(1 for x in inputs if old(x) != new(x))  # 不一致数
+        print(f'{new.__name__:<22} mismatches={diff}/{len(inputs)}')  # 一致確認
+        bench(f'  legacy', old, inputs, 5)  # 旧実装
+        clear()  # キャッシュなしで計測
+        bench(f'  compiled (cold cache)', new.__wrapped__, inputs, 5)  # キャッシュを通さない
+        clear()  # 初回はキャッシュを埋める
+        bench(f'  memoized (warm cache)', new, inputs, 5)  # 2回目以降はキャッシュ
+
+
+if __name__ == '__main__':  # 直接実行時
+    main()  # メイン実行
@@ -0,0 +1,52 @@
+import os, sys, random, pathlib  # 標準ライブラリを読み込み
+from array import array  # 配列型(サイズ計測用)
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parents[1]))  # ルートパスを検索パスへ追加
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'torimo.settings')  # Django設定を指定
+import django  # Django本体を読み込み
+django.setup()  # Djangoを初期化
+from torimoApp.api_views import _read_csv_rows  # CSV読み込み(dict行)
+from torimoApp.nutrients import NutrientTable  # 列指向テーブル
+
+
+def deep_size(obj, seen=None):  # オブジェクトの再帰的なサイズ(共有オブジェクトは1回だけ数える)
+    seen = set() if seen is None else seen  # 計測済みID
+    if id(obj) in seen:  # 計測済み
+        return 0  # 加算しない
+    seen.add(id(obj))  # 記録
+    size = sys.getsizeof(obj)  # 本体サイズ
+    if isinstance(obj, dict):  # 辞書
+        size += sum(deep_size(k, seen) + deep_size(v, seen) for k, v in obj.items())  # キーと値
+    elif isinstance(obj, (list, tuple, set)):  # コンテナ
+        size += sum(deep_size(x, seen) for x in obj)  # 要素
+    elif hasattr(obj, '__dict__') and not isinstance(obj, (str, bytes, array)):  # 独自クラス
+        size += deep_size(vars(obj), seen)  # 属性
+    return size  # 合計
+
+
+def synthetic(n):  # 食品名・単位付きの行を合成(成分表全体+単位データ相当)
+    random.seed(0)  # 乱数固定
+    rows = []  # 結果
+    for i in range(n):  # 行ごと
+        base = {'per': '100g', 'calories': random.uniform(0, 900), 'protein': random.uniform(0, 40), 'fat': random.uniform(0, 60), 'carbs': random.uniform(0, 90), 'source': 'jp-standard'}  # 100g当たり
+        if i % 3 == 0:  # 3件に1件は単位データ付き
+            g = random.choice([30.0, 50.0, 120.0])  # 1単位の重さ
+            base['per_unit'] = {'grams': g, 'label': random.choice(['個', '枚', '本']), 'nutrients': {k: base[k] * g / 100 for k in ('calories', 'protein', 'fat', 'carbs')}}  # 単位当たり
+        rows.append({'name': f'食品{i}', 'base': base})  # 追加
+    return rows  # 返す
+
+
+def report(label, rows):  # dict行とテーブルのサイズ比較
+    names = {id(r['name']) for r in rows}  # 名前文字列は両方で共有されるので除外
+    seen = set(names)  # 除外対象
+    dict_kb = deep_size(rows, set(seen)) / 1024  # dict行
+    table_kb = deep_size(NutrientTable(rows), set(seen)) / 1024  # 列指向
+    print(f'{label:<22} rows={len(rows):>6}  dicts={dict_kb:9.1f} KB  table={table_kb:8.1f} KB  ({table_kb / dict_kb:.0%})')  # 結果
+
+
+def main():  # メイン処理
+    report('dataset', _read_csv_rows())  # 現在のデータ
+    report('synthetic + per-unit', synthetic(int(sys.argv[1]) if len(sys.argv) > 1 else 20000))  # 合成データ
+
+
+if __name__ == '__main__':  # 直接実行時
+    main()  # メイン実行
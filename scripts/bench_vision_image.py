@@ -0,0 +1,82 @@
+import io, sys, math, time, base64, pathlib  # 標準ライブラリを読み込み
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parents[1]))  # ルートパスを検索パスへ追加
+from PIL import Image, ImageChops, ImageStat  # 画像処理(Pillow)
+from torimo import image_prep  # 前処理モジュール
+
+ROOT = pathlib.Path(__file__).resolve().parents[1]  # リポジトリのルート
+ILLUSTRATIONS = ['ご飯.png', '肉と野菜と魚.png', 'パン.png', 'クイズ.png']  # サンプルの元画像
+UPLINK_MBPS = 10.0  # Geminiへの上り回線(Mbps)の想定
+RUNS = 3  # 計測回数(最小値を採用)
+
+
+def synthetic_photos():  # スマホ写真相当(4032x3024, JPEG q92, EXIF付き)を作る
+    photos = []  # 結果
+    for name in ILLUSTRATIONS:  # 元画像ごと
+        src = Image.open(ROOT / 'frontend' / 'public' / 'image' / name).convert('RGB')  # 読み込み
+        img = src.resize((4032, 3024), Image.Resampling.BICUBIC)  # 12MP相当に拡大
+        grain = Image.effect_noise(img.size, 12).convert('RGB')  # センサーノイズ
+        img = Image.blend(img, grain, 0.08)  # ノイズを重ねる
+        exif = Image.Exif()  # EXIF
+        exif[0x0112] = 6  # 縦持ち撮影(90度回転)
+        exif[0x010F] = 'Phone'  # メーカー
+        exif[0x8825] = {1: 'N', 2: (35.0, 41.0, 22.0)}  # GPS
+        out = io.BytesIO()  # 出力先
+        img.save(out, 'JPEG', quality=92, exif=exif.tobytes())  # 端末と同程度の品質で保存
+        photos.append((name, out.getvalue()))  # 追加
+    return photos  # 返す
+
+
+def load_photos(folder):  # 指定フォルダの写真を読む
+    exts = {'.jpg', '.jpeg', '.png', '.webp'}  # 対象拡張子
+    return [(p.name, p.read_bytes()) for p in sorted(pathlib.Path(folder).iterdir()) if p.suffix.lower() in exts]  # 一覧
+
+
+def best_ms(fn):  # 最小実行時間(ms)と戻り値
+    best, result = None, None  # 初期値
+    for _ in range(RUNS):  # 繰り返し
+        t0 = time.perf_counter()  # 開始
+        result = fn()  # 実行
+        ms = (time.perf_counter() - t0) * 1000  # 経過
+        best = ms if best is None else min(best, ms)  # 最小値
+    return best, result  # 返す
+
+
+def psnr(data, reference):  # 再エンコードによる劣化(同サイズのロスレス縮小との比較, dB)
+    img = Image.open(io.BytesIO(data)).convert('RGB')  # 送信画像
+    ref = reference.resize(img.size, Image.Resampling.LANCZOS)  # 同サイズの参照
+    mse = sum(v * v for v in ImageStat.Stat(ImageChops.difference(img, ref)).rms) / 3  # 平均二乗誤差
+    return float('inf') if mse == 0 else 10 * math.log10(255 * 255 / mse)  # PSNR
+
+
+def legacy(body):  # 旧処理: base64をデコードしてdata URLを作り直す
+    header, b64 = body.split(',', 1)  # ヘッダと本体
+    raw = base64.b64decode(b64)  # デコード
+    return raw, f"data:image/jpeg;base64,{base64.b64encode(raw).decode('ascii')}"  # 再エンコード
+
+
+def main():  # メイン処理
+    photos = load_photos(sys.argv[1]) if len(sys.argv) > 1 else synthetic_photos()  # サンプル
+    configs = [('JPEG', 1024, 85), ('JPEG', 768, 85), ('WEBP', 1024, 80)]  # 比較する設定
+    totals = {c: [0, 0.0] for c in configs}  # 設定ごとの合計(バイト, ms)
+    total_in = 0  # 元のバイト数合計
+    for name, data in photos:  # 写真ごと
+        body = 'data:image/jpeg;base64,' + base64.b64encode(data).decode('ascii')  # クライアントが送るdata URL
+        legacy_ms, _ = best_ms(lambda: legacy(body))  # 旧処理の時間
+        reference = Image.open(io.BytesIO(data))  # 参照画像
+        reference = reference.transpose(Image.Transpose.ROTATE_270) if reference.getexif().get(0x0112) == 6 else reference  # 向きを合わせる
+        reference = reference.convert('RGB')  # RGB化
+        total_in += len(data)  # 合計
+        print(f'{name}: {len(data) / 1e6:.2f} MB, {reference.size[0]}x{reference.size[1]}, JSON body {len(body) / 1e6:.2f} MB, legacy decode+re-encode {legacy_ms:.0f} ms')  # 元画像の情報
+        for fmt, edge, quality in configs:  # 設定ごと
+            ms, (out, mime) = best_ms(lambda: image_prep.prepare(data, 'image/jpeg', edge, fmt, quality))  # 前処理
+            size = Image.open(io.BytesIO(out)).size  # 出力サイズ
+            totals[(fmt, edge, quality)][0] += len(out)  # バイト合計
+            totals[(fmt, edge, quality)][1] += ms  # 時間合計
+            print(f'  {fmt:4} edge={edge:4} q={quality}: {len(out) / 1e3:7.1f} KB {size[0]}x{size[1]}  {ms:5.0f} ms  PSNR {psnr(out, reference):.1f} dB')  # 結果
+    print(f'total original: {total_in / 1e6:.2f} MB (~{total_in * 8 / UPLINK_MBPS / 1e6:.1f} s upload at {UPLINK_MBPS:g} Mbps)')  # 元の合計
+    for (fmt, edge, quality), (size, ms) in totals.items():  # 設定ごとの合計
+        print(f'  {fmt} edge={edge} q={quality}: {size / 1e6:.3f} MB ({size / total_in:.1%}), prep {ms:.0f} ms, upload ~{size * 8 / UPLINK_MBPS / 1e6:.2f} s')  # 合計
+
+
+if __name__ == '__main__':  # 直接実行時
+    main()  # メイン実行
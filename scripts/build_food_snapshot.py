@@ -0,0 +1,29 @@
+import os, sys, time, pathlib  # 標準ライブラリを読み込み
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parents[1]))  # ルートパスを検索パスへ追加
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'torimo.settings')  # Django設定を指定
+import django  # Django本体を読み込み
+django.setup()  # Djangoを初期化
+from torimoApp import api_views, food_index  # データ読み込み処理
+
+
+def main():  # メイン処理
+    path = sys.argv[1] if len(sys.argv) > 1 else api_views.FOOD_SNAPSHOT_PATH  # 出力先(引数優先)
+    if not path:  # スナップショット無効時
+        print('FOOD_SNAPSHOT_PATH is empty; nothing to build.', file=sys.stderr)  # エラー出力
+        sys.exit(1)  # 異常終了
+    t0 = time.perf_counter()  # 計測開始
+    data = api_views.build_food_snapshot(path)  # CSV/別名から構築して書き出し
+    build_ms = (time.perf_counter() - t0) * 1000  # 構築時間
+    t0 = time.perf_counter()  # 読み込み計測
+    loaded = food_index.load_snapshot(path, api_views._dataset_sources())  # スナップショットを読み込み
+    load_ms = (time.perf_counter() - t0) * 1000  # 読み込み時間
+    if loaded is None:  # 読み込めない場合
+        print(f'Failed to write/read snapshot at {path}', file=sys.stderr)  # エラー出力
+        sys.exit(1)  # 異常終了
+    size_kb = pathlib.Path(path).stat().st_size / 1024  # ファイルサイズ
+    print(f'Wrote {len(data.table)} foods / {len(data.alias_keys)} aliases (version {data.version}) -> {path} ({size_kb:.0f} KB)')  # 完了ログ
+    print(f'build from sources: {build_ms:.1f} ms, load snapshot: {load_ms:.1f} ms')  # 時間比較
+
+
+if __name__ == '__main__':  # 直接実行時
+    main()  # メイン実行
@@ -0,0 +1,61 @@
+import os, sys, time, signal, socket, subprocess, pathlib, urllib.request, urllib.parse  # 標準ライブラリを読み込み
+from concurrent.futures import ThreadPoolExecutor  # 並列リクエスト用
+
+ROOT = pathlib.Path(__file__).resolve().parents[1]  # プロジェクトルート
+WORKERS = int(sys.argv[1]) if len(sys.argv) > 1 else 4  # ワーカー数
+
+
+def free_port():  # 空きポートを取得
+    with socket.socket() as s:  # 一時ソケット
+        s.bind(('127.0.0.1', 0))  # OSに割り当てさせる
+        return s.getsockname()[1]  # ポート番号
+
+
+def smaps(pid):  # /proc/<pid>/smaps_rollup からメモリ値(kB)を読む
+    out = {}  # 結果
+    for line in pathlib.Path(f'/proc/{pid}/smaps_rollup').read_text().splitlines()[1:]:  # ヘッダ行を除く
+        k, v = line.split(':', 1)  # キーと値
+        out[k] = int(v.split()[0])  # kB単位
+    return out  # 返す
+
+
+def children(pid):  # マスターの子プロセス(ワーカー)一覧
+    path = pathlib.Path(f'/proc/{pid}/task/{pid}/children')  # 子プロセスファイル
+    return [int(x) for x in path.read_text().split()]  # PID一覧
+
+
+def run(preload):  # 1構成分を計測
+    port = free_port()  # ポート確保
+    env = dict(os.environ, GUNICORN_PRELOAD='1' if preload else '0', WEB_CONCURRENCY=str(WORKERS), GUNICORN_BIND=f'127.0.0.1:{port}')  # 環境変数
+    proc = subprocess.Popen([sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py'], cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)  # gunicorn起動
+    try:  # 終了処理を保証
+        url = f'http://127.0.0.1:{port}/api/nutrition/search/?' + urllib.parse.urlencode({'q': 'ご飯'})  # データを読む API
+        for _ in range(100):  # 起動待ち
+            try:  # 接続試行
+                urllib.request.urlopen(url, timeout=5).read()  # 1回呼ぶ
+                break  # 起動完了
+            except Exception:  # まだ起動中
+                time.sleep(0.2)  # 待機
+        with ThreadPoolExecutor(WORKERS * 4) as pool:  # 全ワーカーに行き渡るよう並列で叩く
+            list(pool.map(lambda _: urllib.request.urlopen(url, timeout=30).read(), range(WORKERS * 40)))  # リクエスト送信
+        time.sleep(0.5)  # 落ち着くまで待機
+        rows = [smaps(pid) for pid in children(proc.pid)]  # ワーカーごとのメモリ
+        return smaps(proc.pid), rows  # マスターとワーカー
+    finally:  # 後片付け
+        proc.send_signal(signal.SIGTERM)  # 停止
+        proc.wait(timeout=30)  # 終了待ち
+
+
+def main():  # メイン処理
+    for preload in (False, True):  # プリロード無し/有り
+        master, workers = run(preload)  # 計測
+        label = 'preload' if preload else 'per-worker'  # 表示名
+        print(f'[{label}] master Rss={master["Rss"] / 1024:.1f}MB')  # マスター
+        for w in workers:  # 各ワーカー
+            print(f'  worker Rss={w["Rss"] / 1024:6.1f}MB  Pss={w["Pss"] / 1024:6.1f}MB  Private={(w["Private_Clean"] + w["Private_Dirty"]) / 1024:6.1f}MB')  # ワーカー
+        total_pss = sum(w['Pss'] for w in workers) / 1024  # 合計PSS
+        print(f'  total worker Pss={total_pss:.1f}MB for {len(workers)} workers')  # 合計
+
+
+if __name__ == '__main__':  # 直接実行時
+    main()  # メイン実行
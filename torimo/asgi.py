@@ -12,5 +12,7 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'torimo.settings')
+# Serve the upstream-bound endpoints with the async views (see settings.ASYNC_API_VIEWS).
+os.environ.setdefault('ASYNC_API_VIEWS', '1')
 
 application = get_asgi_application()
@@ -0,0 +1,36 @@
+"""Django cache backends with eviction/expiry counters.
+
+``StatsLocMemCache`` is a drop-in for ``LocMemCache`` whose ``stats()`` reports
+how many entries were culled because ``MAX_ENTRIES`` was reached and how many
+were dropped on expiry. Counters are per process and shared by every thread's
+cache instance for the same ``LOCATION``, like the cached data itself.
+"""
+from django.core.cache.backends.locmem import LocMemCache
+
+_counters: dict[str, dict] = {}
+
+
+class StatsLocMemCache(LocMemCache):
+    def __init__(self, name, params):
+        super().__init__(name, params)
+        self._counters = _counters.setdefault(name, {'evictions': 0, 'expirations': 0})
+
+    def _cull(self):
+        before = len(self._cache)
+        super()._cull()
+        self._counters['evictions'] += before - len(self._cache)
+
+    def _has_expired(self, key):
+        expired = super()._has_expired(key)
+        if expired and key in self._cache:
+            self._counters['expirations'] += 1
+        return expired
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                'size': len(self._cache),
+                'max_entries': self._max_entries,
+                'evictions': self._counters['evictions'],
+                'expirations': self._counters['expirations'],
+            }
@@ -0,0 +1,89 @@
+"""Process-wide, pre-configured Gemini model handles.
+
+``genai.configure()`` and ``genai.GenerativeModel(...)`` used to run on every
+Gemini call, and every availability check re-imported the SDK. Here the SDK
+is imported once, ``configure()`` runs once per API key, and one
+``GenerativeModel`` is kept per (model name, generation config). The SDK
+creates its gRPC clients lazily on a model's first call, so handles built
+before ``fork()`` are discarded in the child, as in ``supabase_http``.
+"""
+import importlib
+import os
+import threading
+
+_sdk = None
+_sdk_loaded = False
+_models: dict[tuple, object] = {}
+_models_key = None  # (pid, api_key) the cached handles were configured for
+_lock = threading.Lock()
+_counters = {'models_created': 0, 'configures': 0}
+
+
+def sdk():
+    """The ``google.generativeai`` module, or None if it is not installed (checked once)."""
+    global _sdk, _sdk_loaded
+    if not _sdk_loaded:
+        try:
+            _sdk = importlib.import_module('google.generativeai')
+        except Exception:
+            _sdk = None
+        _sdk_loaded = True
+    return _sdk
+
+
+def api_key() -> str | None:
+    return os.environ.get('GOOGLE_API_KEY') or None
+
+
+def configured() -> bool:
+    return sdk() is not None and api_key() is not None
+
+
+def _config_key(generation_config: dict | None) -> tuple:
+    return tuple(sorted((generation_config or {}).items()))
+
+
+def get_model(model_name: str, generation_config: dict | None = None):
+    """The shared ``GenerativeModel`` for ``model_name`` + ``generation_config``, created on first use."""
+    key = (model_name, _config_key(generation_config))
+    owner = (os.getpid(), api_key())
+    model = _models.get(key)
+    if model is not None and _models_key == owner:
+        return model
+    with _lock:
+        _ensure_configured(owner)
+        model = _models.get(key)
+        if model is None:
+            genai = sdk()
+            if generation_config:
+                model = genai.GenerativeModel(model_name, generation_config=dict(generation_config))
+            else:
+                model = genai.GenerativeModel(model_name)
+            _models[key] = model
+            _counters['models_created'] += 1
+        return model
+
+
+def _ensure_configured(owner: tuple):
+    # Caller holds _lock. A new process or a changed key invalidates every handle.
+    global _models_key
+    if _models_key == owner:
+        return
+    _models.clear()
+    sdk().configure(api_key=owner[1])
+    _counters['configures'] += 1
+    _models_key = owner
+
+
+def reset():
+    """Drop cached handles and SDK state (tests, key rotation)."""
+    global _sdk, _sdk_loaded, _models_key
+    with _lock:
+        _models.clear()
+        _models_key = None
+        _sdk = None
+        _sdk_loaded = False
+
+
+def stats() -> dict:
+    return {'models': len(_models), **_counters}
@@ -0,0 +1,93 @@
+"""Downscale and re-encode photos before they are sent to a vision model.
+
+Phone photos arrive as 3-12 MP JPEGs with EXIF (orientation, GPS, maker
+notes), while Gemini works on a much smaller internal resolution. ``prepare``
+decodes the upload once, applies the EXIF orientation, shrinks it to fit
+``max_edge`` (JPEG sources are downscaled during decoding via Pillow's
+draft mode), and re-encodes it without metadata.
+
+Pillow is optional: without it, or for bytes it cannot decode, the upload
+is passed through unchanged, as before.
+"""
+import io
+import threading
+
+try:
+    from PIL import Image, ImageOps
+except ImportError:  # pragma: no cover - depends on the environment
+    Image = ImageOps = None
+
+MIME_TYPES = {'JPEG': 'image/jpeg', 'WEBP': 'image/webp', 'PNG': 'image/png'}
+
+_lock = threading.Lock()
+_counters = {'prepared': 0, 'passthrough': 0, 'failed': 0, 'bytes_in': 0, 'bytes_out': 0}
+
+
+def available() -> bool:
+    return Image is not None
+
+
+def _count(outcome: str, bytes_in: int, bytes_out: int):
+    with _lock:
+        _counters[outcome] += 1
+        _counters['bytes_in'] += bytes_in
+        _counters['bytes_out'] += bytes_out
+
+
+def _flatten(img):
+    """RGB/L image for lossy encoders; transparency is composited onto white."""
+    if img.mode in ('RGB', 'L'):
+        return img
+    if img.mode in ('RGBA', 'LA', 'PA') or (img.mode == 'P' and 'transparency' in img.info):
+        rgba = img.convert('RGBA')
+        background = Image.new('RGB', rgba.size, (255, 255, 255))
+        background.paste(rgba, mask=rgba.getchannel('A'))
+        return background
+    return img.convert('RGB')
+
+
+def prepare(data: bytes, mime: str, max_edge: int = 1024, fmt: str = 'JPEG', quality: int = 85) -> tuple[bytes, str]:
+    """``(bytes, mime)`` to send: ``data`` fitted into ``max_edge`` px and re-encoded as ``fmt``.
+
+    ``max_edge <= 0`` or a missing Pillow returns the input unchanged. When
+    the image already fits, carries no EXIF and re-encoding would not make it
+    smaller, the original bytes are kept too.
+    """
+    if Image is None or max_edge <= 0 or not data:
+        _count('passthrough', len(data or b''), len(data or b''))
+        return data, mime
+    fmt = fmt.upper()
+    try:
+        with Image.open(io.BytesIO(data)) as img:
+            has_exif = bool(img.getexif())
+            resized = max(img.size) > max_edge
+            if resized:
+                # reducing_gap=1 lets the JPEG decoder scale by 1/2..1/8 before resampling
+                img.thumbnail((max_edge, max_edge), Image.Resampling.LANCZOS, reducing_gap=1.0)
+            img = ImageOps.exif_transpose(img)
+            if fmt != 'PNG':
+                img = _flatten(img)
+            out = io.BytesIO()
+            if fmt == 'JPEG':
+                img.save(out, 'JPEG', quality=quality, optimize=True)
+            elif fmt == 'WEBP':
+                img.save(out, 'WEBP', quality=quality, method=4)
+            else:
+                img.save(out, fmt, optimize=True)
+    except Exception:  # not an image Pillow can read (or a decompression bomb): send as is
+        _count('failed', len(data), len(data))
+        return data, mime
+    encoded = out.getvalue()
+    if not resized and not has_exif and len(encoded) >= len(data):
+        _count('passthrough', len(data), len(data))
+        return data, mime
+    _count('prepared', len(data), len(encoded))
+    return encoded, MIME_TYPES.get(fmt, mime)
+
+
+def stats() -> dict:
+    with _lock:
+        stats = dict(_counters)
+    stats['available'] = available()
+    stats['saved_ratio'] = round(1 - stats['bytes_out'] / stats['bytes_in'], 4) if stats['bytes_in'] else 0.0
+    return stats
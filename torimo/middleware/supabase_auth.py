@@ -1,13 +1,18 @@
+import asyncio
+import json
 import os
 import threading
 import time
 from functools import wraps
 
-import requests
 import jwt
-from jwt import InvalidTokenError
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from jwt import InvalidKeyError, InvalidTokenError, PyJWK, PyJWKError
 from django.http import JsonResponse
 
+from torimo import supabase_http
+from torimo.ttl_cache import TTLCache
+
 SUPABASE_URL = (os.environ.get('SUPABASE_URL') or '').rstrip('/')
 SUPABASE_SERVICE_ROLE_KEY = (
     os.environ.get('SUPABASE_SERVICE_ROLE_KEY')
@@ -18,33 +23,202 @@ SUPABASE_JWT_SECRET = os.environ.get('SUPABASE_JWT_SECRET')
 SUPABASE_JWT_AUDIENCE = os.environ.get('SUPABASE_JWT_AUDIENCE', 'authenticated')
 SUPABASE_JWT_VERIFY_AUD = (os.environ.get('SUPABASE_JWT_VERIFY_AUD', '1').strip().lower() in {'1', 'true', 'yes', 'on'})
 
+# Asymmetric signing keys (RS256/ES256): a JWKS document read from a file, or
+# fetched once from Supabase and refreshed in the background.
+SUPABASE_JWKS_PATH = os.environ.get('SUPABASE_JWKS_PATH')
+SUPABASE_JWKS_URL = os.environ.get('SUPABASE_JWKS_URL') or (
+    f"{SUPABASE_URL}/auth/v1/.well-known/jwks.json" if SUPABASE_URL else None
+)
+SUPABASE_JWKS_REFRESH_SECONDS = int(os.environ.get('SUPABASE_JWKS_REFRESH_SECONDS', 600))
+ASYMMETRIC_ALGORITHMS = ('RS256', 'ES256')
+
 USERINFO_ENDPOINT = f"{SUPABASE_URL}/auth/v1/user" if SUPABASE_URL else None
 CACHE_SECONDS = int(os.environ.get('SUPABASE_AUTH_CACHE_SECONDS', 55))
+CACHE_MAXSIZE = int(os.environ.get('SUPABASE_AUTH_CACHE_MAXSIZE', 2048))
+# Tokens Supabase rejected are remembered briefly so a misbehaving client
+# cannot make us hammer /auth/v1/user with the same bad token.
+NEGATIVE_CACHE_SECONDS = int(os.environ.get('SUPABASE_AUTH_NEGATIVE_CACHE_SECONDS', 30))
+USERINFO_TIMEOUT = 6
 
 
 class SupabaseTokenError(Exception):
     """Raised when the provided Supabase JWT cannot be verified."""
 
 
-class SupabaseTokenValidator:
-    def __init__(self):
-        self._cache = {}
+def _token_expiry(token: str, now: float, claims: dict | None = None) -> float:
+    """Cache deadline: the token's own ``exp`` claim, capped at CACHE_SECONDS from now."""
+    cap = now + CACHE_SECONDS
+    if claims is None:
+        try:
+            claims = jwt.decode(token, options={'verify_signature': False})
+        except InvalidTokenError:
+            return cap
+    exp = claims.get('exp')
+    if isinstance(exp, (int, float)):
+        return min(float(exp), cap)
+    return cap
+
+
+class JWKSKeyStore:
+    """Public signing keys by ``kid``, loaded once and refreshed off the hot path.
+
+    The first lookup loads the JWKS synchronously; afterwards a daemon thread
+    reloads it every ``refresh_seconds``, and an unknown ``kid`` (key rotation)
+    only wakes that thread up instead of blocking the request.
+    """
+
+    MIN_RELOAD_INTERVAL = 30
+
+    def __init__(self, path: str | None = None, url: str | None = None, refresh_seconds: int = 600):
+        self.path = path
+        self.url = url
+        self.refresh_seconds = max(refresh_seconds, self.MIN_RELOAD_INTERVAL)
+        self._keys: dict[str, tuple[str, object]] = {}
+        self._loaded = False
+        self._last_load = 0.0
         self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._refresher_pid = None
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.path or self.url)
+
+    @property
+    def loaded(self) -> bool:
+        return self._loaded
+
+    def _read_document(self) -> dict:
+        if self.path:
+            with open(self.path, encoding='utf-8') as fh:
+                return json.load(fh)
+        headers = {'apikey': SUPABASE_SERVICE_ROLE_KEY} if SUPABASE_SERVICE_ROLE_KEY else {}
+        response = supabase_http.get(self.url, headers=headers, timeout=USERINFO_TIMEOUT)
+        response.raise_for_status()
+        return response.json()
+
+    def load(self) -> bool:
+        self._last_load = time.monotonic()
+        try:
+            document = self._read_document()
+        except Exception:
+            return False
+        if not isinstance(document, dict):
+            return False
+        keys = {}
+        for jwk_data in document.get('keys') or []:
+            kid = jwk_data.get('kid')
+            alg = jwk_data.get('alg') or {'RSA': 'RS256', 'EC': 'ES256'}.get(jwk_data.get('kty'))
+            if not kid or alg not in ASYMMETRIC_ALGORITHMS:
+                continue
+            try:
+                keys[kid] = (alg, PyJWK(jwk_data, alg).key)
+            except (PyJWKError, InvalidKeyError):
+                continue
+        self._keys = keys
+        return True
+
+    def _refresh_loop(self):
+        while True:
+            self._wakeup.wait(self.refresh_seconds)
+            self._wakeup.clear()
+            wait = self._last_load + self.MIN_RELOAD_INTERVAL - time.monotonic()
+            if wait > 0:
+                time.sleep(wait)
+            self.load()
+
+    def _ensure_refresher(self):
+        pid = os.getpid()
+        if self._refresher_pid == pid:
+            return
+        with self._lock:
+            if self._refresher_pid != pid:
+                threading.Thread(target=self._refresh_loop, name='supabase-jwks-refresh', daemon=True).start()
+                self._refresher_pid = pid
+
+    def ensure_loaded(self):
+        """Do the first (blocking) JWKS load if it has not happened yet."""
+        if not self._loaded:
+            with self._lock:
+                if not self._loaded:
+                    self.load()
+                    self._loaded = True
+
+    def get_key(self, kid: str | None) -> tuple[str, object] | None:
+        """``(algorithm, public_key)`` for ``kid``, or None if unknown."""
+        if not self.enabled or not kid:
+            return None
+        self.ensure_loaded()
+        self._ensure_refresher()
+        key = self._keys.get(kid)
+        if key is None:
+            self._wakeup.set()
+        return key
+
+
+_jwks = JWKSKeyStore(SUPABASE_JWKS_PATH, SUPABASE_JWKS_URL, SUPABASE_JWKS_REFRESH_SECONDS)
+
+
+def _signing_algorithm(token: str) -> str | None:
+    try:
+        return jwt.get_unverified_header(token).get('alg')
+    except InvalidTokenError:
+        return None
+
+
+class _Flight:
+    """One in-progress userinfo request that concurrent callers wait on."""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.user = None
+        self.error = None
+
+
+class SupabaseTokenValidator:
+    def __init__(self, maxsize: int = CACHE_MAXSIZE):
+        self._cache = TTLCache(maxsize=maxsize)
+        self._rejected = TTLCache(maxsize=maxsize, ttl=NEGATIVE_CACHE_SECONDS)
+        self._inflight: dict[str, _Flight] = {}
+        self._inflight_lock = threading.Lock()
+        # Async counterpart of _inflight: one fetch task per (event loop, token).
+        self._ainflight: dict[tuple, asyncio.Future] = {}
+        self.coalesced = 0
+
+    def cache_stats(self) -> dict:
+        stats = self._cache.stats()
+        stats['rejected'] = self._rejected.stats()
+        stats['coalesced'] = self.coalesced
+        return stats
 
     def _decode_locally(self, token: str):
-        if not SUPABASE_JWT_SECRET:
+        try:
+            header = jwt.get_unverified_header(token)
+        except InvalidTokenError:
+            return None
+        alg = header.get('alg')
+        if alg in ASYMMETRIC_ALGORITHMS:
+            key = _jwks.get_key(header.get('kid'))
+            # The key's algorithm must match the header so a token cannot pick its own.
+            if key is None or key[0] != alg:
+                return None
+            verification_key = key[1]
+        elif alg == 'HS256' and SUPABASE_JWT_SECRET:
+            verification_key = SUPABASE_JWT_SECRET
+        else:
             return None
-        kwargs = {'algorithms': ['HS256']}
+        kwargs = {'algorithms': [alg]}
         if SUPABASE_JWT_VERIFY_AUD and SUPABASE_JWT_AUDIENCE:
             kwargs['audience'] = SUPABASE_JWT_AUDIENCE
         else:
             kwargs.setdefault('options', {})['verify_aud'] = False
         try:
-            return jwt.decode(token, SUPABASE_JWT_SECRET, **kwargs)
+            return jwt.decode(token, verification_key, **kwargs)
         except InvalidTokenError:
             return None
 
-    def validate(self, token: str):
+    def _validate_offline(self, token: str):
+        """Everything ``validate`` can decide without Supabase; None means the user must be fetched."""
         if not token:
             raise SupabaseTokenError('Missing bearer token')
         if not USERINFO_ENDPOINT or not SUPABASE_SERVICE_ROLE_KEY:
@@ -53,41 +227,118 @@ class SupabaseTokenValidator:
                 return local_payload
             raise SupabaseTokenError('Supabase auth is not configured on the server')
 
-        now = time.time()
-        with self._lock:
-            cached = self._cache.get(token)
-            if cached and cached['exp'] > now:
-                return cached['user']
+        cached = self._cache.get(token)
+        if cached is not None:
+            return cached
 
+        rejected = self._rejected.get(token)
+        if rejected is not None:
+            raise SupabaseTokenError(rejected)
+
+        now = time.time()
         local_payload = self._decode_locally(token)
         if local_payload:
-            with self._lock:
-                self._cache[token] = {'user': local_payload, 'exp': now + CACHE_SECONDS}
+            self._cache.set(token, local_payload, _token_expiry(token, now, local_payload))
             return local_payload
+        return None
+
+    def validate(self, token: str):
+        user = self._validate_offline(token)
+        if user is not None:
+            return user
+        return self._fetch_user_single_flight(token)
+
+    async def avalidate(self, token: str):
+        """``validate`` for async views: the userinfo round trip does not block the event loop."""
+        if token and _jwks.enabled and not _jwks.loaded and _signing_algorithm(token) in ASYMMETRIC_ALGORITHMS:
+            await asyncio.to_thread(_jwks.ensure_loaded)
+        user = self._validate_offline(token)
+        if user is not None:
+            return user
+        return await self._afetch_user_single_flight(token)
+
+    async def _afetch_user_single_flight(self, token: str):
+        key = (asyncio.get_running_loop(), token)
+        task = self._ainflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(self._afetch_user(token))
+            self._ainflight[key] = task
+            task.add_done_callback(lambda _: self._ainflight.pop(key, None))
+        else:
+            self.coalesced += 1
+        # A cancelled waiter must not cancel the fetch other requests share.
+        return await asyncio.shield(task)
+
+    def _fetch_user_single_flight(self, token: str):
+        """Coalesce concurrent validations of the same token into one upstream call."""
+        with self._inflight_lock:
+            flight = self._inflight.get(token)
+            leader = flight is None
+            if leader:
+                flight = _Flight()
+                self._inflight[token] = flight
+            else:
+                self.coalesced += 1
+
+        if not leader:
+            if not flight.done.wait(USERINFO_TIMEOUT + 1):
+                raise SupabaseTokenError('Timed out waiting for Supabase token validation')
+            if flight.error is not None:
+                if isinstance(flight.error, SupabaseTokenError):
+                    raise SupabaseTokenError(str(flight.error))
+                raise flight.error
+            return flight.user
+
+        try:
+            flight.user = self._fetch_user(token)
+            return flight.user
+        except Exception as exc:
+            flight.error = exc
+            raise
+        finally:
+            with self._inflight_lock:
+                self._inflight.pop(token, None)
+            flight.done.set()
+
+    @staticmethod
+    def _userinfo_headers(token: str) -> dict:
+        return {
+            'Authorization': f'Bearer {token}',
+            'apikey': SUPABASE_SERVICE_ROLE_KEY,
+        }
+
+    def _fetch_user(self, token: str):
+        now = time.time()
+        response = supabase_http.get(USERINFO_ENDPOINT, headers=self._userinfo_headers(token), timeout=USERINFO_TIMEOUT)
+        return self._accept_userinfo(token, response, now)
+
+    async def _afetch_user(self, token: str):
+        now = time.time()
+        response = await supabase_http.aget(USERINFO_ENDPOINT, headers=self._userinfo_headers(token), timeout=USERINFO_TIMEOUT)
+        return self._accept_userinfo(token, response, now)
 
-        response = requests.get(
-            USERINFO_ENDPOINT,
-            headers={
-                'Authorization': f'Bearer {token}',
-                'apikey': SUPABASE_SERVICE_ROLE_KEY,
-            },
-            timeout=6,
-        )
+    def _accept_userinfo(self, token: str, response, now: float):
         if response.status_code != 200:
             detail = response.text or ''
-            raise SupabaseTokenError(
-                f'Supabase rejected the provided token (status={response.status_code}, detail={detail[:200]!r})'
-            )
+            message = f'Supabase rejected the provided token (status={response.status_code}, detail={detail[:200]!r})'
+            # Only cache definitive rejections, not upstream outages or rate limits.
+            if 400 <= response.status_code < 500 and response.status_code != 429:
+                self._rejected.set(token, message)
+            raise SupabaseTokenError(message)
 
         user = response.json()
-        with self._lock:
-            self._cache[token] = {'user': user, 'exp': now + CACHE_SECONDS}
+        self._cache.set(token, user, _token_expiry(token, now))
         return user
 
 
 _validator = SupabaseTokenValidator()
 
 
+def token_cache_stats() -> dict:
+    """Hit/miss/eviction counters of the process-wide token cache (for monitoring)."""
+    return _validator.cache_stats()
+
+
 def _extract_bearer_token(request):
     header = request.META.get('HTTP_AUTHORIZATION', '')
     if not header:
@@ -107,8 +358,21 @@ def ensure_supabase_user(request):
     token = _extract_bearer_token(request)
     if not token:
         raise SupabaseTokenError('Authorization header missing or malformed')
+    return _attach_user(request, token, _validator.validate(token))
+
+
+async def aensure_supabase_user(request):
+    """Async ``ensure_supabase_user``: a userinfo lookup awaits instead of blocking the worker."""
+    if getattr(request, 'supabase_user_id', None):
+        return request.supabase_user
+
+    token = _extract_bearer_token(request)
+    if not token:
+        raise SupabaseTokenError('Authorization header missing or malformed')
+    return _attach_user(request, token, await _validator.avalidate(token))
+
 
-    user = _validator.validate(token)
+def _attach_user(request, token: str, user):
     request.supabase_token = token
     request.supabase_user = user
     request.supabase_user_id = user.get('id') or user.get('sub') or user.get('user_id')
@@ -120,25 +384,50 @@ def ensure_supabase_user(request):
 class SupabaseAuthMiddleware:
     """Best-effort middleware: attaches Supabase user info when a JWT is provided."""
 
+    sync_capable = True
+    async_capable = True
+
     def __init__(self, get_response):
         self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
 
     def __call__(self, request):
-        try:
-            token = _extract_bearer_token(request)
-            if token:
-                request._supabase_auth_middleware_seen_token = True
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        token = _extract_bearer_token(request)
+        request._supabase_auth_middleware_seen_token = bool(token)
+        if token:
+            try:
                 ensure_supabase_user(request)
-        except SupabaseTokenError as exc:
-            request.supabase_auth_error = str(exc)
-        else:
-            if not token:
-                request._supabase_auth_middleware_seen_token = False
+            except SupabaseTokenError as exc:
+                request.supabase_auth_error = str(exc)
         return self.get_response(request)
 
+    async def __acall__(self, request):
+        token = _extract_bearer_token(request)
+        request._supabase_auth_middleware_seen_token = bool(token)
+        if token:
+            try:
+                await aensure_supabase_user(request)
+            except SupabaseTokenError as exc:
+                request.supabase_auth_error = str(exc)
+        return await self.get_response(request)
+
 
 def require_supabase_auth(view_func):
-    """Decorator that enforces Supabase JWT authentication on Django views."""
+    """Decorator that enforces Supabase JWT authentication on Django views (sync or async)."""
+
+    if iscoroutinefunction(view_func):
+        @wraps(view_func)
+        async def _awrapped(request, *args, **kwargs):
+            try:
+                await aensure_supabase_user(request)
+            except SupabaseTokenError as exc:
+                return JsonResponse({'detail': str(exc)}, status=401)
+            return await view_func(request, *args, **kwargs)
+
+        return _awrapped
 
     @wraps(view_func)
     def _wrapped(request, *args, **kwargs):
@@ -0,0 +1,259 @@
+"""Token-bucket rate limiting with a bounded wait queue.
+
+``RateLimiter`` admits calls at ``rate`` per second with bursts of up to
+``burst``. A call that finds the bucket empty reserves the next free token
+and waits for it, so waiters are served in arrival order. At most
+``max_queue`` calls may wait at once, and none longer than ``max_wait``
+seconds: when the queue is full, or the reservation would exceed the wait
+budget, ``Overloaded`` is raised immediately so the caller can answer 503
+instead of holding a worker. ``acquire()`` sleeps the calling thread and
+``acquire_async()`` the event loop; both share one bucket and queue. The
+bucket is never consulted under the limiter's lock, and ``acquire_async``
+reserves a shared bucket in a worker thread so SQLite I/O never runs on the loop.
+
+The bucket lives in process memory (``TokenBucket``) or, to share one budget
+between the worker processes on a host, in a SQLite file
+(``SQLiteTokenBucket``), updated in an ``IMMEDIATE`` transaction the way a
+Redis script would be. The wait queue and its metrics are per process.
+"""
+import asyncio
+import math
+import os
+import sqlite3
+import threading
+import time
+from collections import deque
+from pathlib import Path
+
+
+class Overloaded(Exception):
+    """Raised instead of queueing; ``retry_after`` is a hint in seconds."""
+
+    def __init__(self, reason: str, retry_after: float):
+        super().__init__(f'{reason} (retry after {retry_after:.1f}s)')
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class TokenBucket:
+    """In-process bucket. ``reserve()`` takes a token now or books the next one."""
+
+    shared = False
+
+    def __init__(self, rate: float, burst: float, clock=time.monotonic):
+        self.rate = float(rate)
+        self.burst = max(float(burst), 1.0)
+        self._clock = clock
+        self._tokens = self.burst
+        self._updated = clock()
+        self._lock = threading.Lock()
+
+    def reserve(self, max_wait: float) -> tuple[bool, float]:
+        """``(True, wait)`` if a token is booked ``wait`` seconds from now, else ``(False, wait)``."""
+        with self._lock:
+            now = self._clock()
+            tokens, wait = _refill(self._tokens, self._updated, now, self.rate, self.burst)
+            if wait > max_wait:
+                return False, wait
+            self._tokens, self._updated = tokens - 1.0, now
+            return True, wait
+
+
+def _refill(tokens: float, updated: float, now: float, rate: float, burst: float) -> tuple[float, float]:
+    # Tokens may be negative: each queued reservation owes one.
+    tokens = min(burst, tokens + max(now - updated, 0.0) * rate)
+    return tokens, (0.0 if tokens >= 1.0 else (1.0 - tokens) / rate)
+
+
+class SQLiteTokenBucket:
+    """``TokenBucket`` whose state is a row in a SQLite file shared by every process on the host.
+
+    SQLite errors fall back to an in-process bucket for that call, so a
+    broken file degrades to per-process limiting instead of failing requests.
+    """
+
+    shared = True
+
+    def __init__(self, rate: float, burst: float, path, name: str = 'default', table: str = 'token_buckets'):
+        self.rate = float(rate)
+        self.burst = max(float(burst), 1.0)
+        self.path = Path(path)
+        self.name = name
+        self.table = table
+        self.errors = 0
+        self._fallback = TokenBucket(rate, burst)
+        self._local = threading.local()
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None and self._local.pid == os.getpid():
+            return conn
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(str(self.path), timeout=5, isolation_level=None)
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute(
+            f'CREATE TABLE IF NOT EXISTS "{self.table}" '
+            '(name TEXT PRIMARY KEY, tokens REAL NOT NULL, updated REAL NOT NULL)'
+        )
+        self._local.conn = conn
+        self._local.pid = os.getpid()
+        return conn
+
+    def reserve(self, max_wait: float) -> tuple[bool, float]:
+        try:
+            return self._reserve(max_wait)
+        except (sqlite3.Error, OSError):
+            self.errors += 1
+            return self._fallback.reserve(max_wait)
+
+    def _reserve(self, max_wait: float) -> tuple[bool, float]:
+        conn = self._conn()
+        now = time.time()  # wall clock: comparable across processes
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            row = conn.execute(f'SELECT tokens, updated FROM "{self.table}" WHERE name = ?', (self.name,)).fetchone()
+            tokens, wait = _refill(row[0], row[1], now, self.rate, self.burst) if row else (self.burst, 0.0)
+            granted = wait <= max_wait
+            if granted:
+                conn.execute(
+                    f'INSERT OR REPLACE INTO "{self.table}" (name, tokens, updated) VALUES (?, ?, ?)',
+                    (self.name, tokens - 1.0, now),
+                )
+            conn.execute('COMMIT')
+        except BaseException:
+            conn.execute('ROLLBACK')
+            raise
+        return granted, wait
+
+
+class RateLimiter:
+    """Bucket + bounded wait queue + metrics. ``bucket=None`` admits everything (still counted)."""
+
+    def __init__(self, bucket=None, max_queue: int = 32, max_wait: float = 10.0, window: int = 1024):
+        self.bucket = bucket
+        self.max_queue = max(int(max_queue), 0)
+        self.max_wait = float(max_wait)
+        self._lock = threading.Lock()
+        self._waits = deque(maxlen=window)  # recent wait times (s) of admitted calls
+        self.queue_depth = 0
+        self.queue_depth_max = 0
+        self.admitted = 0
+        self.queued = 0
+        self.shed_queue_full = 0
+        self.shed_wait = 0
+
+    def _admit(self, max_wait: float | None) -> float:
+        if self.bucket is None:
+            with self._lock:
+                self.admitted += 1
+                self._waits.append(0.0)
+            return 0.0
+        max_wait = self.max_wait if max_wait is None else min(max_wait, self.max_wait)
+        # Claim a queue slot first so the bound holds, then reserve without the
+        # lock: a shared bucket's reserve() is SQLite I/O.
+        with self._lock:
+            slot = self.queue_depth < self.max_queue
+            if slot:
+                self.queue_depth += 1
+        # A full queue means the bucket is empty; only a token free right now is admitted.
+        granted, wait = self.bucket.reserve(max(max_wait, 0.0) if slot else 0.0)
+        with self._lock:
+            if slot and (not granted or wait <= 0):
+                self.queue_depth -= 1
+            if not granted:
+                if not slot:
+                    self.shed_queue_full += 1
+                    raise Overloaded('queue full', max(wait, self.queue_depth / self.bucket.rate))
+                self.shed_wait += 1
+                raise Overloaded('wait budget exceeded', wait)
+            self.admitted += 1
+            if wait > 0:
+                self.queued += 1
+                self.queue_depth_max = max(self.queue_depth_max, self.queue_depth)
+            else:
+                self._waits.append(0.0)
+            return wait
+
+    def _left_queue(self, wait: float):
+        with self._lock:
+            self.queue_depth -= 1
+            self._waits.append(wait)
+
+    def _release_abandoned(self, admitting):
+        # The caller was cancelled while its admission ran in a worker thread.
+        if not admitting.cancelled() and admitting.exception() is None and admitting.result() > 0:
+            self._left_queue(admitting.result())
+
+    def acquire(self, max_wait: float | None = None) -> float:
+        """Block until admitted; returns the seconds waited. Raises ``Overloaded``."""
+        wait = self._admit(max_wait)
+        if wait <= 0:
+            return 0.0
+        try:
+            time.sleep(wait)
+        finally:
+            self._left_queue(wait)
+        return wait
+
+    async def acquire_async(self, max_wait: float | None = None) -> float:
+        """``acquire`` without blocking the event loop (a shared bucket is reserved in a worker thread)."""
+        if getattr(self.bucket, 'shared', False):
+            admitting = asyncio.get_running_loop().run_in_executor(None, self._admit, max_wait)
+            try:
+                wait = await asyncio.shield(admitting)
+            except asyncio.CancelledError:
+                admitting.add_done_callback(self._release_abandoned)
+                raise
+        else:
+            wait = self._admit(max_wait)
+        if wait <= 0:
+            return 0.0
+        try:
+            await asyncio.sleep(wait)
+        finally:
+            self._left_queue(wait)
+        return wait
+
+    def stats(self) -> dict:
+        with self._lock:
+            waits = sorted(self._waits)
+            stats = {
+                'enabled': self.bucket is not None,
+                'shared': bool(getattr(self.bucket, 'shared', False)),
+                'queue_depth': self.queue_depth,
+                'queue_depth_max': self.queue_depth_max,
+                'max_queue': self.max_queue,
+                'admitted': self.admitted,
+                'queued': self.queued,
+                'shed_queue_full': self.shed_queue_full,
+                'shed_wait': self.shed_wait,
+            }
+        if self.bucket is not None:
+            stats['rate'] = self.bucket.rate
+            stats['burst'] = self.bucket.burst
+        stats['wait_ms'] = {
+            'avg': round(sum(waits) / len(waits) * 1000, 1) if waits else 0.0,
+            'p95': round(waits[min(math.ceil(len(waits) * 0.95), len(waits)) - 1] * 1000, 1) if waits else 0.0,
+            'max': round(waits[-1] * 1000, 1) if waits else 0.0,
+        }
+        return stats
+
+
+def limiter_from_env(prefix: str, rate=5.0, burst=10, max_queue=32, max_wait=10.0) -> RateLimiter:
+    """``RateLimiter`` configured by ``<prefix>_RATE_LIMIT`` (per second; 0 disables), ``_RATE_BURST``,
+    ``_QUEUE_SIZE``, ``_QUEUE_TIMEOUT`` and ``_RATE_LIMIT_PATH`` (SQLite file to share the bucket across processes)."""
+    env = os.environ
+    rate = float(env.get(f'{prefix}_RATE_LIMIT', rate))
+    burst = float(env.get(f'{prefix}_RATE_BURST', burst))
+    path = env.get(f'{prefix}_RATE_LIMIT_PATH')
+    if rate <= 0:
+        bucket = None
+    elif path:
+        bucket = SQLiteTokenBucket(rate, burst, path, name=prefix.lower())
+    else:
+        bucket = TokenBucket(rate, burst)
+    return RateLimiter(
+        bucket,
+        max_queue=int(env.get(f'{prefix}_QUEUE_SIZE', max_queue)),
+        max_wait=float(env.get(f'{prefix}_QUEUE_TIMEOUT', max_wait)),
+    )
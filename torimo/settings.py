@@ -95,6 +95,13 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = 'torimo.wsgi.application'
+ASGI_APPLICATION = 'torimo.asgi.application'
+
+# Route the Supabase proxy, notes, profile, barcode, vision and chat endpoints
+# to the async views in torimoApp/async_views.py. torimo/asgi.py turns this on;
+# under WSGI the DRF views are used (async views would get a new event loop
+# per request there).
+ASYNC_API_VIEWS = _env_bool('ASYNC_API_VIEWS', False)
 
 DATABASES = {
     'default': {
@@ -103,6 +110,24 @@ DATABASES = {
     }
 }
 
+# Caches. "nutrition" holds analyze_nutrition results; point it at Redis with
+# NUTRITION_CACHE_BACKEND=django.core.cache.backends.redis.RedisCache and
+# NUTRITION_CACHE_LOCATION=redis://127.0.0.1:6379/1 to share it across workers.
+_NUTRITION_CACHE_BACKEND = os.environ.get('NUTRITION_CACHE_BACKEND', 'torimo.cache_backends.StatsLocMemCache')
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'nutrition': {
+        'BACKEND': _NUTRITION_CACHE_BACKEND,
+        'LOCATION': os.environ.get('NUTRITION_CACHE_LOCATION', 'nutrition-results'),
+        'TIMEOUT': int(os.environ.get('NUTRITION_CACHE_TTL', 24 * 3600)),
+        'KEY_PREFIX': 'torimo',
+    },
+}
+if 'locmem' in _NUTRITION_CACHE_BACKEND.lower():
+    CACHES['nutrition']['OPTIONS'] = {'MAX_ENTRIES': int(os.environ.get('NUTRITION_CACHE_MAX_ENTRIES', 2048))}
+
 STATIC_URL = 'static/'
 STATICFILES_DIRS = [BASE_DIR / 'torimoApp' / 'static']
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
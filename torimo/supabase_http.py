@@ -0,0 +1,146 @@
+"""Shared, pooled HTTP client for calls to Supabase (REST + Auth).
+
+Every proxy view used to call ``requests.get/post/...`` directly, which opens a
+brand new TCP+TLS connection to Supabase for each API hit. This module keeps
+one ``httpx.Client`` per process so connections are reused (keep-alive) and,
+when the optional ``h2`` package is installed, multiplexed over HTTP/2.
+
+The client is created lazily and re-created after ``fork()`` so gunicorn
+workers never share a socket inherited from the master process.
+
+Async views (served through ``torimo.asgi``) use ``aget``/``apost``/... which
+go through one ``httpx.AsyncClient`` per event loop. Its pool is sized for
+many concurrent in-flight requests, since an ASGI worker is not limited to
+one upstream call per thread.
+"""
+import asyncio
+import importlib.util
+import os
+import threading
+import weakref
+
+import httpx
+
+SUPABASE_HTTP_POOL_SIZE = int(os.environ.get('SUPABASE_HTTP_POOL_SIZE', 20))
+SUPABASE_HTTP_KEEPALIVE = int(os.environ.get('SUPABASE_HTTP_KEEPALIVE', 10))
+SUPABASE_HTTP_KEEPALIVE_EXPIRY = float(os.environ.get('SUPABASE_HTTP_KEEPALIVE_EXPIRY', 30))
+SUPABASE_HTTP_ASYNC_POOL_SIZE = int(os.environ.get('SUPABASE_HTTP_ASYNC_POOL_SIZE', 200))
+SUPABASE_HTTP_ASYNC_KEEPALIVE = int(os.environ.get('SUPABASE_HTTP_ASYNC_KEEPALIVE', 50))
+SUPABASE_HTTP2 = (os.environ.get('SUPABASE_HTTP2', '1').strip().lower() in {'1', 'true', 'yes', 'on'})
+DEFAULT_TIMEOUT = 8
+
+# Re-exported so callers can catch transport errors without importing httpx.
+SupabaseHTTPError = httpx.HTTPError
+
+_client = None
+_client_pid = None
+_lock = threading.Lock()
+# AsyncClient connections belong to the loop that opened them.
+_async_clients: 'weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, httpx.AsyncClient]' = weakref.WeakKeyDictionary()
+_async_clients_pid = None
+
+
+def _http2_available() -> bool:
+    return SUPABASE_HTTP2 and importlib.util.find_spec('h2') is not None
+
+
+def get_client() -> httpx.Client:
+    """Return the process-wide pooled client, creating it on first use."""
+    global _client, _client_pid
+    pid = os.getpid()
+    client = _client
+    if client is not None and _client_pid == pid:
+        return client
+    with _lock:
+        if _client is None or _client_pid != pid:
+            limits = httpx.Limits(
+                max_connections=SUPABASE_HTTP_POOL_SIZE,
+                max_keepalive_connections=SUPABASE_HTTP_KEEPALIVE,
+                keepalive_expiry=SUPABASE_HTTP_KEEPALIVE_EXPIRY,
+            )
+            _client = httpx.Client(
+                limits=limits,
+                http2=_http2_available(),
+                timeout=DEFAULT_TIMEOUT,
+            )
+            _client_pid = pid
+        return _client
+
+
+def close_client():
+    """Close the pooled client (used by tests and worker shutdown hooks)."""
+    global _client, _client_pid
+    with _lock:
+        if _client is not None and _client_pid == os.getpid():
+            _client.close()
+        _client = None
+        _client_pid = None
+
+
+def request(method: str, url: str, **kwargs) -> httpx.Response:
+    kwargs.setdefault('timeout', DEFAULT_TIMEOUT)
+    return get_client().request(method, url, **kwargs)
+
+
+def get(url: str, **kwargs) -> httpx.Response:
+    return request('GET', url, **kwargs)
+
+
+def post(url: str, **kwargs) -> httpx.Response:
+    return request('POST', url, **kwargs)
+
+
+def patch(url: str, **kwargs) -> httpx.Response:
+    return request('PATCH', url, **kwargs)
+
+
+def delete(url: str, **kwargs) -> httpx.Response:
+    return request('DELETE', url, **kwargs)
+
+
+def get_async_client() -> httpx.AsyncClient:
+    """Return the pooled async client of the running event loop, creating it on first use."""
+    global _async_clients_pid
+    loop = asyncio.get_running_loop()
+    pid = os.getpid()
+    if _async_clients_pid != pid:
+        _async_clients.clear()
+        _async_clients_pid = pid
+    client = _async_clients.get(loop)
+    if client is None or client.is_closed:
+        limits = httpx.Limits(
+            max_connections=SUPABASE_HTTP_ASYNC_POOL_SIZE,
+            max_keepalive_connections=SUPABASE_HTTP_ASYNC_KEEPALIVE,
+            keepalive_expiry=SUPABASE_HTTP_KEEPALIVE_EXPIRY,
+        )
+        client = httpx.AsyncClient(limits=limits, http2=_http2_available(), timeout=DEFAULT_TIMEOUT)
+        _async_clients[loop] = client
+    return client
+
+
+async def aclose_client():
+    """Close the running loop's async client (used by tests and ASGI shutdown)."""
+    client = _async_clients.pop(asyncio.get_running_loop(), None)
+    if client is not None:
+        await client.aclose()
+
+
+async def arequest(method: str, url: str, **kwargs) -> httpx.Response:
+    kwargs.setdefault('timeout', DEFAULT_TIMEOUT)
+    return await get_async_client().request(method, url, **kwargs)
+
+
+async def aget(url: str, **kwargs) -> httpx.Response:
+    return await arequest('GET', url, **kwargs)
+
+
+async def apost(url: str, **kwargs) -> httpx.Response:
+    return await arequest('POST', url, **kwargs)
+
+
+async def apatch(url: str, **kwargs) -> httpx.Response:
+    return await arequest('PATCH', url, **kwargs)
+
+
+async def adelete(url: str, **kwargs) -> httpx.Response:
+    return await arequest('DELETE', url, **kwargs)
@@ -0,0 +1,221 @@
+"""Small thread-safe LRU cache with per-entry expiry and hit/miss counters.
+
+``TieredCache`` adds an optional on-disk SQLite tier so entries survive
+restarts and are shared by every worker process on the host.
+"""
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+
+MISSING = object()
+
+
+class TTLCache:
+    """Size-bounded LRU mapping whose entries expire at an absolute time.
+
+    ``expires_at`` values are ``time.time()`` timestamps so they can be taken
+    directly from JWT ``exp`` claims or HTTP cache headers. When the cache is
+    full the least recently used entry is evicted.
+    """
+
+    def __init__(self, maxsize: int = 1024, ttl: float | None = None, clock=time.time):
+        self.maxsize = max(int(maxsize), 1)
+        self.ttl = ttl
+        self._clock = clock
+        self._data: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key, default=None):
+        now = self._clock()
+        with self._lock:
+            entry = self._data.get(key, MISSING)
+            if entry is MISSING:
+                self.misses += 1
+                return default
+            value, expires_at = entry
+            if expires_at is not None and expires_at <= now:
+                del self._data[key]
+                self.expirations += 1
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key, value, expires_at: float | None = None):
+        if expires_at is None and self.ttl is not None:
+            expires_at = self._clock() + self.ttl
+        with self._lock:
+            if key in self._data:
+                self._data.move_to_end(key)
+            self._data[key] = (value, expires_at)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def pop(self, key, default=None):
+        with self._lock:
+            entry = self._data.pop(key, MISSING)
+        return default if entry is MISSING else entry[0]
+
+    def purge_expired(self) -> int:
+        now = self._clock()
+        with self._lock:
+            expired = [k for k, (_, exp) in self._data.items() if exp is not None and exp <= now]
+            for k in expired:
+                del self._data[k]
+            self.expirations += len(expired)
+        return len(expired)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'size': len(self._data),
+                'maxsize': self.maxsize,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'expirations': self.expirations,
+                'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0,
+            }
+
+
+class SQLiteTTLStore:
+    """JSON values with absolute expiry in a SQLite file (one table per store)."""
+
+    def __init__(self, path, table: str = 'cache'):
+        self.path = Path(path)
+        self.table = table
+        self._local = threading.local()
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None and self._local.pid == os.getpid():
+            return conn
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(str(self.path), timeout=5, isolation_level=None)
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA synchronous=NORMAL')
+        conn.execute(
+            f'CREATE TABLE IF NOT EXISTS "{self.table}" '
+            '(key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL)'
+        )
+        conn.execute(f'CREATE INDEX IF NOT EXISTS "{self.table}_expires_at" ON "{self.table}" (expires_at)')
+        self._local.conn = conn
+        self._local.pid = os.getpid()
+        return conn
+
+    def get(self, key: str, now: float):
+        """``(value, expires_at)`` or ``MISSING``; expired rows are deleted."""
+        row = self._conn().execute(
+            f'SELECT value, expires_at FROM "{self.table}" WHERE key = ?', (key,)
+        ).fetchone()
+        if row is None:
+            return MISSING
+        value, expires_at = row
+        if expires_at is not None and expires_at <= now:
+            self._conn().execute(f'DELETE FROM "{self.table}" WHERE key = ?', (key,))
+            return MISSING
+        return json.loads(value), expires_at
+
+    def set(self, key: str, value, expires_at: float | None):
+        self._conn().execute(
+            f'INSERT OR REPLACE INTO "{self.table}" (key, value, expires_at) VALUES (?, ?, ?)',
+            (key, json.dumps(value, ensure_ascii=False), expires_at),
+        )
+
+    def purge_expired(self, now: float) -> int:
+        cur = self._conn().execute(
+            f'DELETE FROM "{self.table}" WHERE expires_at IS NOT NULL AND expires_at <= ?', (now,)
+        )
+        return cur.rowcount
+
+
+class TieredCache:
+    """In-process ``TTLCache`` in front of an optional ``SQLiteTTLStore``.
+
+    Disk errors are swallowed: the disk tier is an optimization, never a
+    reason to fail a request. Values must be JSON-serializable. Expired
+    entries are deleted from both tiers by the first ``set`` after every
+    ``purge_interval`` seconds, so the SQLite file does not grow forever.
+    """
+
+    def __init__(self, maxsize: int = 1024, ttl: float | None = None, path=None, table: str = 'cache', clock=time.time,
+                 purge_interval: float = 3600.0):
+        self.memory = TTLCache(maxsize=maxsize, ttl=ttl, clock=clock)
+        self.disk = SQLiteTTLStore(path, table) if path else None
+        self.ttl = ttl
+        self.purge_interval = purge_interval
+        self._clock = clock
+        self._next_purge = 0.0  # first write also clears rows left expired by earlier runs
+        self.disk_hits = 0
+        self.disk_errors = 0
+        self.purged = 0
+
+    def get(self, key, default=None):
+        value = self.memory.get(key, MISSING)
+        if value is not MISSING:
+            return value
+        if self.disk is None:
+            return default
+        try:
+            entry = self.disk.get(key, self._clock())
+        except (sqlite3.Error, OSError):
+            self.disk_errors += 1
+            return default
+        if entry is MISSING:
+            return default
+        value, expires_at = entry
+        self.disk_hits += 1
+        self.memory.set(key, value, expires_at)
+        return value
+
+    def set(self, key, value, ttl: float | None = None):
+        ttl = self.ttl if ttl is None else ttl
+        expires_at = self._clock() + ttl if ttl is not None else None
+        self.memory.set(key, value, expires_at)
+        if self.disk is not None:
+            try:
+                self.disk.set(key, value, expires_at)
+            except (sqlite3.Error, OSError):
+                self.disk_errors += 1
+        if self._clock() >= self._next_purge:
+            self.purge_expired()
+
+    def purge_expired(self) -> int:
+        """Delete expired entries from both tiers; returns how many disk rows went."""
+        now = self._clock()
+        self._next_purge = now + self.purge_interval
+        self.memory.purge_expired()
+        if self.disk is None:
+            return 0
+        try:
+            removed = self.disk.purge_expired(now)
+        except (sqlite3.Error, OSError):
+            self.disk_errors += 1
+            return 0
+        self.purged += removed
+        return removed
+
+    def stats(self) -> dict:
+        stats = self.memory.stats()
+        stats['disk_hits'] = self.disk_hits
+        stats['disk_errors'] = self.disk_errors
+        stats['disk_purged'] = self.purged
+        return stats
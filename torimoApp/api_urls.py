@@ -1,9 +1,10 @@
-from django.urls import include, path
+from django.conf import settings
+from django.urls import include, path, re_path
 from rest_framework.routers import DefaultRouter
 from .api_views import (
     ExerciseViewSet, MealViewSet, DailyLogViewSet,
     analyze_nutrition, analyze_nutrition_image,
-    suggest_nutrition, assistant_chat, assistant_status, search_foods,
+    suggest_nutrition, assistant_chat, assistant_status, search_foods, food_data_ready,
     notes_collection, note_detail, user_profile_view, barcode_meal_create,
     contact_support,
 )
@@ -27,6 +28,7 @@ urlpatterns = [
     path('assistant/status/', assistant_status, name='assistant-status'),
     # Provide a slashless variant to avoid 404 when client forgets trailing slash
     path('assistant/status', assistant_status, name='assistant-status-no-slash'),
+    path('health/ready/', food_data_ready, name='health-ready'),
     path('support/contact/', contact_support, name='support-contact'),
     path('support/contact', contact_support, name='support-contact-no-slash'),
     path('notes/', notes_collection, name='notes-collection'),
@@ -34,3 +36,23 @@ urlpatterns = [
     path('user-profiles/', user_profile_view, name='userprofile-create'),
     path('meals/barcode/', barcode_meal_create, name='meals-barcode-create'),
 ]
+
+if settings.ASYNC_API_VIEWS:
+    from . import async_views
+
+    # Same paths as the sync routes above; listed first so they take precedence.
+    # The router stays in place for its API root and format-suffix routes.
+    async_urlpatterns = [
+        re_path(r'^meals/barcode/?$', async_views.barcode_meal_create, name='meals-barcode-create-async'),
+        path('nutrition/vision-analyze/', async_views.analyze_nutrition_image, name='nutrition-vision-analyze-async'),
+        path('assistant/chat/', async_views.assistant_chat, name='assistant-chat-async'),
+        path('notes/', async_views.notes_collection, name='notes-collection-async'),
+        path('notes/<str:note_id>/', async_views.note_detail, name='notes-detail-async'),
+        path('user-profiles/', async_views.user_profile_view, name='userprofile-create-async'),
+    ]
+    for prefix, proxy in (('exercises', async_views.exercises), ('meals', async_views.meals), ('logs', async_views.daily_logs)):
+        async_urlpatterns += [
+            re_path(rf'^{prefix}/?$', proxy.collection, name=f'{prefix}-list-async'),
+            re_path(rf'^{prefix}/(?P<pk>[^/.]+)/?$', proxy.detail, name=f'{prefix}-detail-async'),
+        ]
+    urlpatterns = async_urlpatterns + urlpatterns
@@ -5,7 +5,14 @@ from rest_framework.response import Response
 import os
 import re
 import csv
-import difflib
+import codecs
+import hashlib
+import math
+import threading
+import time
+import unicodedata
+from concurrent.futures import ThreadPoolExecutor, wait
+from functools import lru_cache
 from pathlib import Path
 import requests
 import json
@@ -13,11 +20,21 @@ from datetime import datetime
 import base64
 from dotenv import load_dotenv
 from django.conf import settings
+from django.core.cache import caches
 from django.core.mail import EmailMessage
+from django.http import StreamingHttpResponse
+from django.utils.http import parse_etags
+from torimo import gemini_client, image_prep, rate_limit, supabase_http
+from torimo.rate_limit import Overloaded
+from torimo.ttl_cache import MISSING, TieredCache
+from . import food_index
+from .food_index import Autocomplete, FoodData, FoodIndex
+from .nutrients import FoodRecord, NutrientTable, macro_totals, scale_macros
 from torimo.middleware.supabase_auth import (
     require_supabase_auth,
     ensure_supabase_user,
     SupabaseTokenError,
+    token_cache_stats,
 )
 
 # Ensure .env is loaded even if settings.py hasn't loaded it yet (defensive)
@@ -195,6 +212,16 @@ class SupabaseProxyViewSet(viewsets.ViewSet):
             params['order'] = f'{self.order_column}.desc'
         return params
 
+    def check_supabase_user(self, request, report_token: bool = True):
+        """Raise AuthenticationFailed unless the middleware attached a Supabase user."""
+        if getattr(request, 'supabase_user_id', None):
+            return
+        detail = getattr(request, 'supabase_auth_error', None) or 'Supabase authentication required.'
+        if report_token:
+            token_seen = getattr(request, '_supabase_auth_middleware_seen_token', None)
+            detail = f"{detail} (token_seen={token_seen})"
+        raise exceptions.AuthenticationFailed(detail)
+
     def prepare_payload(self, request, payload, create=False):
         data = dict(payload or {})
         user_id = getattr(request, 'supabase_user_id', None)
@@ -203,17 +230,12 @@ class SupabaseProxyViewSet(viewsets.ViewSet):
         return data
 
     def list(self, request):
-        if not getattr(request, 'supabase_user_id', None):
-            auth_error = getattr(request, 'supabase_auth_error', None)
-            token_seen = getattr(request, '_supabase_auth_middleware_seen_token', None)
-            detail = auth_error or 'Supabase authentication required.'
-            detail = f"{detail} (token_seen={token_seen})"
-            raise exceptions.AuthenticationFailed(detail)
+        self.check_supabase_user(request)
         headers = _build_user_headers(request)
         params = self.build_list_params(request)
         try:
-            resp = requests.get(self._table_url(), headers=headers, params=params, timeout=8)
-        except requests.RequestException:
+            resp = supabase_http.get(self._table_url(), headers=headers, params=params, timeout=8)
+        except supabase_http.SupabaseHTTPError:
             raise exceptions.APIException('Failed to reach Supabase REST API.')
 
         if resp.status_code != 200:
@@ -221,17 +243,12 @@ class SupabaseProxyViewSet(viewsets.ViewSet):
         return Response(resp.json())
 
     def retrieve(self, request, pk=None):
-        if not getattr(request, 'supabase_user_id', None):
-            auth_error = getattr(request, 'supabase_auth_error', None)
-            token_seen = getattr(request, '_supabase_auth_middleware_seen_token', None)
-            detail = auth_error or 'Supabase authentication required.'
-            detail = f"{detail} (token_seen={token_seen})"
-            raise exceptions.AuthenticationFailed(detail)
+        self.check_supabase_user(request)
         headers = _build_user_headers(request)
         params = {'select': '*', 'id': f'eq.{pk}', 'limit': '1'}
         try:
-            resp = requests.get(self._table_url(), headers=headers, params=params, timeout=8)
-        except requests.RequestException:
+            resp = supabase_http.get(self._table_url(), headers=headers, params=params, timeout=8)
+        except supabase_http.SupabaseHTTPError:
             raise exceptions.APIException('Failed to reach Supabase REST API.')
 
         if resp.status_code != 200:
@@ -242,17 +259,12 @@ class SupabaseProxyViewSet(viewsets.ViewSet):
         return Response(rows[0])
 
     def create(self, request):
-        if not getattr(request, 'supabase_user_id', None):
-            auth_error = getattr(request, 'supabase_auth_error', None)
-            token_seen = getattr(request, '_supabase_auth_middleware_seen_token', None)
-            detail = auth_error or 'Supabase authentication required.'
-            detail = f"{detail} (token_seen={token_seen})"
-            raise exceptions.AuthenticationFailed(detail)
+        self.check_supabase_user(request)
         headers = _build_user_headers(request, 'return=representation')
         payload = self.prepare_payload(request, request.data, create=True)
         try:
-            resp = requests.post(self._table_url(), headers=headers, json=[payload], timeout=8)
-        except requests.RequestException:
+            resp = supabase_http.post(self._table_url(), headers=headers, json=[payload], timeout=8)
+        except supabase_http.SupabaseHTTPError:
             raise exceptions.APIException('Failed to reach Supabase REST API.')
 
         if resp.status_code not in (200, 201):
@@ -261,18 +273,13 @@ class SupabaseProxyViewSet(viewsets.ViewSet):
         return Response(rows[0] if rows else payload, status=status.HTTP_201_CREATED)
 
     def partial_update(self, request, pk=None):
-        if not getattr(request, 'supabase_user_id', None):
-            auth_error = getattr(request, 'supabase_auth_error', None)
-            token_seen = getattr(request, '_supabase_auth_middleware_seen_token', None)
-            detail = auth_error or 'Supabase authentication required.'
-            detail = f"{detail} (token_seen={token_seen})"
-            raise exceptions.AuthenticationFailed(detail)
+        self.check_supabase_user(request)
         headers = _build_user_headers(request, 'return=representation')
         payload = self.prepare_payload(request, request.data)
         params = {'id': f'eq.{pk}'}
         try:
-            resp = requests.patch(self._table_url(), headers=headers, params=params, json=payload, timeout=8)
-        except requests.RequestException:
+            resp = supabase_http.patch(self._table_url(), headers=headers, params=params, json=payload, timeout=8)
+        except supabase_http.SupabaseHTTPError:
             raise exceptions.APIException('Failed to reach Supabase REST API.')
 
         if resp.status_code not in (200, 204):
@@ -283,14 +290,12 @@ class SupabaseProxyViewSet(viewsets.ViewSet):
         return Response(rows[0] if rows else payload)
 
     def destroy(self, request, pk=None):
-        if not getattr(request, 'supabase_user_id', None):
-            auth_error = getattr(request, 'supabase_auth_error', None)
-            raise exceptions.AuthenticationFailed(auth_error or 'Supabase authentication required.')
+        self.check_supabase_user(request, report_token=False)
         headers = _build_user_headers(request)
         params = {'id': f'eq.{pk}'}
         try:
-            resp = requests.delete(self._table_url(), headers=headers, params=params, timeout=8)
-        except requests.RequestException:
+            resp = supabase_http.delete(self._table_url(), headers=headers, params=params, timeout=8)
+        except supabase_http.SupabaseHTTPError:
             raise exceptions.APIException('Failed to reach Supabase REST API.')
 
         if resp.status_code not in (200, 204):
@@ -330,34 +335,18 @@ def barcode_meal_create(request):
     if not supabase_user_id:
         return Response({'detail': 'Supabase authentication is required.'}, status=status.HTTP_401_UNAUTHORIZED)
 
-    data = serializer.validated_data
-    payload = {
-        'barcode': data['barcode'],
-        'name': data['name'],
-        'calories': int(data['calories']),
-        'protein': float(data['protein']),
-        'fat': float(data['fat']),
-        'carbs': float(data['carbs']),
-        'category': data['category'],
-        'consumed_at': data['consumed_at'].isoformat(),
-        'serving_grams': float(data['serving_grams']) if data.get('serving_grams') is not None else None,
-        'source': 'barcode',
-        'user_id': supabase_user_id,
-    }
-    if payload['serving_grams'] is None:
-        payload.pop('serving_grams')
-
+    payload = _barcode_meal_payload(serializer.validated_data, supabase_user_id)
     headers = _build_user_headers(request, 'return=representation')
 
     def _post(payload_override):
         try:
-            return requests.post(
+            return supabase_http.post(
                 _supabase_table_url(MEALS_TABLE),
                 headers=headers,
                 json=[payload_override],
                 timeout=8,
             )
-        except requests.RequestException:
+        except supabase_http.SupabaseHTTPError:
             raise exceptions.APIException('Supabase REST API との通信に失敗しました')
 
     attempt_payload = dict(payload)
@@ -371,8 +360,7 @@ def barcode_meal_create(request):
 
     if resp.status_code not in (200, 201):
         error_detail = _supabase_error(resp)
-        lower_detail = (error_detail or '').lower()
-        if _BARCODE_COLUMN_AVAILABLE and 'barcode' in lower_detail and 'column' in lower_detail:
+        if _BARCODE_COLUMN_AVAILABLE and _is_missing_barcode_column(error_detail):
             _BARCODE_COLUMN_AVAILABLE = False
             attempt_payload.pop('barcode', None)
             try:
@@ -388,6 +376,30 @@ def barcode_meal_create(request):
     return Response(rows[0] if rows else payload, status=status.HTTP_201_CREATED)
 
 
+def _barcode_meal_payload(data: dict, supabase_user_id) -> dict:
+    payload = {
+        'barcode': data['barcode'],
+        'name': data['name'],
+        'calories': int(data['calories']),
+        'protein': float(data['protein']),
+        'fat': float(data['fat']),
+        'carbs': float(data['carbs']),
+        'category': data['category'],
+        'consumed_at': data['consumed_at'].isoformat(),
+        'serving_grams': float(data['serving_grams']) if data.get('serving_grams') is not None else None,
+        'source': 'barcode',
+        'user_id': supabase_user_id,
+    }
+    if payload['serving_grams'] is None:
+        payload.pop('serving_grams')
+    return payload
+
+
+def _is_missing_barcode_column(error_detail) -> bool:
+    lower_detail = (error_detail or '').lower()
+    return 'barcode' in lower_detail and 'column' in lower_detail
+
+
 @api_view(['GET', 'POST'])
 @require_supabase_auth
 def user_profile_view(request):
@@ -398,13 +410,13 @@ def user_profile_view(request):
     if request.method == 'GET':
         params = {'select': '*', 'supabase_user_id': f'eq.{supabase_user_id}', 'limit': '1'}
         try:
-            resp = requests.get(
+            resp = supabase_http.get(
                 _supabase_table_url(PROFILES_TABLE),
                 headers=_build_user_headers(request),
                 params=params,
                 timeout=8,
             )
-        except requests.RequestException:
+        except supabase_http.SupabaseHTTPError:
             return Response({'detail': 'Supabase REST API との通信に失敗しました'}, status=status.HTTP_502_BAD_GATEWAY)
 
         if resp.status_code != 200:
@@ -414,8 +426,27 @@ def user_profile_view(request):
             return Response({'detail': 'Profile not found.'}, status=status.HTTP_404_NOT_FOUND)
         return Response({'profile': rows[0]})
 
-    data = request.data or {}
+    payload = _profile_payload(request.data or {}, supabase_user_id)
+    try:
+        resp = supabase_http.post(
+            _supabase_table_url(PROFILES_TABLE),
+            headers=_build_user_headers(request, 'return=representation,resolution=merge-duplicates'),
+            params={'on_conflict': 'supabase_user_id'},
+            json=[payload],
+            timeout=8,
+        )
+    except supabase_http.SupabaseHTTPError:
+        return Response({'detail': 'Supabase REST API との通信に失敗しました'}, status=status.HTTP_502_BAD_GATEWAY)
+
+    if resp.status_code not in (200, 201):
+        return Response({'detail': _supabase_error(resp)}, status=status.HTTP_502_BAD_GATEWAY)
+
+    rows = resp.json() or []
+    created = resp.status_code == 201
+    return Response({'created': created, 'profile': rows[0] if rows else payload}, status=status.HTTP_201_CREATED if created else status.HTTP_200_OK)
+
 
+def _profile_payload(data, supabase_user_id) -> dict:
     def num_or_none(value, cast=float):
         if value in (None, ''):
             return None
@@ -437,25 +468,7 @@ def user_profile_view(request):
         'agreed_to_terms': bool(data.get('agreed_to_terms')),
     }
 
-    payload = {k: v for k, v in payload.items() if v is not None}
-
-    try:
-        resp = requests.post(
-            _supabase_table_url(PROFILES_TABLE),
-            headers=_build_user_headers(request, 'return=representation,resolution=merge-duplicates'),
-            params={'on_conflict': 'supabase_user_id'},
-            json=[payload],
-            timeout=8,
-        )
-    except requests.RequestException:
-        return Response({'detail': 'Supabase REST API との通信に失敗しました'}, status=status.HTTP_502_BAD_GATEWAY)
-
-    if resp.status_code not in (200, 201):
-        return Response({'detail': _supabase_error(resp)}, status=status.HTTP_502_BAD_GATEWAY)
-
-    rows = resp.json() or []
-    created = resp.status_code == 201
-    return Response({'created': created, 'profile': rows[0] if rows else payload}, status=status.HTTP_201_CREATED if created else status.HTTP_200_OK)
+    return {k: v for k, v in payload.items() if v is not None}
 
 
 # ---------------- Nutrition Analysis (text-based) -----------------
@@ -518,43 +531,49 @@ ITEM_BASE_WEIGHTS = {
 }
 
 
+# Name normalization runs for every row, alias and query inside the lookup
+# loops, so the patterns are compiled once and the entry points memoized.
+NORMALIZE_CACHE_SIZE = 1 << 16
+_SPACES_RE = re.compile(r'[\s\u3000]+')
+_CANON_SEPARATORS_RE = re.compile(r'[\s\u3000・._\-—－‐]+')
+_ALIAS_SEPARATORS_RE = re.compile(r'[\s\u3000・_\-—－‐]+')
+
+# Common replacements / expansions, applied in order: later rules see the
+# output of earlier ones, so this cannot be collapsed into a single pass.
+CANONICAL_REPLACEMENTS = (
+    ('ごはん', 'ご飯'), ('白ごはん', 'ご飯'), ('白飯', 'ご飯'), ('ライス', 'ご飯'), ('飯', 'ご飯'),
+    ('焼鳥', '焼き鳥'), ('やきとり', '焼き鳥'), ('やき鳥', '焼き鳥'), ('焼きとり', '焼き鳥'),
+    ('チキンステーキ', '鶏肉ステーキ'), ('みそスープ', 'みそ汁'), ('味噌スープ', 'みそ汁'),
+    ('鶏胸', '鶏胸肉'), ('鶏むね肉', '鶏胸肉'), ('胸肉', '鶏胸肉'),
+    ('鶏もも', '鶏もも肉'), ('もも肉', '鶏もも肉'), ('ささみ', '鶏ささみ'),
+    ('挽肉', 'ひき肉'), ('ﾐﾝﾁ', 'ミンチ'), ('ミンチ', 'ひき肉'),
+)
+# A rule can only fire on text containing one of the keys, and replacements
+# never create a key from nothing, so one search decides whether to run them.
+_CANON_KEYS_RE = re.compile('|'.join(re.escape(k) for k, _ in CANONICAL_REPLACEMENTS))
+
+
+@lru_cache(maxsize=NORMALIZE_CACHE_SIZE)
 def normalize_food_name(name: str) -> str:
     if not name:
         return ''
     # Lowercase, strip, fullwidth -> ascii where safe
-    s = name.strip().lower()
-    try:
-        import unicodedata
-        s = unicodedata.normalize('NFKC', s)
-    except Exception:
-        pass
+    s = unicodedata.normalize('NFKC', name.strip().lower())
     # remove internal spaces (including Japanese space) to unify variants with/without space
-    s = re.sub(r'[\s\u3000]+', '', s)
-    return s
+    return _SPACES_RE.sub('', s)
 
 
+@lru_cache(maxsize=NORMALIZE_CACHE_SIZE)
 def canonicalize_name(name: str) -> str:
     if not name:
         return ''
-    try:
-        import unicodedata
-        s = unicodedata.normalize('NFKC', name.strip())
-    except Exception:
-        s = name.strip()
+    s = unicodedata.normalize('NFKC', name.strip())
     # Remove spaces & punctuation that commonly vary in user input
-    s = re.sub(r'[\s\u3000・._\-—－‐]+', '', s)
-    # Common replacements / expansions
-    repl = {
-        'ごはん': 'ご飯', '白ごはん': 'ご飯', '白飯': 'ご飯', 'ライス': 'ご飯', '飯': 'ご飯',
-        '焼鳥': '焼き鳥', 'やきとり': '焼き鳥', 'やき鳥': '焼き鳥', '焼きとり': '焼き鳥',
-        'チキンステーキ': '鶏肉ステーキ', 'みそスープ': 'みそ汁', '味噌スープ': 'みそ汁',
-        '鶏胸': '鶏胸肉', '鶏むね肉': '鶏胸肉', '胸肉': '鶏胸肉',
-        '鶏もも': '鶏もも肉', 'もも肉': '鶏もも肉', 'ささみ': '鶏ささみ',
-        '挽肉': 'ひき肉', 'ﾐﾝﾁ': 'ミンチ', 'ミンチ': 'ひき肉',
-    }
-    for k, v in repl.items():
-        if k in s:
-            s = s.replace(k, v)
+    s = _CANON_SEPARATORS_RE.sub('', s)
+    if _CANON_KEYS_RE.search(s):
+        for k, v in CANONICAL_REPLACEMENTS:
+            if k in s:
+                s = s.replace(k, v)
     return s
 
 
@@ -623,32 +642,59 @@ def parse_text_to_items(text: str):
     return items
 
 
+# FoodData Central responses are cached in memory and in a local SQLite file
+# (shared by all workers) keyed by the normalized query. Misses ("no foods")
+# are cached too, for a shorter time; transport/HTTP errors are not cached.
+_fdc_cache_path = os.environ.get('FDC_CACHE_PATH')
+if _fdc_cache_path is None:
+    _fdc_cache_path = str(Path(__file__).resolve().parents[1] / '.cache' / 'fdc_cache.sqlite3')
+FDC_CACHE_TTL = float(os.environ.get('FDC_CACHE_TTL', 30 * 24 * 3600))
+FDC_CACHE_NEGATIVE_TTL = float(os.environ.get('FDC_CACHE_NEGATIVE_TTL', 24 * 3600))
+FDC_CACHE = TieredCache(
+    maxsize=int(os.environ.get('FDC_CACHE_MAXSIZE', 2048)),
+    ttl=FDC_CACHE_TTL,
+    path=_fdc_cache_path or None,
+    table='fdc_search',
+)
+
+
+def _fdc_fetch(name: str, api_key: str):
+    """Query FDC; returns macros, or None when FDC has no match. Raises on transport errors."""
+    r = requests.get(
+        'https://api.nal.usda.gov/fdc/v1/foods/search',
+        params={'query': name, 'pageSize': 1, 'api_key': api_key}, timeout=6
+    )
+    r.raise_for_status()
+    data = r.json()
+    foods = data.get('foods') or []
+    if not foods:
+        return None
+    food = foods[0]
+    nutrients = {n.get('nutrientName'): n.get('value') for n in (food.get('foodNutrients') or [])}
+    # FDC values often per 100g
+    return {
+        'per': '100g',
+        'calories': float(nutrients.get('Energy', 0.0)),
+        'protein': float(nutrients.get('Protein', 0.0)),
+        'fat': float(nutrients.get('Total lipid (fat)', 0.0)),
+        'carbs': float(nutrients.get('Carbohydrate, by difference', 0.0)),
+    }
+
+
 def fdc_lookup(name: str):
     api_key = os.environ.get('FOODDATA_API_KEY')
     if not api_key:
         return None
+    key = normalize_food_name(name)
+    cached = FDC_CACHE.get(key, MISSING)
+    if cached is not MISSING:
+        return dict(cached) if cached else None
     try:
-        r = requests.get(
-            'https://api.nal.usda.gov/fdc/v1/foods/search',
-            params={'query': name, 'pageSize': 1, 'api_key': api_key}, timeout=6
-        )
-        r.raise_for_status()
-        data = r.json()
-        foods = data.get('foods') or []
-        if not foods:
-            return None
-        food = foods[0]
-        nutrients = {n.get('nutrientName'): n.get('value') for n in (food.get('foodNutrients') or [])}
-        # FDC values often per 100g
-        return {
-            'per': '100g',
-            'calories': float(nutrients.get('Energy', 0.0)),
-            'protein': float(nutrients.get('Protein', 0.0)),
-            'fat': float(nutrients.get('Total lipid (fat)', 0.0)),
-            'carbs': float(nutrients.get('Carbohydrate, by difference', 0.0)),
-        }
+        data = _fdc_fetch(name, api_key)
     except Exception:
         return None
+    FDC_CACHE.set(key, data, ttl=FDC_CACHE_TTL if data else FDC_CACHE_NEGATIVE_TTL)
+    return dict(data) if data else None
 
 
 def offline_lookup(name: str):
@@ -674,43 +720,182 @@ def offline_lookup(name: str):
     return None
 
 
+# Loaded lazily by get_food_data(); the CSV_*/ALIAS_* names mirror FOOD_DATA's
+# fields for existing callers.
+FOOD_DATA = None
+_food_data_lock = threading.Lock()
 CSV_CACHE = None
 CSV_MATCH_INDEX = None
+CSV_INDEX = None
 ALIAS_MAP = None
 ALIAS_NORM = None
+ALIAS_INDEX = None
+ALIAS_KEYS = None
+
+# Compiled dataset snapshot (pickle) reused across restarts while the source
+# files are unchanged. Set FOOD_SNAPSHOT_PATH to an empty string to disable.
+FOOD_SNAPSHOT_PATH = os.environ.get('FOOD_SNAPSHOT_PATH')
+if FOOD_SNAPSHOT_PATH is None:
+    FOOD_SNAPSHOT_PATH = str(Path(__file__).resolve().parents[1] / '.cache' / 'food_snapshot.pickle')
+
+# Hot reload: at most every N seconds a request re-stats the source files and,
+# if any changed, a background thread rebuilds the dataset and swaps it in.
+# 0 disables the check.
+FOOD_DATA_RELOAD_INTERVAL = float(os.environ.get('FOOD_DATA_RELOAD_INTERVAL', 5))
+_food_data_reload_lock = threading.Lock()
+_food_data_checked_at = 0.0
 
 
 def _gemini_configured():
+    return gemini_client.configured()
+
+
+# Memo of deterministic Gemini calls (name normalization / text parsing),
+# content-addressed by model + generation config + prompt.
+_gemini_cache_path = os.environ.get('GEMINI_CACHE_PATH')
+if _gemini_cache_path is None:
+    _gemini_cache_path = str(Path(__file__).resolve().parents[1] / '.cache' / 'gemini_cache.sqlite3')
+GEMINI_CACHE = TieredCache(
+    maxsize=int(os.environ.get('GEMINI_CACHE_MAXSIZE', 2048)),
+    ttl=float(os.environ.get('GEMINI_CACHE_TTL', 7 * 24 * 3600)),
+    path=_gemini_cache_path or None,
+    table='gemini_text',
+)
+
+# Admission control for Gemini calls (cache hits skip it): GEMINI_RATE_LIMIT
+# calls/s with GEMINI_RATE_BURST burst, at most GEMINI_QUEUE_SIZE callers
+# waiting up to GEMINI_QUEUE_TIMEOUT s; beyond that callers get 503.
+# GEMINI_RATE_LIMIT_PATH shares the bucket between processes via SQLite.
+GEMINI_LIMITER = rate_limit.limiter_from_env('GEMINI')
+
+
+def _gemini_busy(exc: Overloaded) -> tuple[dict, dict]:
+    """``(body, headers)`` of the 503 answered when ``GEMINI_LIMITER`` sheds a request."""
+    retry_after = max(1, math.ceil(exc.retry_after))
+    return {'error': 'gemini_busy', 'detail': exc.reason}, {'Retry-After': str(retry_after)}
+
+
+def _gemini_busy_response(exc: Overloaded) -> Response:
+    body, headers = _gemini_busy(exc)
+    return Response(body, status=status.HTTP_503_SERVICE_UNAVAILABLE, headers=headers)
+
+
+def _gemini_cache_key(model_name: str, temperature: float, max_output_tokens: int | None, prompt: str) -> str:
+    raw = json.dumps([model_name, temperature, max_output_tokens, prompt], ensure_ascii=False)
+    return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+
+def _gemini_model_name(model_env: str, default_model: str) -> str:
+    model_name = os.environ.get(model_env, default_model)
+    # Normalize possible Vertex-style names like "models/gemini-2.5-pro"
+    if isinstance(model_name, str) and model_name.startswith('models/'):
+        model_name = model_name.split('/', 1)[1]
+    return model_name
+
+
+def _gemini_model(model_name: str, generation_config: dict | None = None):
+    return gemini_client.get_model(model_name, generation_config)
+
+
+def _gemini_generation_config(temperature: float, max_output_tokens: int | None) -> dict | None:
+    if max_output_tokens is None:
+        return None
+    return {'max_output_tokens': max_output_tokens, 'temperature': temperature}
+
+
+def _gemini_generate_text(prompt: str, model_env: str = 'GEMINI_MODEL_TEXT', default_model: str = 'gemini-1.5-flash', temperature: float = 0.4, max_output_tokens: int | None = 720, cache: bool = False, max_wait: float | None = None) -> str | None:
+    """Generate text with Gemini. ``cache=True`` memoizes non-empty replies (use for low-temperature prompts).
+
+    Waits at most ``max_wait`` s (default ``GEMINI_QUEUE_TIMEOUT``) for a
+    ``GEMINI_LIMITER`` slot and raises ``Overloaded`` when shed.
+    """
+    if not _gemini_configured():
+        return None
+    model_name = _gemini_model_name(model_env, default_model)
+    cache_key = _gemini_cache_key(model_name, temperature, max_output_tokens, prompt) if cache else None
+    if cache_key:
+        cached = GEMINI_CACHE.get(cache_key)
+        if cached:
+            return cached
+    GEMINI_LIMITER.acquire(max_wait)
     try:
-        import google.generativeai as _genai  # type: ignore
-        _ = _genai
+        model = _gemini_model(model_name, _gemini_generation_config(temperature, max_output_tokens))
+        resp = model.generate_content(prompt)
+        text = (getattr(resp, 'text', None) or '').strip()
     except Exception:
-        return False
-    return bool(os.environ.get('GOOGLE_API_KEY'))
+        return None
+    if cache_key and text:
+        GEMINI_CACHE.set(cache_key, text)
+    return text
 
 
-def _gemini_generate_text(prompt: str, model_env: str = 'GEMINI_MODEL_TEXT', default_model: str = 'gemini-1.5-flash', temperature: float = 0.4, max_output_tokens: int | None = 720) -> str | None:
+async def _gemini_generate_text_async(prompt: str, model_env: str = 'GEMINI_MODEL_TEXT', default_model: str = 'gemini-1.5-flash', temperature: float = 0.4, max_output_tokens: int | None = 720, cache: bool = False, max_wait: float | None = None) -> str | None:
+    """``_gemini_generate_text`` for async views, awaiting the SDK's async client."""
     if not _gemini_configured():
         return None
+    model_name = _gemini_model_name(model_env, default_model)
+    cache_key = _gemini_cache_key(model_name, temperature, max_output_tokens, prompt) if cache else None
+    if cache_key:
+        cached = GEMINI_CACHE.get(cache_key)
+        if cached:
+            return cached
+    await GEMINI_LIMITER.acquire_async(max_wait)
     try:
-        import google.generativeai as genai  # type: ignore
-        genai.configure(api_key=os.environ.get('GOOGLE_API_KEY'))
-        model_name = os.environ.get(model_env, default_model)
-        # Normalize possible Vertex-style names like "models/gemini-2.5-pro"
-        if isinstance(model_name, str) and model_name.startswith('models/'):
-            model_name = model_name.split('/', 1)[1]
-        model = genai.GenerativeModel(model_name)
-        kwargs = {}
-        if max_output_tokens is not None:
-            kwargs['generation_config'] = {'max_output_tokens': max_output_tokens, 'temperature': temperature}
-        resp = model.generate_content(prompt, **kwargs)
-        return (getattr(resp, 'text', None) or '').strip()
+        model = _gemini_model(model_name, _gemini_generation_config(temperature, max_output_tokens))
+        resp = await model.generate_content_async(prompt)
+        text = (getattr(resp, 'text', None) or '').strip()
     except Exception:
         return None
+    if cache_key and text:
+        GEMINI_CACHE.set(cache_key, text)
+    return text
+
+
+def _gemini_chunk_text(chunk) -> str:
+    try:
+        return chunk.text or ''
+    except ValueError:  # chunk without text parts (e.g. the final safety/finish chunk)
+        return ''
+
+
+def _gemini_stream_text(prompt: str, model_env: str = 'GEMINI_MODEL_TEXT', default_model: str = 'gemini-1.5-flash', temperature: float = 0.4, max_output_tokens: int | None = 720):
+    """Yield Gemini's reply in chunks as they are generated; yields nothing if Gemini is unavailable or fails first.
+
+    Runs lazily inside the response, so the view acquires ``GEMINI_LIMITER`` before starting it.
+    """
+    if not _gemini_configured():
+        return
+    try:
+        model = _gemini_model(_gemini_model_name(model_env, default_model), _gemini_generation_config(temperature, max_output_tokens))
+        stream = model.generate_content(prompt, stream=True)
+        for chunk in stream:
+            text = _gemini_chunk_text(chunk)
+            if text:
+                yield text
+    except Exception:
+        return
+
+
+async def _gemini_stream_text_async(prompt: str, model_env: str = 'GEMINI_MODEL_TEXT', default_model: str = 'gemini-1.5-flash', temperature: float = 0.4, max_output_tokens: int | None = 720):
+    """``_gemini_stream_text`` for async views."""
+    if not _gemini_configured():
+        return
+    try:
+        model = _gemini_model(_gemini_model_name(model_env, default_model), _gemini_generation_config(temperature, max_output_tokens))
+        stream = await model.generate_content_async(prompt, stream=True)
+        async for chunk in stream:
+            text = _gemini_chunk_text(chunk)
+            if text:
+                yield text
+    except Exception:
+        return
 
 
 def ai_parse_text_to_items(text: str):
-    """Use Gemini to parse items from free text. Return list of {name, quantity, unit}."""
+    """Use Gemini to parse items from free text. Return list of {name, quantity, unit}.
+
+    Raises ``Overloaded`` when the Gemini limiter sheds the call.
+    """
     if not text or not _gemini_configured():
         return []
     instruction = (
@@ -720,7 +905,7 @@ def ai_parse_text_to_items(text: str):
         "If unit is missing, leave unit empty and quantity null. Output ONLY JSON."
     )
     prompt = f"{instruction}\nText: {text}\nReturn JSON with shape: {{\"items\":[{{\"name\":\"\",\"quantity\":null,\"unit\":\"\"}}]}}"
-    content = _gemini_generate_text(prompt, model_env='GEMINI_MODEL_TEXT', default_model='gemini-1.5-flash', temperature=0.2, max_output_tokens=400) or ''
+    content = _gemini_generate_text(prompt, model_env='GEMINI_MODEL_TEXT', default_model='gemini-1.5-flash', temperature=0.2, max_output_tokens=400, cache=True) or ''
     try:
         data = json.loads(content) if content else {}
     except Exception:
@@ -741,8 +926,8 @@ def ai_parse_text_to_items(text: str):
     return out
 
 
-def ai_normalize_name(name: str) -> str | None:
-    """Use Gemini to output a single canonical Japanese food name."""
+def ai_normalize_name(name: str, max_wait: float | None = None) -> str | None:
+    """Use Gemini to output a single canonical Japanese food name; None if unknown or shed by the limiter."""
     if not name or not _gemini_configured():
         return None
     instruction = (
@@ -750,16 +935,42 @@ def ai_normalize_name(name: str) -> str | None:
         "Normalize spacing and script variants (e.g., ライス→ご飯, 焼鳥→焼き鳥)."
     )
     prompt = f"{instruction}\nName: {name}\nOutput only the canonical Japanese food name."
-    content = _gemini_generate_text(prompt, model_env='GEMINI_MODEL_TEXT', default_model='gemini-1.5-flash', temperature=0.0, max_output_tokens=16) or ''
+    try:
+        content = _gemini_generate_text(prompt, model_env='GEMINI_MODEL_TEXT', default_model='gemini-1.5-flash', temperature=0.0, max_output_tokens=16, cache=True, max_wait=max_wait) or ''
+    except Overloaded:
+        return None
     return content.strip() or None
 
 
+CHAT_FAILED_REPLY = "回答生成に失敗しました。後で再度お試しください。"
+CHAT_GENERATION = {'model_env': 'GEMINI_MODEL_TEXT', 'default_model': 'gemini-1.5-flash', 'temperature': 0.4, 'max_output_tokens': 720}
+
+
 def ai_profile_chat(messages: list[dict], profile: dict) -> str:
     """Generate a nutrition assistant reply using Gemini. Falls back to rule-based text if key/model unavailable.
 
     messages: list of {role: 'user'|'assistant', content: '...'}
     profile: {age?, gender?, height_cm?, weight_kg?, goal_calories?}
+    Raises ``Overloaded`` when the Gemini limiter sheds the call.
     """
+    prompt, fallback = _profile_chat_prompt(messages, profile)
+    if fallback is not None:
+        return fallback
+    content = _gemini_generate_text(prompt, **CHAT_GENERATION) or ''
+    return content or CHAT_FAILED_REPLY
+
+
+async def ai_profile_chat_async(messages: list[dict], profile: dict) -> str:
+    """``ai_profile_chat`` for async views."""
+    prompt, fallback = _profile_chat_prompt(messages, profile)
+    if fallback is not None:
+        return fallback
+    content = await _gemini_generate_text_async(prompt, **CHAT_GENERATION) or ''
+    return content or CHAT_FAILED_REPLY
+
+
+def _profile_chat_prompt(messages: list[dict], profile: dict) -> tuple[str | None, str | None]:
+    """``(prompt, None)`` for Gemini, or ``(None, rule_based_reply)`` when Gemini is not configured."""
     # Build profile summary
     age = profile.get('age')
     gender = profile.get('gender') or '不明'
@@ -790,7 +1001,7 @@ def ai_profile_chat(messages: list[dict], profile: dict) -> str:
             adv.append("バランス: タンパク質25%, 脂質25%, 炭水化物50% を目安に。")
         if not adv:
             adv.append("具体的な目標があれば教えてください。")
-        return f"[ルールベース回答]\n{profile_summary}\n質問: {last_user}\n" + '\n'.join(adv)
+        return None, f"[ルールベース回答]\n{profile_summary}\n質問: {last_user}\n" + '\n'.join(adv)
     system = (
         "You are a Japanese nutrition and meal planning assistant. Provide concise, actionable advice. "
         "Use user's profile to personalize macros and meal suggestions. Respond in Japanese. "
@@ -806,9 +1017,7 @@ def ai_profile_chat(messages: list[dict], profile: dict) -> str:
             prefix = 'ユーザー' if role == 'user' else 'アシスタント'
             convo_lines.append(f"{prefix}: {content}")
     convo_text = '\n'.join(convo_lines)
-    prompt = f"{system}\n{profile_msg}\n会話履歴:\n{convo_text}\n---\n日本語で回答してください。"
-    content = _gemini_generate_text(prompt, model_env='GEMINI_MODEL_TEXT', default_model='gemini-1.5-flash', temperature=0.4, max_output_tokens=720) or ''
-    return content or "回答生成に失敗しました。後で再度お試しください。"
+    return f"{system}\n{profile_msg}\n会話履歴:\n{convo_text}\n---\n日本語で回答してください。", None
 
 
 # ---------------- Supabase-protected Notes API -----------------
@@ -832,7 +1041,7 @@ def notes_collection(request):
     user_id = request.supabase_user_id
     if request.method == 'GET':
         try:
-            resp = requests.get(
+            resp = supabase_http.get(
                 _notes_endpoint(),
                 headers=_build_user_headers(request),
                 params={
@@ -843,7 +1052,7 @@ def notes_collection(request):
             )
         except RuntimeError as exc:
             return Response({'detail': str(exc)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
-        except requests.RequestException:
+        except supabase_http.SupabaseHTTPError:
             return Response({'detail': 'Supabase REST API との通信に失敗しました'}, status=status.HTTP_502_BAD_GATEWAY)
 
         if resp.status_code != 200:
@@ -861,7 +1070,7 @@ def notes_collection(request):
         'user_id': user_id,
     }
     try:
-        resp = requests.post(
+        resp = supabase_http.post(
             _notes_endpoint(),
             headers=_build_user_headers(request, 'return=representation'),
             json=[note_payload],
@@ -869,7 +1078,7 @@ def notes_collection(request):
         )
     except RuntimeError as exc:
         return Response({'detail': str(exc)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
-    except requests.RequestException:
+    except supabase_http.SupabaseHTTPError:
         return Response({'detail': 'Supabase REST API との通信に失敗しました'}, status=status.HTTP_502_BAD_GATEWAY)
 
     if resp.status_code not in (200, 201):
@@ -884,7 +1093,7 @@ def notes_collection(request):
 @require_supabase_auth
 def note_detail(request, note_id: str):
     try:
-        resp = requests.delete(
+        resp = supabase_http.delete(
             _notes_endpoint(),
             headers=_build_user_headers(request),
             params={
@@ -894,7 +1103,7 @@ def note_detail(request, note_id: str):
         )
     except RuntimeError as exc:
         return Response({'detail': str(exc)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
-    except requests.RequestException:
+    except supabase_http.SupabaseHTTPError:
         return Response({'detail': 'Supabase REST API との通信に失敗しました'}, status=status.HTTP_502_BAD_GATEWAY)
 
     if resp.status_code not in (200, 204):
@@ -902,26 +1111,118 @@ def note_detail(request, note_id: str):
     return Response(status=status.HTTP_204_NO_CONTENT)
 
 
-def load_csv_dataset():
-    global CSV_CACHE, CSV_MATCH_INDEX
-    if CSV_CACHE is not None:
-        return CSV_CACHE
-
+def _dataset_csv_path() -> Path | None:
     # Detect dataset path: env var or default data/foods.csv
     root = Path(__file__).resolve().parents[1]
     default_path = root / 'data' / 'foods_custom.csv'
     alt_sample = root / 'data' / 'foods_custom.sample.csv'
     csv_path = os.environ.get('FOOD_CSV_PATH')
     if csv_path:
-        p = Path(csv_path)
-    elif default_path.exists():
-        p = default_path
-    elif alt_sample.exists():
-        p = alt_sample
-    else:
-        CSV_CACHE = []
-        CSV_MATCH_INDEX = []
-        return CSV_CACHE
+        return Path(csv_path)
+    if default_path.exists():
+        return default_path
+    if alt_sample.exists():
+        return alt_sample
+    return None
+
+
+# MEXT standard tables (日本食品標準成分表) CSV layout: title/label rows, then a
+# row of component codes starting with 成分識別子 whose columns are offset by 3
+# from the data rows (食品群, 食品番号, 索引番号, 食品名, REFUSE, ...).
+MEXT_HEADER_SCAN_ROWS = 50
+MEXT_CARB_CODES = ('CHOCDF-', 'CHOAVL', 'CHOAVLM', 'CHOAVLDF-')
+_MEXT_GROUP_RE = re.compile(r'\d{2}')
+_MEXT_ID_RE = re.compile(r'\d+')
+_PLAIN_NUM_RE = re.compile(r'\d+(?:\.\d+)?')
+_NUM_RE = re.compile(r'-?\d+(?:\.\d+)?')
+_PAREN_RE = re.compile(r'\(.*?\)')
+
+
+@lru_cache(maxsize=4096)
+def _parse_mext_marked_num(cell: str) -> float:
+    # Remove parentheses, *, Tr, etc.; '-' / '−' (not detected) count as 0
+    s = cell.replace('Tr', '0').replace('−', '0').replace('-', '0').replace('*', '')
+    m = _NUM_RE.search(_PAREN_RE.sub('', s)) or _NUM_RE.search(s)
+    return float(m.group()) if m else 0.0
+
+
+def _parse_mext_num(cell: str) -> float:
+    cell = cell.strip().strip('"')
+    if _PLAIN_NUM_RE.fullmatch(cell):
+        return float(cell)
+    return _parse_mext_marked_num(cell)
+
+
+def _sniff_csv_encoding(path: Path) -> str:
+    """'utf-8-sig' if the first 64 KiB decode as UTF-8, else 'cp932'."""
+    try:
+        with open(path, 'rb') as fh:
+            head = fh.read(65536)
+        codecs.getincrementaldecoder('utf-8-sig')().decode(head, final=False)
+        return 'utf-8-sig'
+    except UnicodeDecodeError:
+        return 'cp932'
+    except OSError:
+        return 'utf-8-sig'
+
+
+def _read_mext_csv(path: Path, encoding: str, merge_entry) -> bool:
+    """Stream a MEXT standard tables CSV into ``merge_entry``; False if it is not one."""
+    with open(path, encoding=encoding, newline='') as fh:
+        reader = csv.reader(fh)
+        headers = None
+        for _, row in zip(range(MEXT_HEADER_SCAN_ROWS), reader):
+            line = ','.join(row)
+            if '成分識別子' in line and 'ENERC_KCAL' in line:
+                headers = [h.strip().strip('"') for h in row]
+                break
+        if headers is None:
+            return False
+        # Resolve codes to data columns once: data has 3 leading cols before REFUSE
+        idx_map = {h: i + 3 for i, h in enumerate(headers) if h}
+        kcal_col = idx_map.get('ENERC_KCAL')
+        prot_col = idx_map.get('PROT-')
+        fat_col = idx_map.get('FAT-')
+        carb_cols = [idx_map.get(code) for code in MEXT_CARB_CODES]
+
+        def value(cells, col):
+            if col is None or col >= len(cells):
+                return 0.0
+            return _parse_mext_num(cells[col])
+
+        for cells in reader:
+            # Data rows start with 食品群,食品番号,索引番号; skip footer/notes
+            if len(cells) < 10 or not (
+                _MEXT_GROUP_RE.fullmatch(cells[0]) and _MEXT_ID_RE.fullmatch(cells[1]) and _MEXT_ID_RE.fullmatch(cells[2])
+            ):
+                continue
+            name = cells[3].strip().strip('"').strip()
+            if not name:
+                continue
+            # Prefer total carbohydrate (by difference)
+            carbs = 0.0
+            for col in carb_cols:
+                v = value(cells, col)
+                if v > 0:
+                    carbs = v
+                    break
+            merge_entry(name, {
+                'per': '100g',
+                'calories': value(cells, kcal_col),
+                'protein': value(cells, prot_col),
+                'fat': value(cells, fat_col),
+                'carbs': carbs,
+                'source': 'jp-standard',
+            }, None)
+    return True
+
+
+def _read_csv_rows() -> list[dict]:
+    """Parse and merge the food CSVs into ``[{'name', 'base'}]`` rows."""
+    root = Path(__file__).resolve().parents[1]
+    p = _dataset_csv_path()
+    if p is None:
+        return []
 
     entries: dict[str, dict] = {}
 
@@ -1049,88 +1350,22 @@ def load_csv_dataset():
             merge_entry(name, base_update, per_unit_update)
 
     try:
-        content = None
+        # Japanese MEXT dataset with multi-row headers: streamed row by row
+        encoding = _sniff_csv_encoding(p)
         try:
-            content = p.read_text(encoding='utf-8-sig')
-        except Exception:
-            # Fallback for JP datasets saved as CP932/Shift_JIS
-            content = p.read_text(encoding='cp932')
-
-        # Detect Japanese MEXT-style dataset with multi-row headers
-        if '成分識別子' in content and 'ENERC_KCAL' in content:
-            lines = [ln.strip('\n\r') for ln in content.splitlines() if ln.strip() != '']
-            # Find the machine-friendly header (codes)
-            header_idx = next((i for i, ln in enumerate(lines) if '成分識別子' in ln and 'ENERC_KCAL' in ln), None)
-            if header_idx is None:
-                raise ValueError('Header not found in JP dataset')
-            headers = [h.strip().strip('"') for h in lines[header_idx].split(',')]
-            idx_map = {h: i for i, h in enumerate(headers) if h}
-
-            def find_first_data_row(start):
-                for j in range(start+1, len(lines)):
-                    if re.match(r'^\d{2},\d+,\d+,', lines[j]):
-                        return j
-                return None
-
-            data_start = find_first_data_row(header_idx)
-            if data_start is None:
-                raise ValueError('No data rows found in JP dataset')
-
-            # Helper to parse numeric cell (remove parentheses, *, Tr, etc.)
-            def parse_num(cell: str) -> float:
-                s = (cell or '').replace('Tr', '0').replace('−', '0').replace('-', '0').replace('*', '')
-                s_no_paren = re.sub(r'\(.*?\)', '', s)
-                m = re.search(r'-?\d+(?:\.\d+)?', s_no_paren)
-                if not m:
-                    m = re.search(r'-?\d+(?:\.\d+)?', s)
-                try:
-                    return float(m.group()) if m else 0.0
-                except Exception:
-                    return 0.0
+            is_mext = _read_mext_csv(p, encoding, merge_entry)
+        except UnicodeDecodeError:
+            # Undecodable bytes past the sniffed prefix (CP932/Shift_JIS)
+            entries.clear()
+            is_mext = _read_mext_csv(p, 'cp932', merge_entry)
 
-            # JP format: name column is 4th col (index 3), nutrient columns align with header by +3 offset
-            def get_by_code(cells, code):
-                h = idx_map.get(code)
-                if h is None:
-                    return 0.0
-                d = h + 3  # offset: data has 3 leading cols before REFUSE
-                if d < len(cells):
-                    return parse_num(cells[d])
-                return 0.0
-
-            for k in range(data_start, len(lines)):
-                if not re.match(r'^\d{2},\d+,\d+,', lines[k]):
-                    # stop on footer/notes
-                    continue
-                cells = [c.strip().strip('"') for c in lines[k].split(',')]
-                if len(cells) < 10:
-                    continue
-                name = cells[3].strip()
-                if not name:
-                    continue
-                kcal = get_by_code(cells, 'ENERC_KCAL')
-                protein = get_by_code(cells, 'PROT-')
-                fat = get_by_code(cells, 'FAT-')
-                # Prefer total carbohydrate (by difference)
-                carbs = 0.0
-                for code in ['CHOCDF-', 'CHOAVL', 'CHOAVLM', 'CHOAVLDF-']:
-                    v = get_by_code(cells, code)
-                    if v > 0:
-                        carbs = v
-                        break
-
-                base = {
-                    'per': '100g',
-                    'calories': kcal,
-                    'protein': protein,
-                    'fat': fat,
-                    'carbs': carbs,
-                    'source': 'jp-standard',
-                }
-                merge_entry(name, base, None)
-
-        else:
+        if not is_mext:
             # Simple CSV with English/JP headers
+            try:
+                content = p.read_text(encoding='utf-8-sig')
+            except Exception:
+                # Fallback for JP datasets saved as CP932/Shift_JIS
+                content = p.read_text(encoding='cp932')
             add_simple_csv(content, 'simple-csv')
 
         custom_path = root / 'data' / 'foods_custom.csv'
@@ -1149,154 +1384,389 @@ def load_csv_dataset():
                 fruits_text = fruits_path.read_text(encoding='cp932')
             add_simple_csv(fruits_text, 'fruits-csv')
 
-        rows = list(entries.values())
-
-        CSV_CACHE = rows
-        CSV_MATCH_INDEX = [normalize_food_name(r['name']) for r in rows]
-        return CSV_CACHE
+        return list(entries.values())
     except Exception:
-        CSV_CACHE = []
-        CSV_MATCH_INDEX = []
-        return CSV_CACHE
+        return []
 
 
+@lru_cache(maxsize=NORMALIZE_CACHE_SIZE)
 def _norm_alias_key(s: str) -> str:
     # Canonicalize then aggressive normalization (strip spaces, punctuation, casefold)
     base = canonicalize_name(s)
-    try:
-        import unicodedata
-        base = unicodedata.normalize('NFKC', base)
-    except Exception:
-        pass
-    base = re.sub(r'[\s\u3000・_\-—－‐]+', '', base)
+    # Usually a no-op (quick-checked), but removing separators can join a
+    # base character and a combining mark that NFKC then composes.
+    base = unicodedata.normalize('NFKC', base)
+    base = _ALIAS_SEPARATORS_RE.sub('', base)
     return base.lower()
 
-def _similarity(a: str, b: str) -> float:
-    """Composite similarity: sequence ratio * Jaccard of 2-gram sets."""
-    if not a or not b:
-        return 0.0
-    import difflib
-    seq = difflib.SequenceMatcher(None, a, b).ratio()
-    def ngrams(s):
-        return {s[i:i+2] for i in range(len(s)-1)} if len(s) > 1 else {s}
-    A = ngrams(a)
-    B = ngrams(b)
-    inter = len(A & B)
-    union = len(A | B) or 1
-    jac = inter / union
-    # Weighted blend
-    return (seq * 0.6) + (jac * 0.4)
+def _alias_json_path() -> Path:
+    return Path(__file__).resolve().parents[1] / 'data' / 'food_aliases.json'
 
 
-def load_alias_map():
-    global ALIAS_MAP, ALIAS_NORM
-    if ALIAS_MAP is not None:
-        return ALIAS_MAP
+def _read_alias_map() -> dict:
     try:
-        root = Path(__file__).resolve().parents[1]
-        p = root / 'data' / 'food_aliases.json'
+        p = _alias_json_path()
         if not p.exists():
-            ALIAS_MAP = {}
-            ALIAS_NORM = {}
-            return ALIAS_MAP
-        import json
+            return {}
         data = json.loads(p.read_text(encoding='utf-8'))
-        ALIAS_MAP = data.get('alias_to_canonical') or {}
-        # Build normalized alias index for fast lookup
-        ALIAS_NORM = {}
-        for alias, canon in ALIAS_MAP.items():
-            k = _norm_alias_key(alias)
-            if k and (k not in ALIAS_NORM):
-                ALIAS_NORM[k] = canon
-        return ALIAS_MAP
+        return data.get('alias_to_canonical') or {}
     except Exception:
-        ALIAS_MAP = {}
-        ALIAS_NORM = {}
-        return ALIAS_MAP
+        return {}
+
 
+def _dataset_sources() -> list[tuple]:
+    """Fingerprints (path, mtime_ns, size) of everything a FoodData is built from.
 
-def alias_lookup(name: str):
+    The lookup code itself is included so a snapshot built by an older
+    normalization routine is never reused.
+    """
+    root = Path(__file__).resolve().parents[1]
+    paths = [
+        _dataset_csv_path(),
+        root / 'data' / 'foods_custom.csv',
+        root / 'data' / 'fruits_generated.csv',
+        _alias_json_path(),
+        Path(__file__).resolve(),
+        Path(food_index.__file__).resolve(),
+    ]
+    sources = []
+    for path in paths:
+        if path is None:
+            continue
+        try:
+            st = path.stat()
+            sources.append((str(path), st.st_mtime_ns, st.st_size))
+        except OSError:
+            sources.append((str(path), None, None))
+    return sources
+
+
+def _build_food_data(sources: list[tuple]) -> FoodData:
+    rows = _read_csv_rows()
+    match_index = [normalize_food_name(r['name']) for r in rows]
+    csv_index = FoodIndex(match_index, [canonicalize_name(r['name']) for r in rows])
+
+    alias_map = _read_alias_map()
+    # Build normalized alias index for fast lookup
+    alias_norm = {}
+    for alias, canon in alias_map.items():
+        k = _norm_alias_key(alias)
+        if k and (k not in alias_norm):
+            alias_norm[k] = canon
+    alias_keys = list(alias_norm)
+    alias_index = FoodIndex(alias_keys, alias_keys)
+    autocomplete = Autocomplete(csv_index.substrings, list(alias_map), [normalize_food_name(a) for a in alias_map])
+    table = NutrientTable(rows)
+    return FoodData(table, match_index, csv_index, alias_map, alias_norm, alias_keys, alias_index, sources, autocomplete)
+
+
+# How/when this process loaded FOOD_DATA; reported by ``food_data_ready``.
+FOOD_DATA_STATUS = {'source': None, 'load_ms': None, 'loaded_at': None, 'error': None, 'reloads': 0}
+
+
+def _install_food_data(data: FoodData):
+    """Publish ``data``; FOOD_DATA is assigned last so readers never see a partial set."""
+    global CSV_CACHE, CSV_MATCH_INDEX, CSV_INDEX, ALIAS_MAP, ALIAS_NORM, ALIAS_INDEX, ALIAS_KEYS, FOOD_DATA
+    CSV_CACHE, CSV_MATCH_INDEX, CSV_INDEX = data.table, data.match_index, data.index
+    ALIAS_MAP, ALIAS_NORM, ALIAS_KEYS, ALIAS_INDEX = data.alias_map, data.alias_norm, data.alias_keys, data.alias_index
+    FOOD_DATA = data
+
+
+def build_food_snapshot(path=None) -> FoodData:
+    """Rebuild the dataset from source files and write the binary snapshot."""
+    data = _build_food_data(_dataset_sources())
+    path = path or FOOD_SNAPSHOT_PATH
+    if path:
+        food_index.save_snapshot(path, data)
+    return data
+
+
+def _load_food_data(sources: list[tuple]) -> tuple[FoodData, str]:
+    """``(data, origin)``: the snapshot when it matches ``sources``, else a fresh build."""
+    data = food_index.load_snapshot(FOOD_SNAPSHOT_PATH, sources) if FOOD_SNAPSHOT_PATH else None
+    if data is not None:
+        return data, 'snapshot'
+    data = _build_food_data(sources)
+    if FOOD_SNAPSHOT_PATH:
+        food_index.save_snapshot(FOOD_SNAPSHOT_PATH, data)
+    return data, 'build'
+
+
+def _publish_food_data(data: FoodData, origin: str, started: float):
+    _install_food_data(data)
+    FOOD_DATA_STATUS.update({
+        'source': origin,
+        'load_ms': round((time.perf_counter() - started) * 1000, 1),
+        'loaded_at': time.time(),
+        'error': None,
+    })
+
+
+def get_food_data() -> FoodData:
+    """Loaded dataset + indexes; from the snapshot when it matches the source files.
+
+    Callers should take one reference per request and read everything from it:
+    a reload replaces ``FOOD_DATA`` wholesale and never mutates a published one.
+    """
+    data = FOOD_DATA
+    if data is not None:
+        if FOOD_DATA_RELOAD_INTERVAL > 0:
+            _maybe_reload_food_data(data)
+        return data
+    with _food_data_lock:
+        if FOOD_DATA is None:
+            t0 = time.perf_counter()
+            data, origin = _load_food_data(_dataset_sources())
+            _publish_food_data(data, origin, t0)
+        return FOOD_DATA
+
+
+def _maybe_reload_food_data(data: FoodData):
+    """Start a background reload if the source files changed since ``data`` was built."""
+    global _food_data_checked_at
+    now = time.monotonic()
+    if now - _food_data_checked_at < FOOD_DATA_RELOAD_INTERVAL or _food_data_reload_lock.locked():
+        return
+    _food_data_checked_at = now
+    sources = _dataset_sources()
+    if sources == data.sources:
+        return
+    threading.Thread(
+        target=reload_food_data, kwargs={'sources': sources}, name='food-data-reload', daemon=True,
+    ).start()
+
+
+def reload_food_data(sources: list[tuple] | None = None, force: bool = False) -> FoodData | None:
+    """Rebuild the dataset from the current files and swap it in atomically.
+
+    Returns the new FoodData, or None when nothing changed, another reload is
+    already running, or the rebuild failed (the previous dataset stays live).
+    """
+    if not _food_data_reload_lock.acquire(blocking=False):
+        return None
+    try:
+        t0 = time.perf_counter()
+        sources = sources or _dataset_sources()
+        current = FOOD_DATA
+        if not force and current is not None and current.sources == sources:
+            return None
+        data, origin = _load_food_data(sources)
+        with _food_data_lock:
+            _publish_food_data(data, origin, t0)
+            if current is not None:
+                FOOD_DATA_STATUS['reloads'] += 1
+        return data
+    except Exception as e:
+        FOOD_DATA_STATUS['error'] = str(e)
+        return None
+    finally:
+        _food_data_reload_lock.release()
+
+
+def warm_up_food_data() -> FoodData | None:
+    """Build the dataset and all lookup indexes now rather than on the first request.
+
+    Called from ``TorimoappConfig.ready()`` so each worker is warm before it
+    accepts traffic. Failures are recorded for the readiness endpoint instead of
+    aborting startup; the next request retries the load.
+    """
+    try:
+        return get_food_data()
+    except Exception as e:
+        FOOD_DATA_STATUS['error'] = str(e)
+        return None
+
+
+def load_csv_dataset():
+    """The dataset as ``[{'name', 'base'}]`` dicts, materialized from the nutrient table per call."""
+    return get_food_data().table.rows()
+
+
+def load_alias_map():
+    return get_food_data().alias_map
+
+
+def alias_lookup(name: str, data: FoodData | None = None):
     """Resolve a name to canonical CSV name using multi stage match with composite similarity."""
     if not name:
         return None
-    load_alias_map()
-    if not ALIAS_NORM:
+    fd = data or get_food_data()
+    alias_norm = fd.alias_norm
+    if not alias_norm:
         return None
     key = _norm_alias_key(name)
     # 1) exact
-    if key in ALIAS_NORM:
-        return ALIAS_NORM[key]
+    if key in alias_norm:
+        return alias_norm[key]
     # 2) contains heuristic
-    for ak, canon in ALIAS_NORM.items():
-        if ak in key or key in ak:
-            return canon
-    # 3) best similarity
-    best = None
-    best_score = 0.0
-    for ak, canon in ALIAS_NORM.items():
-        sc = _similarity(key, ak)
-        if sc > best_score:
-            best_score = sc
-            best = canon
-    if best and best_score >= 0.68:  # tuned cutoff
-        return best
+    i = fd.alias_index.substring(key)
+    if i is not None:
+        return alias_norm[fd.alias_keys[i]]
+    # 3) best similarity (bigram-shortlisted)
+    i = fd.alias_index.similar(key, 0.68)  # tuned cutoff
+    if i is not None:
+        return alias_norm[fd.alias_keys[i]]
     return None
 
 
-def csv_lookup(name: str):
-    data = load_csv_dataset()
-    if not data:
+def csv_lookup(name: str) -> FoodRecord | None:
+    fd = get_food_data()
+    table = fd.table
+    if not len(table):
         return None
+    index = fd.index
     key_raw = name
     key = normalize_food_name(name)
     # alias first
-    canon = alias_lookup(key_raw)
+    canon = alias_lookup(key_raw, fd)
     if canon:
-        for r in data:
-            if canonicalize_name(r['name']) == canonicalize_name(canon):
-                return r['base']
+        i = index.canonical(canonicalize_name(canon))
+        if i is not None:
+            return table.record(i)
     # direct & space-insensitive exact
-    for r in data:
-        nm_norm = normalize_food_name(r['name'])
-        if nm_norm == key:
-            return r['base']
+    i = index.exact(key)
+    if i is not None:
+        return table.record(i)
     # substring
-    for r in data:
-        nm_norm = normalize_food_name(r['name'])
-        if nm_norm in key or key in nm_norm:
-            return r['base']
-    # composite similarity over all
-    best = None
-    best_score = 0.0
-    for r in data:
-        nm_norm = normalize_food_name(r['name'])
-        sc = _similarity(key, nm_norm)
-        if sc > best_score:
-            best_score = sc
-            best = r['base']
-    if best and best_score >= 0.7:
-        return best
+    i = index.substring(key)
+    if i is not None:
+        return table.record(i)
+    # composite similarity (bigram-shortlisted)
+    i = index.similar(key, 0.7)
+    if i is not None:
+        return table.record(i)
     return None
 
 
-def resolve_food_nutrition(name: str):
+def resolve_food_nutrition(name: str) -> FoodRecord | None:
     name = canonicalize_name(name)
     # 1) CSV dataset (highest priority if provided)
-    data = csv_lookup(name)
-    if data:
-        return data | {'source': 'csv'}
+    rec = csv_lookup(name)
+    if rec:
+        rec.source = 'csv'
+        return rec
     # 2) USDA FDC
     data = fdc_lookup(name)
     if data:
-        return data | {'source': 'fdc'}
+        return FoodRecord.from_base(data, 'fdc')
     # 3) Offline fallback
     data = offline_lookup(name)
     if data:
-        return data | {'source': 'offline-db'}
+        return FoodRecord.from_base(data, 'offline-db')
     return None
 
 
-def compute_serving_grams(food_name: str, qty, unit, base_info):
+# Per-request budget for the remote (FDC / Gemini) fallbacks of analyze_nutrition.
+NUTRITION_FALLBACK_DEADLINE = float(os.environ.get('NUTRITION_FALLBACK_DEADLINE', 8))
+NUTRITION_FALLBACK_WORKERS = int(os.environ.get('NUTRITION_FALLBACK_WORKERS', 8))
+# Part of that budget kept for the Gemini stage, so slow FDC lookups cannot
+# leave it nothing (capped at half of what is left when the batch starts).
+NUTRITION_AI_FALLBACK_RESERVE = float(os.environ.get('NUTRITION_AI_FALLBACK_RESERVE', 3))
+
+# One pool per stage: FDC calls still running past their deadline must not
+# occupy the workers the Gemini stage needs.
+_fallback_executors: dict[str, ThreadPoolExecutor] = {}
+_fallback_executor_pid = None
+_fallback_executor_lock = threading.Lock()
+
+
+def _get_fallback_executor(stage: str = 'fdc') -> ThreadPoolExecutor:
+    global _fallback_executor_pid
+    pid = os.getpid()
+    with _fallback_executor_lock:
+        if _fallback_executor_pid != pid:
+            _fallback_executors.clear()
+            _fallback_executor_pid = pid
+        executor = _fallback_executors.get(stage)
+        if executor is None:
+            executor = _fallback_executors[stage] = ThreadPoolExecutor(
+                max_workers=NUTRITION_FALLBACK_WORKERS,
+                thread_name_prefix=f'nutrition-{stage}',
+            )
+        return executor
+
+
+def _run_concurrently(func, keys, deadline: float, stage: str = 'fdc') -> dict:
+    """Run ``func(key)`` for every key in parallel; results not ready by ``deadline`` are dropped."""
+    if not keys:
+        return {}
+    executor = _get_fallback_executor(stage)
+    futures = {executor.submit(func, key): key for key in keys}
+    done, not_done = wait(futures, timeout=max(deadline - time.monotonic(), 0))
+    for fut in not_done:
+        fut.cancel()
+    results = {}
+    for fut in done:
+        try:
+            results[futures[fut]] = fut.result()
+        except Exception:
+            results[futures[fut]] = None
+    return results
+
+
+def resolve_foods_batch(names, deadline: float | None = None) -> dict:
+    """Resolve many names at once, mirroring ``resolve_food_nutrition`` + AI normalization.
+
+    Names are de-duplicated, CSV hits are served locally first, and the remote
+    fallbacks for the misses (FDC, then Gemini normalization) run concurrently
+    under a shared deadline, so a meal with several unknown items costs roughly
+    one upstream round-trip instead of the sum. FDC must finish
+    ``NUTRITION_AI_FALLBACK_RESERVE`` s early so Gemini always gets a turn.
+
+    Returns ``{name: (resolved_name, FoodRecord_or_None)}`` for every input name.
+    """
+    if deadline is None:
+        deadline = time.monotonic() + NUTRITION_FALLBACK_DEADLINE
+    ai_enabled = _gemini_configured()
+    fdc_deadline = deadline
+    if ai_enabled:
+        fdc_deadline -= min(NUTRITION_AI_FALLBACK_RESERVE, max(deadline - time.monotonic(), 0) / 2)
+    unique = list(dict.fromkeys(n for n in names if n))
+    canon = {n: canonicalize_name(n) for n in unique}
+    results = {}
+
+    # 1) CSV dataset (local, highest priority)
+    misses = []
+    for n in unique:
+        rec = csv_lookup(canon[n])
+        if rec:
+            rec.source = 'csv'
+            results[n] = (n, rec)
+        else:
+            misses.append(n)
+
+    # 2) USDA FDC for every miss in parallel, then the offline fallback
+    if misses and os.environ.get('FOODDATA_API_KEY'):
+        fdc_hits = _run_concurrently(lambda n: fdc_lookup(canon[n]), misses, fdc_deadline)
+    else:
+        fdc_hits = {}
+    remaining = []
+    for n in misses:
+        if fdc_hits.get(n):
+            results[n] = (n, FoodRecord.from_base(fdc_hits[n], 'fdc'))
+            continue
+        data = offline_lookup(canon[n])
+        if data:
+            results[n] = (n, FoodRecord.from_base(data, 'offline-db'))
+        else:
+            remaining.append(n)
+
+    # 3) Gemini name normalization for what is still unknown, in parallel;
+    #    a name that cannot get a limiter slot before the deadline stays unknown
+    def _resolve_with_ai(n):
+        ai_name = ai_normalize_name(n, max_wait=deadline - time.monotonic())
+        if not ai_name:
+            return None
+        base = resolve_food_nutrition(ai_name)
+        return (ai_name, base) if base else None
+
+    ai_hits = _run_concurrently(_resolve_with_ai, remaining, deadline, stage='ai') if ai_enabled else {}
+    for n in remaining:
+        results[n] = ai_hits.get(n) or (n, None)
+    return results
+
+
+def compute_serving_grams(food_name: str, qty, unit, base_info: FoodRecord):
     # unit -> grams
     if qty is None:
         qty = 1.0
@@ -1307,16 +1777,16 @@ def compute_serving_grams(food_name: str, qty, unit, base_info):
 
     # If unit is missing, default to per-unit when available, else 100g
     if not unit:
-        if base_info.get('per_unit'):
-            return float(base_info['per_unit'].get('grams') or 100.0)
+        if base_info.per_unit:
+            return float(base_info.per_unit.get('grams') or 100.0)
         return 100.0
     if unit in GENERIC_UNITS:
         return qty * GENERIC_UNITS[unit]
     # piece-based
     if unit in ['個', 'piece', 'pieces', '枚', 'slice', 'slices', '本', '串']:
         # prefer per_unit if provided
-        if base_info.get('per_unit'):
-            return qty * base_info['per_unit']['grams']
+        if base_info.per_unit:
+            return qty * base_info.per_unit['grams']
         # use item base weight mapping as heuristic
         bw = ITEM_BASE_WEIGHTS.get(food_name.strip().lower())
         if bw:
@@ -1328,50 +1798,37 @@ def compute_serving_grams(food_name: str, qty, unit, base_info):
     return 100.0
 
 
-@api_view(['POST'])
-def analyze_nutrition(request):
-    body = request.data or {}
-    text = (body.get('text') or '').strip()
-    items = body.get('items') or []
-
-    foods = items if items else parse_text_to_items(text)
-    if not foods:
-        # Try AI parser when rule-based parsing yields nothing
-        ai_items = ai_parse_text_to_items(text)
-        if ai_items:
-            foods = ai_items
-    analyzed = []
-    totals = {'calories': 0.0, 'protein': 0.0, 'fat': 0.0, 'carbs': 0.0}
+def analyze_items(foods, resolved: dict) -> tuple[list, dict]:
+    """Scale resolved foods to their servings: ``(items, totals)`` as returned by analyze_nutrition.
 
+    ``resolved`` is ``resolve_foods_batch`` output for the item names. Each
+    serving is reduced to a macro vector (per unit or per 100 g) and a
+    multiplier, then all items are scaled and totalled in one batch, so
+    callers re-analysing many meals at once pay only the per-item loop.
+    """
+    entries = []
+    vectors = []
+    multipliers = []
     for it in foods:
         name = (it.get('name') or '').strip()
         if not name:
             continue
-        base = resolve_food_nutrition(name)
+        name, base = resolved[name]
         if not base:
-            # Try AI normalization to get a better canonical name
-            ai_name = ai_normalize_name(name)
-            if ai_name:
-                base = resolve_food_nutrition(ai_name)
-                if base:
-                    name = ai_name
             # Provide suggestions from CSV index (top 3)
             suggestions = []
-            if CSV_MATCH_INDEX:
+            fd = get_food_data()
+            if fd.match_index:
                 key = normalize_food_name(canonicalize_name(name))
-                suggestions = difflib.get_close_matches(key, CSV_MATCH_INDEX, n=3, cutoff=0.6)
-            analyzed.append({'name': name, 'found': False, 'suggestions': suggestions})
+                suggestions = fd.autocomplete.close.close_matches(key, n=3, cutoff=0.6)
+            entries.append({'name': name, 'found': False, 'suggestions': suggestions})
             continue
-        raw_qty = it.get('quantity')
-        try:
-            qty_val = float(raw_qty) if raw_qty not in (None, '') else 1.0
-        except (TypeError, ValueError):
-            qty_val = 1.0
+        qty_val = _item_quantity(it)
         unit_val = (it.get('unit') or '')
         unit_lower = unit_val.lower()
 
         grams = compute_serving_grams(name.lower(), qty_val, unit_lower, base)
-        per_unit_info = base.get('per_unit')
+        per_unit_info = base.per_unit
         is_weight_unit = unit_lower in UNIT_GRAMS
 
         if per_unit_info and not is_weight_unit:
@@ -1381,29 +1838,26 @@ def analyze_nutrition(request):
                 per = f"{qty_display} {label}" if re.match(r'^[A-Za-z]', label) else f"{qty_display}{label}"
             else:
                 per = f"{qty_display} unit"
-
-            per_unit_nutrients = per_unit_info.get('nutrients') or {}
-            unit_grams = per_unit_info.get('grams') or 100.0
-
-            def per_unit_value(key: str) -> float:
-                if key in per_unit_nutrients and per_unit_nutrients[key] is not None:
-                    return float(per_unit_nutrients[key])
-                base_val = base.get(key) or 0.0
-                return base_val * (unit_grams / 100.0)
-
-            calories = round(per_unit_value('calories') * qty_val, 1)
-            protein = round(per_unit_value('protein') * qty_val, 1)
-            fat = round(per_unit_value('fat') * qty_val, 1)
-            carbs = round(per_unit_value('carbs') * qty_val, 1)
+            vectors.append(base.unit_macros())
+            multipliers.append(qty_val)
         else:
             # Treat as gram-based serving using per-100g macros
-            factor = grams / 100.0
             per = f"{int(round(grams))}g"
-            calories = round((base.get('calories') or 0.0) * factor, 1)
-            protein = round((base.get('protein') or 0.0) * factor, 1)
-            fat = round((base.get('fat') or 0.0) * factor, 1)
-            carbs = round((base.get('carbs') or 0.0) * factor, 1)
+            vectors.append(base.macros())
+            multipliers.append(grams / 100.0)
+        entries.append((name, grams, per, base.source or 'unknown'))
 
+    scaled = iter(scale_macros(vectors, multipliers))
+    analyzed = []
+    rows = []
+    for entry in entries:
+        if isinstance(entry, dict):
+            analyzed.append(entry)
+            continue
+        name, grams, per, source = entry
+        row = next(scaled)
+        rows.append(row)
+        calories, protein, fat, carbs = row
         analyzed.append({
             'name': name,
             'grams': grams,
@@ -1413,16 +1867,97 @@ def analyze_nutrition(request):
             'fat': fat,
             'carbs': carbs,
             'found': True,
-            'source': base.get('source', 'unknown')
+            'source': source,
         })
-        totals['calories'] += calories
-        totals['protein'] += protein
-        totals['fat'] += fat
-        totals['carbs'] += carbs
+    return analyzed, macro_totals(rows)
+
+
+# analyze_nutrition results, keyed on the parsed item list + dataset version, in
+# the "nutrition" Django cache (see settings.CACHES). Results with unresolved
+# items may stem from a transient FDC/Gemini failure and are kept only briefly.
+ANALYZE_CACHE_ALIAS = 'nutrition'
+ANALYZE_CACHE_PARTIAL_TTL = int(os.environ.get('NUTRITION_CACHE_PARTIAL_TTL', 300))
+ANALYZE_CACHE_COUNTERS = {'hits': 0, 'misses': 0, 'sets': 0, 'errors': 0}
+
+
+def _item_quantity(it) -> float:
+    raw_qty = it.get('quantity')
+    try:
+        return float(raw_qty) if raw_qty not in (None, '') else 1.0
+    except (TypeError, ValueError):
+        return 1.0
+
+
+def _analyze_cache_key(foods, version: str) -> str:
+    items = []
+    for it in foods:
+        name = (it.get('name') or '').strip()
+        if name:
+            items.append([name, _item_quantity(it), it.get('unit') or ''])
+    raw = json.dumps([version, items], ensure_ascii=False, default=str)
+    return 'analyze:' + hashlib.sha1(raw.encode('utf-8')).hexdigest()
+
+
+def _analyze_cache_get(key: str):
+    try:
+        value = caches[ANALYZE_CACHE_ALIAS].get(key)
+    except Exception:
+        ANALYZE_CACHE_COUNTERS['errors'] += 1
+        return None
+    ANALYZE_CACHE_COUNTERS['hits' if value is not None else 'misses'] += 1
+    return value
+
+
+def _analyze_cache_set(key: str, payload: dict, complete: bool):
+    try:
+        if complete:
+            caches[ANALYZE_CACHE_ALIAS].set(key, payload)
+        else:
+            caches[ANALYZE_CACHE_ALIAS].set(key, payload, ANALYZE_CACHE_PARTIAL_TTL)
+        ANALYZE_CACHE_COUNTERS['sets'] += 1
+    except Exception:
+        ANALYZE_CACHE_COUNTERS['errors'] += 1
+
+
+def analyze_cache_stats() -> dict:
+    stats = dict(ANALYZE_CACHE_COUNTERS)
+    lookups = stats['hits'] + stats['misses']
+    stats['hit_rate'] = round(stats['hits'] / lookups, 4) if lookups else 0.0
+    backend = caches[ANALYZE_CACHE_ALIAS]
+    if hasattr(backend, 'stats'):
+        stats.update(backend.stats())
+    return stats
+
+
+@api_view(['POST'])
+def analyze_nutrition(request):
+    body = request.data or {}
+    text = (body.get('text') or '').strip()
+    items = body.get('items') or []
+
+    foods = items if items else parse_text_to_items(text)
+    if not foods:
+        # Try AI parser when rule-based parsing yields nothing
+        try:
+            ai_items = ai_parse_text_to_items(text)
+        except Overloaded as e:
+            return _gemini_busy_response(e)
+        if ai_items:
+            foods = ai_items
+
+    cache_key = _analyze_cache_key(foods, get_food_data().version)
+    cached = _analyze_cache_get(cache_key)
+    if cached is not None:
+        return Response(cached, status=status.HTTP_200_OK)
 
-    totals = {k: round(v, 1) for k, v in totals.items()}
+    names = [(it.get('name') or '').strip() for it in foods]
+    # CSV hits first, then FDC / AI-normalization fallbacks concurrently
+    resolved = resolve_foods_batch(names)
+    analyzed, totals = analyze_items(foods, resolved)
 
-    return Response({'items': analyzed, 'totals': totals}, status=status.HTTP_200_OK)
+    payload = {'items': analyzed, 'totals': totals}
+    _analyze_cache_set(cache_key, payload, complete=all(a['found'] for a in analyzed))
+    return Response(payload, status=status.HTTP_200_OK)
 
 
 @api_view(['POST'])
@@ -1435,135 +1970,176 @@ def analyze_nutrition_image(request):
       - JSON with 'image_url'
     Returns: { items: [{name, calories, protein, fat, carbs}], totals }
     """
-    # Extract image as data URL (preferred) or URL
-    image_url = None
-    image_bytes = None
+    image_url, image_bytes, image_mime, error = _vision_request_image(request.FILES, request.data or {})
+    if error:
+        return Response({'error': error}, status=400)
+    if not image_url and image_bytes is None:
+        return Response({'error': 'No image provided'}, status=400)
+
+    try:
+        model, error = _vision_model()
+        if error:
+            return Response({'error': error}, status=503)
+        if image_bytes is None:
+            return Response({'error': 'Image bytes not available for Gemini'}, status=400)
+        GEMINI_LIMITER.acquire()
+        image_bytes, image_mime = _vision_image(image_bytes, image_mime)
+        resp = model.generate_content(_vision_parts(image_bytes, image_mime))
+        text = (getattr(resp, 'text', None) or '').strip()
+        return Response(_vision_result(text), status=200)
+    except Overloaded as e:
+        return _gemini_busy_response(e)
+    except Exception as e:
+        return Response(*_vision_failure(e))
+
+
+def _vision_request_image(files, data) -> tuple:
+    """``(image_url, image_bytes, image_mime, error)`` from an upload, base64 body or image URL.
+
+    Uploads and base64 bodies are decoded once; ``image_url`` is only set for
+    URL / data-URL input.
+    """
     image_mime = 'image/jpeg'
-    if 'image' in request.FILES:
+    if 'image' in files:
+        upload = files['image']
         try:
-            content = request.FILES['image'].read()
-            image_bytes = content
-            # Build data URL for OpenAI vision
-            b64 = base64.b64encode(content).decode('ascii')
-            image_url = f"data:image/jpeg;base64,{b64}"
+            image_bytes = upload.read()
         except Exception:
-            return Response({'error': 'Invalid image'}, status=400)
-    else:
-        data = request.data or {}
-        img_b64 = data.get('image_base64')
-        if img_b64:
-            if img_b64.startswith('data:'):
-                image_url = img_b64
-                # parse header
-                try:
-                    header, b64data = img_b64.split(',', 1)
-                    if ';base64' in header:
-                        mt = header.split(';')[0].split(':')[-1] or 'image/jpeg'
-                        image_mime = mt
-                        image_bytes = base64.b64decode(b64data)
-                except Exception:
-                    image_bytes = None
-            else:
-                # assume raw base64 jpeg
-                image_bytes = base64.b64decode(img_b64)
-                b64 = base64.b64encode(image_bytes).decode('ascii')
-                image_url = f"data:{image_mime};base64,{b64}"
-        else:
-            image_url = data.get('image_url')
+            return None, None, image_mime, 'Invalid image'
+        content_type = getattr(upload, 'content_type', None) or ''
+        return None, image_bytes, content_type if content_type.startswith('image/') else image_mime, None
+    img_b64 = data.get('image_base64')
+    if img_b64 and not img_b64.startswith('data:'):
+        # assume raw base64 jpeg
+        try:
+            return None, base64.b64decode(img_b64), image_mime, None
+        except Exception:
+            return None, None, image_mime, 'Invalid image'
+    image_url = img_b64 or data.get('image_url')
+    image_bytes = None
+    if image_url and image_url.startswith('data:'):
+        # decode data url
+        try:
+            header, b64data = image_url.split(',', 1)
+            if ';base64' in header:
+                image_mime = header.split(';')[0].split(':')[-1] or 'image/jpeg'
+                image_bytes = base64.b64decode(b64data)
+        except Exception:
+            image_bytes = None
+    return image_url, image_bytes, image_mime, None
 
-    if not image_url:
-        return Response({'error': 'No image provided'}, status=400)
 
-    # Build a strict JSON instruction for the model
-    system = (
-        "You analyze a meal photo and output ONLY valid JSON with 'items' array. "
-        "Each item has fields: name (Japanese), calories (number, kcal), protein (g), fat (g), carbs (g). "
-        "If unsure, make a reasonable estimate. Do not include extra commentary."
-    )
+# Photos are fitted into VISION_IMAGE_MAX_EDGE px (0 disables), EXIF-rotated
+# and re-encoded as VISION_IMAGE_FORMAT without metadata before upload.
+VISION_IMAGE_MAX_EDGE = int(os.environ.get('VISION_IMAGE_MAX_EDGE', 1024))
+VISION_IMAGE_FORMAT = os.environ.get('VISION_IMAGE_FORMAT', 'JPEG')
+VISION_IMAGE_QUALITY = int(os.environ.get('VISION_IMAGE_QUALITY', 85))
 
-    def parse_items_from_text(text: str):
-        data = {}
-        try:
-            data = json.loads(text)
-        except Exception:
-            m = re.search(r'\{[\s\S]*\}$', text)
-            if m:
-                try:
-                    data = json.loads(m.group(0))
-                except Exception:
-                    data = {}
-        items = data.get('items') if isinstance(data, dict) else None
-        out = []
-        if isinstance(items, list):
-            for it in items:
-                name = str(it.get('name') or '').strip()
-                if not name:
-                    continue
-                def f(key):
-                    try:
-                        v = float(it.get(key))
-                        return max(0.0, round(v, 1))
-                    except Exception:
-                        return 0.0
-                out.append({
-                    'name': name,
-                    'calories': round(f('calories')),
-                    'protein': f('protein'),
-                    'fat': f('fat'),
-                    'carbs': f('carbs'),
-                })
-        return out
 
+def _vision_image(image_bytes: bytes, image_mime: str) -> tuple[bytes, str]:
+    """``(bytes, mime)`` actually sent to Gemini (see ``torimo.image_prep``)."""
+    return image_prep.prepare(image_bytes, image_mime, VISION_IMAGE_MAX_EDGE, VISION_IMAGE_FORMAT, VISION_IMAGE_QUALITY)
+
+
+def _vision_model():
+    """``(model, None)`` for the configured Gemini vision model, or ``(None, error)``."""
+    # Gemini only
+    if gemini_client.sdk() is None:
+        return None, 'No vision backend available (install google-generativeai and set GOOGLE_API_KEY).'
+    if not gemini_client.api_key():
+        return None, 'GOOGLE_API_KEY not set'
+    return _gemini_model(_gemini_model_name('GEMINI_MODEL_VISION', 'gemini-1.5-flash')), None
+
+
+def _vision_parts(image_bytes: bytes, image_mime: str) -> list:
+    return [
+        "食事写真から料理名ごとの概算栄養をJSONで出力して。構造: {\"items\":[{\"name\":\"\",\"calories\":0,\"protein\":0,\"fat\":0,\"carbs\":0}]}。余計な説明文は出さない。",
+        {"mime_type": image_mime, "data": image_bytes},
+    ]
+
+
+def _parse_vision_items(text: str) -> list:
+    data = {}
     try:
-        # Gemini only
-        try:
-            import google.generativeai as genai
-        except Exception:
-            return Response({'error': 'No vision backend available (install google-generativeai and set GOOGLE_API_KEY).'}, status=503)
-        gkey = os.environ.get('GOOGLE_API_KEY')
-        if not gkey:
-            return Response({'error': 'GOOGLE_API_KEY not set'}, status=503)
-        genai.configure(api_key=gkey)
-        gmodel_name = os.environ.get('GEMINI_MODEL_VISION', 'gemini-1.5-flash')
-        if isinstance(gmodel_name, str) and gmodel_name.startswith('models/'):
-            gmodel_name = gmodel_name.split('/', 1)[1]
-        model = genai.GenerativeModel(gmodel_name)
-        # Build parts
-        parts = [
-            "食事写真から料理名ごとの概算栄養をJSONで出力して。構造: {\"items\":[{\"name\":\"\",\"calories\":0,\"protein\":0,\"fat\":0,\"carbs\":0}]}。余計な説明文は出さない。",
-        ]
-        if image_bytes is None and image_url and image_url.startswith('data:'):
-            # decode data url
+        data = json.loads(text)
+    except Exception:
+        m = re.search(r'\{[\s\S]*\}$', text)
+        if m:
             try:
-                header, b64data = image_url.split(',', 1)
-                if ';base64' in header:
-                    image_mime = header.split(';')[0].split(':')[-1] or 'image/jpeg'
-                    image_bytes = base64.b64decode(b64data)
+                data = json.loads(m.group(0))
             except Exception:
-                image_bytes = None
-        if image_bytes is None:
-            return Response({'error': 'Image bytes not available for Gemini'}, status=400)
-        parts.append({"mime_type": image_mime, "data": image_bytes})
-        resp = model.generate_content(parts)
-        text = (getattr(resp, 'text', None) or '').strip()
-        out = parse_items_from_text(text)
-        totals = {'calories': 0.0, 'protein': 0.0, 'fat': 0.0, 'carbs': 0.0}
-        for it in out:
-            totals['calories'] += it['calories']
-            totals['protein'] += it['protein']
-            totals['fat'] += it['fat']
-            totals['carbs'] += it['carbs']
-        for k in totals:
-            totals[k] = round(totals[k], 1 if k != 'calories' else 0)
-        return Response({'items': out, 'totals': totals, 'provider': 'gemini'}, status=200)
-    except Exception as e:
-        try:
-            from django.conf import settings as _settings
-            if getattr(_settings, 'DEBUG', False):
-                return Response({'error': f'vision_failed: {e}'}, status=500)
-        except Exception:
-            pass
-        return Response({'error': 'vision_failed'}, status=500)
+                data = {}
+    items = data.get('items') if isinstance(data, dict) else None
+    out = []
+    if isinstance(items, list):
+        for it in items:
+            name = str(it.get('name') or '').strip()
+            if not name:
+                continue
+            def f(key):
+                try:
+                    v = float(it.get(key))
+                    return max(0.0, round(v, 1))
+                except Exception:
+                    return 0.0
+            out.append({
+                'name': name,
+                'calories': round(f('calories')),
+                'protein': f('protein'),
+                'fat': f('fat'),
+                'carbs': f('carbs'),
+            })
+    return out
+
+
+def _vision_result(text: str) -> dict:
+    out = _parse_vision_items(text)
+    totals = {'calories': 0.0, 'protein': 0.0, 'fat': 0.0, 'carbs': 0.0}
+    for it in out:
+        totals['calories'] += it['calories']
+        totals['protein'] += it['protein']
+        totals['fat'] += it['fat']
+        totals['carbs'] += it['carbs']
+    for k in totals:
+        totals[k] = round(totals[k], 1 if k != 'calories' else 0)
+    return {'items': out, 'totals': totals, 'provider': 'gemini'}
+
+
+def _vision_failure(exc) -> tuple[dict, int]:
+    try:
+        from django.conf import settings as _settings
+        if getattr(_settings, 'DEBUG', False):
+            return {'error': f'vision_failed: {exc}'}, 500
+    except Exception:
+        pass
+    return {'error': 'vision_failed'}, 500
+
+
+# Search/suggest results only change with the dataset, so they are served with
+# a strong ETag (dataset version + query) and may be cached by browsers/CDNs.
+NUTRITION_SEARCH_MAX_AGE = int(os.environ.get('NUTRITION_SEARCH_MAX_AGE', 300))
+
+
+def _dataset_etag(request, fd: FoodData, *parts) -> str:
+    renderer = getattr(request, 'accepted_renderer', None)
+    key = repr((fd.version, request.path, getattr(renderer, 'format', None)) + parts)
+    return '"%s"' % hashlib.sha1(key.encode('utf-8')).hexdigest()[:32]
+
+
+def _etag_matches(request, etag: str) -> bool:
+    header = request.META.get('HTTP_IF_NONE_MATCH')
+    if not header:
+        return False
+    # If-None-Match uses weak comparison: W/"x" matches "x".
+    tags = [t[2:] if t.startswith('W/') else t for t in parse_etags(header)]
+    return '*' in tags or etag in tags
+
+
+def _with_cache_headers(response, etag: str):
+    response['ETag'] = etag
+    response['Cache-Control'] = f'public, max-age={NUTRITION_SEARCH_MAX_AGE}'
+    response['Vary'] = 'Accept'
+    return response
 
 
 @api_view(['GET'])
@@ -1575,34 +2151,36 @@ def suggest_nutrition(request):
     limit = int(request.query_params.get('limit') or 8)
     if not q:
         return Response({'suggestions': []}, status=200)
+    if limit <= 0:
+        return Response({'suggestions': []}, status=200)
+    fd = get_food_data()
+    etag = _dataset_etag(request, fd, q, limit)
+    if _etag_matches(request, etag):
+        return _with_cache_headers(Response(status=status.HTTP_304_NOT_MODIFIED), etag)
     key = normalize_food_name(canonicalize_name(q))
-    alias_map = load_alias_map() or {}
-    csv_rows = load_csv_dataset() or []
+    ac = fd.autocomplete
+    csv_names = fd.table.names
     names = []
-    # 1) Alias keys containing q
-    for alias in alias_map.keys():
-        a = normalize_food_name(alias)
-        if key in a:
-            names.append(alias)
-            if len(names) >= limit:
-                break
+    # 1) Alias keys containing q (in alias map order)
+    for i in ac.aliases.containing(key)[:limit]:
+        names.append(ac.alias_names[i])
     # 2) CSV names containing q (canonical)
     if len(names) < limit:
-        for r in csv_rows:
-            nm = normalize_food_name(r['name'])
-            if key in nm and r['name'] not in names:
-                names.append(r['name'])
+        for i in ac.rows.containing(key):
+            nm = csv_names[i]
+            if nm not in names:
+                names.append(nm)
                 if len(names) >= limit:
                     break
     # 3) Fuzzy from CSV index
-    if len(names) < limit:
-        candidates = difflib.get_close_matches(key, CSV_MATCH_INDEX or [], n=limit, cutoff=0.6)
+    if len(names) < limit and fd.match_index:
+        candidates = ac.close.close_matches(key, n=limit, cutoff=0.6)
         for c in candidates:
             if c not in names:
                 names.append(c)
                 if len(names) >= limit:
                     break
-    return Response({'suggestions': names[:limit]}, status=200)
+    return _with_cache_headers(Response({'suggestions': names[:limit]}, status=200), etag)
 
 
 @api_view(['POST'])
@@ -1612,8 +2190,63 @@ def assistant_chat(request):
     Returns: { reply: str, profile_used: {...} }
     """
     data = request.data or {}
-    messages = data.get('messages') or []
     profile = data.get('profile') or {}
+    clean_msgs = _clean_chat_messages(data.get('messages') or [])
+    try:
+        if _wants_chat_stream(request, data):
+            prompt, fallback = _profile_chat_prompt(clean_msgs, profile)
+            if fallback is None:
+                GEMINI_LIMITER.acquire()
+                return _chat_stream_response(_chat_events(_gemini_stream_text(prompt, **CHAT_GENERATION), profile))
+        reply = ai_profile_chat(clean_msgs, profile)
+    except Overloaded as e:
+        return _gemini_busy_response(e)
+    return Response({'reply': reply, 'profile_used': profile}, status=200)
+
+
+# Streaming chat: with {"stream": true} (or ?stream=1) the reply is sent as
+# Server-Sent Events while Gemini generates it: "delta" events carry text
+# chunks, and a final "done" event carries the usual {reply, profile_used}.
+# The rule-based reply (no Gemini) is returned as plain JSON.
+def _wants_chat_stream(request, data) -> bool:
+    flag = data.get('stream')
+    if flag is None:
+        flag = request.GET.get('stream')
+    return str(flag).strip().lower() in {'1', 'true', 'yes', 'on'}
+
+
+def _sse_event(event: str, data) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+def _chat_done_event(parts: list[str], profile: dict) -> str:
+    return _sse_event('done', {'reply': ''.join(parts).strip() or CHAT_FAILED_REPLY, 'profile_used': profile})
+
+
+def _chat_events(chunks, profile: dict):
+    parts = []
+    for text in chunks:
+        parts.append(text)
+        yield _sse_event('delta', {'text': text})
+    yield _chat_done_event(parts, profile)
+
+
+async def _chat_events_async(chunks, profile: dict):
+    parts = []
+    async for text in chunks:
+        parts.append(text)
+        yield _sse_event('delta', {'text': text})
+    yield _chat_done_event(parts, profile)
+
+
+def _chat_stream_response(events) -> StreamingHttpResponse:
+    response = StreamingHttpResponse(events, content_type='text/event-stream; charset=utf-8')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'  # let nginx pass events through unbuffered
+    return response
+
+
+def _clean_chat_messages(messages) -> list[dict]:
     # Basic sanitization
     clean_msgs = []
     for m in messages[:20]:  # limit to 20 for cost control
@@ -1621,8 +2254,30 @@ def assistant_chat(request):
         content = (m.get('content') or '').strip()
         if content:
             clean_msgs.append({'role': role, 'content': content})
-    reply = ai_profile_chat(clean_msgs, profile)
-    return Response({'reply': reply, 'profile_used': profile}, status=200)
+    return clean_msgs
+
+
+@api_view(['GET'])
+def food_data_ready(request):
+    """Readiness probe: 200 once the food dataset and lookup indexes are loaded, else 503."""
+    data = FOOD_DATA
+    if data is None:
+        return Response({
+            'ready': False,
+            'error': FOOD_DATA_STATUS.get('error'),
+        }, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+    return Response({
+        'ready': True,
+        'dataset_version': data.version,
+        'foods': len(data.table),
+        'aliases': len(data.alias_keys),
+        'source': FOOD_DATA_STATUS.get('source'),
+        'load_ms': FOOD_DATA_STATUS.get('load_ms'),
+        'reloads': FOOD_DATA_STATUS.get('reloads'),
+        'analyze_cache': analyze_cache_stats(),
+        'auth_token_cache': token_cache_stats(),
+        'pid': os.getpid(),
+    }, status=200)
 
 
 @api_view(['GET'])
@@ -1632,13 +2287,13 @@ def assistant_status(request):
     try:
         from django.conf import settings as _settings
         if not getattr(_settings, 'DEBUG', False):
-            gemini_import = True
-            try:
-                import google.generativeai as _genai  # type: ignore
-                _ = _genai
-            except Exception:
-                gemini_import = False
-            return Response({'gemini_ready': bool(os.environ.get('GOOGLE_API_KEY')) and gemini_import}, status=200)
+            return Response({
+                'gemini_ready': gemini_client.configured(),
+                'gemini_cache': GEMINI_CACHE.stats(),
+                'gemini_models': gemini_client.stats(),
+                'gemini_limiter': GEMINI_LIMITER.stats(),
+                'vision_images': image_prep.stats(),
+            }, status=200)
     except Exception:
         pass
 
@@ -1648,12 +2303,7 @@ def assistant_status(request):
     except Exception:
         pass
     # Gemini availability
-    gemini_import = True
-    try:
-        import google.generativeai as _genai  # type: ignore
-        _ = _genai
-    except Exception:
-        gemini_import = False
+    gemini_import = gemini_client.sdk() is not None
     from pathlib import Path as _P
     env_path = str(_P(__file__).resolve().parents[1] / '.env')
     env_exists = _P(env_path).exists()
@@ -1692,6 +2342,10 @@ def assistant_status(request):
         'file_model_vision': file_model_vision,
         'file_model_text': file_model_text,
         'file_keys': file_keys,
+        'gemini_cache': GEMINI_CACHE.stats(),
+        'gemini_models': gemini_client.stats(),
+        'gemini_limiter': GEMINI_LIMITER.stats(),
+        'vision_images': image_prep.stats(),
     }
     return Response(info, status=200)
 
@@ -1708,45 +2362,29 @@ def search_foods(request):
     if not q or len(q) < 1:
         return Response([])
     
-    dataset = load_csv_dataset()
-    if not dataset:
+    fd = get_food_data()
+    table = fd.table
+    if not len(table):
         return Response([])
+    etag = _dataset_etag(request, fd, q, limit)
+    if _etag_matches(request, etag):
+        return _with_cache_headers(Response(status=status.HTTP_304_NOT_MODIFIED), etag)
     
     # Normalize search term
     q_norm = normalize_food_name(q)
     
+    # Rank: exact -> prefix -> match position -> shorter name -> original order
     results = []
-    for idx, entry in enumerate(dataset):
-        name = entry.get('name', '')
-        name_norm = normalize_food_name(name)
-        
-        # Substring match
-        if q_norm in name_norm:
-            base = entry.get('base', {})
-            match_pos = name_norm.index(q_norm)
-            if name_norm == q_norm:
-                priority = 0  # 完全一致を最優先
-            elif match_pos == 0:
-                priority = 1  # 接頭一致
-            else:
-                priority = 2  # 中間一致
-            results.append({
-                'priority': priority,
-                'pos': match_pos,
-                'length': len(name_norm),
-                'idx': idx,
-                'payload': {
-                    'name': name,
-                    'calories': base.get('calories', 0),
-                    'protein': base.get('protein', 0),
-                    'fat': base.get('fat', 0),
-                    'carbs': base.get('carbs', 0),
-                    'per': base.get('per', '100g'),
-                }
-            })
-
-    # Rank by priority -> match position -> shorter name -> original order
-    results.sort(key=lambda r: (r['priority'], r['pos'], r['length'], r['idx']))
+    for idx in fd.autocomplete.rows.ranked(q_norm, limit):
+        rec = table.record(idx)
+        results.append({
+            'name': table.names[idx],
+            'calories': 0 if rec.calories is None else rec.calories,
+            'protein': 0 if rec.protein is None else rec.protein,
+            'fat': 0 if rec.fat is None else rec.fat,
+            'carbs': 0 if rec.carbs is None else rec.carbs,
+            'per': rec.per or '100g',
+        })
 
-    return Response([r['payload'] for r in results[:limit]])
+    return _with_cache_headers(Response(results[:limit]), etag)
 
@@ -1,6 +1,27 @@
+import os
+import sys
+
 from django.apps import AppConfig
 
+# manage.py commands that serve traffic and therefore want a warm dataset.
+_SERVING_COMMANDS = {'runserver', 'runserver_plus'}
+
+
+def _warmup_enabled() -> bool:
+    if os.environ.get('FOOD_DATA_WARMUP', '1').strip().lower() not in {'1', 'true', 'yes', 'on'}:
+        return False
+    # Skip migrate/test/shell etc.; gunicorn/uvicorn workers always warm up.
+    if os.path.basename(sys.argv[0]) == 'manage.py':
+        return len(sys.argv) > 1 and sys.argv[1] in _SERVING_COMMANDS
+    return True
+
 
 class TorimoappConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'torimoApp'
+
+    def ready(self):
+        if _warmup_enabled():
+            from .api_views import warm_up_food_data
+
+            warm_up_food_data()
@@ -0,0 +1,382 @@
+"""Async (ASGI) versions of the views that spend their time waiting on Supabase or Gemini.
+
+DRF views are synchronous, so under ASGI each of them still holds a thread
+for the whole upstream round trip. The views here are plain Django ``async def``
+views: Supabase calls go through ``supabase_http``'s pooled ``httpx.AsyncClient``
+and Gemini through the SDK's ``generate_content_async``, so one worker can
+keep many upstream calls in flight. Request parsing, payload building and
+error messages are shared with ``api_views`` so both paths answer the same.
+
+``api_urls`` routes to these views when ``settings.ASYNC_API_VIEWS`` is on
+(the default when served through ``torimo.asgi``).
+"""
+import asyncio
+import json
+from functools import wraps
+
+from django.http import HttpResponse, JsonResponse
+from django.views.decorators.csrf import csrf_exempt
+from rest_framework import exceptions, status
+
+from torimo import supabase_http
+from torimo.rate_limit import Overloaded
+from torimo.middleware.supabase_auth import require_supabase_auth
+from . import api_views
+from .api_views import (
+    BarcodeMealSerializer, DailyLogViewSet, ExerciseViewSet, MealViewSet,
+    CHAT_GENERATION, MEALS_TABLE, PROFILES_TABLE,
+    _barcode_meal_payload, _build_user_headers, _chat_events_async, _chat_stream_response,
+    _clean_chat_messages, _gemini_busy, _gemini_stream_text_async, _is_missing_barcode_column,
+    _notes_endpoint, _notes_error_response, _profile_chat_prompt, _profile_payload,
+    _supabase_error, _supabase_table_url, _vision_failure, _vision_image, _vision_model,
+    _vision_parts, _vision_request_image, _vision_result, _wants_chat_stream, ai_profile_chat_async,
+)
+
+UPSTREAM_FAILED = 'Supabase REST API との通信に失敗しました'
+
+
+def _response(data=None, status=200):
+    if data is None:
+        return HttpResponse(status=status)
+    return JsonResponse(data, status=status, safe=False, json_dumps_params={'ensure_ascii': False})
+
+
+def _busy_response(exc: Overloaded):
+    body, headers = _gemini_busy(exc)
+    response = _response(body, status=503)
+    for name, value in headers.items():
+        response[name] = value
+    return response
+
+
+def _request_data(request):
+    """``request.data`` as DRF would parse it: JSON bodies, else form fields."""
+    if request.content_type == 'application/json':
+        if not request.body:
+            return {}
+        try:
+            return json.loads(request.body)
+        except ValueError as exc:
+            raise exceptions.ParseError(f'JSON parse error - {exc}')
+    return request.POST
+
+
+def async_api_view(methods):
+    """``@api_view`` for async views: method check, ``request.data``/``query_params`` and APIException handling."""
+    allowed = [m.upper() for m in methods]
+
+    def decorator(view_func):
+        @csrf_exempt
+        @wraps(view_func)
+        async def _wrapped(request, *args, **kwargs):
+            try:
+                if request.method not in allowed:
+                    raise exceptions.MethodNotAllowed(request.method)
+                request.query_params = request.GET
+                request.data = _request_data(request) if request.method in ('POST', 'PUT', 'PATCH') else {}
+                return await view_func(request, *args, **kwargs)
+            except exceptions.APIException as exc:
+                detail = exc.detail if isinstance(exc.detail, (list, dict)) else {'detail': exc.detail}
+                response = _response(detail, status=exc.status_code)
+                if isinstance(exc, (exceptions.AuthenticationFailed, exceptions.NotAuthenticated)):
+                    response['WWW-Authenticate'] = 'Basic realm="api"'
+                return response
+
+        return _wrapped
+
+    return decorator
+
+
+class AsyncSupabaseProxy:
+    """Async list/create and retrieve/partial_update/destroy for a ``SupabaseProxyViewSet``.
+
+    Table name, ordering, list filters and payload preparation come from the
+    viewset class, so subclasses (e.g. MealViewSet's ``date`` filter) apply
+    unchanged.
+    """
+
+    def __init__(self, viewset_class):
+        self.viewset = viewset_class()
+        self.collection = async_api_view(['GET', 'POST'])(self._collection)
+        self.detail = async_api_view(['GET', 'PATCH', 'DELETE'])(self._detail)
+
+    async def _collection(self, request):
+        if request.method == 'POST':
+            return await self.create(request)
+        return await self.list(request)
+
+    async def _detail(self, request, pk):
+        if request.method == 'PATCH':
+            return await self.partial_update(request, pk)
+        if request.method == 'DELETE':
+            return await self.destroy(request, pk)
+        return await self.retrieve(request, pk)
+
+    async def _call(self, method, *args, **kwargs):
+        try:
+            return await method(self.viewset._table_url(), *args, **kwargs)
+        except supabase_http.SupabaseHTTPError:
+            raise exceptions.APIException('Failed to reach Supabase REST API.')
+
+    async def list(self, request):
+        self.viewset.check_supabase_user(request)
+        headers = _build_user_headers(request)
+        params = self.viewset.build_list_params(request)
+        resp = await self._call(supabase_http.aget, headers=headers, params=params, timeout=8)
+        if resp.status_code != 200:
+            raise exceptions.APIException(_supabase_error(resp))
+        return _response(resp.json())
+
+    async def retrieve(self, request, pk):
+        self.viewset.check_supabase_user(request)
+        headers = _build_user_headers(request)
+        params = {'select': '*', 'id': f'eq.{pk}', 'limit': '1'}
+        resp = await self._call(supabase_http.aget, headers=headers, params=params, timeout=8)
+        if resp.status_code != 200:
+            raise exceptions.APIException(_supabase_error(resp))
+        rows = resp.json() or []
+        if not rows:
+            raise exceptions.NotFound('Record not found.')
+        return _response(rows[0])
+
+    async def create(self, request):
+        self.viewset.check_supabase_user(request)
+        headers = _build_user_headers(request, 'return=representation')
+        payload = self.viewset.prepare_payload(request, request.data, create=True)
+        resp = await self._call(supabase_http.apost, headers=headers, json=[payload], timeout=8)
+        if resp.status_code not in (200, 201):
+            raise exceptions.APIException(_supabase_error(resp))
+        rows = resp.json() or []
+        return _response(rows[0] if rows else payload, status=status.HTTP_201_CREATED)
+
+    async def partial_update(self, request, pk):
+        self.viewset.check_supabase_user(request)
+        headers = _build_user_headers(request, 'return=representation')
+        payload = self.viewset.prepare_payload(request, request.data)
+        params = {'id': f'eq.{pk}'}
+        resp = await self._call(supabase_http.apatch, headers=headers, params=params, json=payload, timeout=8)
+        if resp.status_code not in (200, 204):
+            raise exceptions.APIException(_supabase_error(resp))
+        if resp.status_code == 204 or not resp.content:
+            return _response()
+        rows = resp.json() or []
+        return _response(rows[0] if rows else payload)
+
+    async def destroy(self, request, pk):
+        self.viewset.check_supabase_user(request, report_token=False)
+        headers = _build_user_headers(request)
+        params = {'id': f'eq.{pk}'}
+        resp = await self._call(supabase_http.adelete, headers=headers, params=params, timeout=8)
+        if resp.status_code not in (200, 204):
+            raise exceptions.APIException(_supabase_error(resp))
+        return _response(status=status.HTTP_204_NO_CONTENT)
+
+
+exercises = AsyncSupabaseProxy(ExerciseViewSet)
+meals = AsyncSupabaseProxy(MealViewSet)
+daily_logs = AsyncSupabaseProxy(DailyLogViewSet)
+
+
+@async_api_view(['POST'])
+@require_supabase_auth
+async def barcode_meal_create(request):
+    serializer = BarcodeMealSerializer(data=request.data)
+    serializer.is_valid(raise_exception=True)
+    supabase_user_id = getattr(request, 'supabase_user_id', None)
+    if not supabase_user_id:
+        return _response({'detail': 'Supabase authentication is required.'}, status=status.HTTP_401_UNAUTHORIZED)
+
+    payload = _barcode_meal_payload(serializer.validated_data, supabase_user_id)
+    headers = _build_user_headers(request, 'return=representation')
+
+    async def _post(payload_override):
+        return await supabase_http.apost(
+            _supabase_table_url(MEALS_TABLE),
+            headers=headers,
+            json=[payload_override],
+            timeout=8,
+        )
+
+    attempt_payload = dict(payload)
+    if not api_views._BARCODE_COLUMN_AVAILABLE:
+        attempt_payload.pop('barcode', None)
+
+    try:
+        resp = await _post(attempt_payload)
+        if resp.status_code not in (200, 201):
+            error_detail = _supabase_error(resp)
+            if not (api_views._BARCODE_COLUMN_AVAILABLE and _is_missing_barcode_column(error_detail)):
+                return _response({'detail': error_detail}, status=status.HTTP_502_BAD_GATEWAY)
+            api_views._BARCODE_COLUMN_AVAILABLE = False
+            attempt_payload.pop('barcode', None)
+            resp = await _post(attempt_payload)
+            if resp.status_code not in (200, 201):
+                return _response({'detail': _supabase_error(resp)}, status=status.HTTP_502_BAD_GATEWAY)
+    except supabase_http.SupabaseHTTPError:
+        return _response({'detail': UPSTREAM_FAILED}, status=status.HTTP_502_BAD_GATEWAY)
+
+    rows = resp.json() or []
+    return _response(rows[0] if rows else payload, status=status.HTTP_201_CREATED)
+
+
+@async_api_view(['GET', 'POST'])
+@require_supabase_auth
+async def user_profile_view(request):
+    supabase_user_id = getattr(request, 'supabase_user_id', None)
+    if not supabase_user_id:
+        return _response({'detail': 'Supabase authentication is required.'}, status=status.HTTP_401_UNAUTHORIZED)
+
+    if request.method == 'GET':
+        params = {'select': '*', 'supabase_user_id': f'eq.{supabase_user_id}', 'limit': '1'}
+        try:
+            resp = await supabase_http.aget(
+                _supabase_table_url(PROFILES_TABLE),
+                headers=_build_user_headers(request),
+                params=params,
+                timeout=8,
+            )
+        except supabase_http.SupabaseHTTPError:
+            return _response({'detail': UPSTREAM_FAILED}, status=status.HTTP_502_BAD_GATEWAY)
+
+        if resp.status_code != 200:
+            return _response({'detail': _supabase_error(resp)}, status=status.HTTP_502_BAD_GATEWAY)
+        rows = resp.json() or []
+        if not rows:
+            return _response({'detail': 'Profile not found.'}, status=status.HTTP_404_NOT_FOUND)
+        return _response({'profile': rows[0]})
+
+    payload = _profile_payload(request.data or {}, supabase_user_id)
+    try:
+        resp = await supabase_http.apost(
+            _supabase_table_url(PROFILES_TABLE),
+            headers=_build_user_headers(request, 'return=representation,resolution=merge-duplicates'),
+            params={'on_conflict': 'supabase_user_id'},
+            json=[payload],
+            timeout=8,
+        )
+    except supabase_http.SupabaseHTTPError:
+        return _response({'detail': UPSTREAM_FAILED}, status=status.HTTP_502_BAD_GATEWAY)
+
+    if resp.status_code not in (200, 201):
+        return _response({'detail': _supabase_error(resp)}, status=status.HTTP_502_BAD_GATEWAY)
+
+    rows = resp.json() or []
+    created = resp.status_code == 201
+    return _response({'created': created, 'profile': rows[0] if rows else payload}, status=status.HTTP_201_CREATED if created else status.HTTP_200_OK)
+
+
+@async_api_view(['GET', 'POST'])
+@require_supabase_auth
+async def notes_collection(request):
+    if request.method == 'GET':
+        try:
+            resp = await supabase_http.aget(
+                _notes_endpoint(),
+                headers=_build_user_headers(request),
+                params={
+                    'select': 'id,title,body,created_at',
+                    'order': 'created_at.desc',
+                },
+                timeout=6,
+            )
+        except RuntimeError as exc:
+            return _response({'detail': str(exc)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+        except supabase_http.SupabaseHTTPError:
+            return _response({'detail': UPSTREAM_FAILED}, status=status.HTTP_502_BAD_GATEWAY)
+
+        if resp.status_code != 200:
+            return _response({'detail': _notes_error_response(resp)}, status=status.HTTP_502_BAD_GATEWAY)
+        return _response({'notes': resp.json()})
+
+    title = (request.data or {}).get('title', '').strip()
+    body = (request.data or {}).get('body', '').strip()
+    if not title:
+        return _response({'detail': 'title は必須です'}, status=status.HTTP_400_BAD_REQUEST)
+
+    note_payload = {
+        'title': title,
+        'body': body,
+        'user_id': request.supabase_user_id,
+    }
+    try:
+        resp = await supabase_http.apost(
+            _notes_endpoint(),
+            headers=_build_user_headers(request, 'return=representation'),
+            json=[note_payload],
+            timeout=6,
+        )
+    except RuntimeError as exc:
+        return _response({'detail': str(exc)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+    except supabase_http.SupabaseHTTPError:
+        return _response({'detail': UPSTREAM_FAILED}, status=status.HTTP_502_BAD_GATEWAY)
+
+    if resp.status_code not in (200, 201):
+        return _response({'detail': _notes_error_response(resp)}, status=status.HTTP_502_BAD_GATEWAY)
+
+    rows = resp.json() or []
+    return _response({'note': rows[0] if rows else note_payload}, status=status.HTTP_201_CREATED)
+
+
+@async_api_view(['DELETE'])
+@require_supabase_auth
+async def note_detail(request, note_id: str):
+    try:
+        resp = await supabase_http.adelete(
+            _notes_endpoint(),
+            headers=_build_user_headers(request),
+            params={'id': f'eq.{note_id}'},
+            timeout=6,
+        )
+    except RuntimeError as exc:
+        return _response({'detail': str(exc)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+    except supabase_http.SupabaseHTTPError:
+        return _response({'detail': UPSTREAM_FAILED}, status=status.HTTP_502_BAD_GATEWAY)
+
+    if resp.status_code not in (200, 204):
+        return _response({'detail': _notes_error_response(resp)}, status=status.HTTP_502_BAD_GATEWAY)
+    return _response(status=status.HTTP_204_NO_CONTENT)
+
+
+@async_api_view(['POST'])
+async def analyze_nutrition_image(request):
+    """Async ``api_views.analyze_nutrition_image``: same inputs, same response."""
+    image_url, image_bytes, image_mime, error = _vision_request_image(request.FILES, request.data or {})
+    if error:
+        return _response({'error': error}, status=400)
+    if not image_url and image_bytes is None:
+        return _response({'error': 'No image provided'}, status=400)
+
+    try:
+        model, error = _vision_model()
+        if error:
+            return _response({'error': error}, status=503)
+        if image_bytes is None:
+            return _response({'error': 'Image bytes not available for Gemini'}, status=400)
+        await api_views.GEMINI_LIMITER.acquire_async()
+        # Decoding and resizing are CPU-bound; keep them off the event loop
+        image_bytes, image_mime = await asyncio.to_thread(_vision_image, image_bytes, image_mime)
+        resp = await model.generate_content_async(_vision_parts(image_bytes, image_mime))
+        text = (getattr(resp, 'text', None) or '').strip()
+        return _response(_vision_result(text), status=200)
+    except Overloaded as e:
+        return _busy_response(e)
+    except Exception as e:
+        return _response(*_vision_failure(e))
+
+
+@async_api_view(['POST'])
+async def assistant_chat(request):
+    """Async ``api_views.assistant_chat``."""
+    data = request.data or {}
+    profile = data.get('profile') or {}
+    clean_msgs = _clean_chat_messages(data.get('messages') or [])
+    try:
+        if _wants_chat_stream(request, data):
+            prompt, fallback = _profile_chat_prompt(clean_msgs, profile)
+            if fallback is None:
+                await api_views.GEMINI_LIMITER.acquire_async()
+                return _chat_stream_response(_chat_events_async(_gemini_stream_text_async(prompt, **CHAT_GENERATION), profile))
+        reply = await ai_profile_chat_async(clean_msgs, profile)
+    except Overloaded as e:
+        return _busy_response(e)
+    return _response({'reply': reply, 'profile_used': profile}, status=200)
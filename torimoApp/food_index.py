@@ -0,0 +1,332 @@
+"""In-memory lookup structures over the merged food dataset and alias keys.
+
+- ``FoodIndex``: exact / canonical hash maps, substring matches via a
+  ``SubstringIndex`` and fuzzy matches via an ``NgramIndex``, behind
+  ``csv_lookup`` / ``alias_lookup``. Every lookup returns the position of
+  the *first* matching row so results equal the former in-order scans.
+- ``SubstringIndex`` (suffix array with match offsets) and
+  ``CloseMatchIndex`` (``difflib`` with a character-overlap prefilter),
+  grouped as ``Autocomplete`` for ``search_foods`` / ``suggest_nutrition``.
+- ``FoodData``: the dataset's ``NutrientTable``, alias map and all of the
+  above, built together by ``api_views._build_food_data`` and published as
+  one object; ``content_version`` is its version / ETag digest.
+- ``save_snapshot`` / ``load_snapshot``: a pickle of ``FoodData`` reused
+  while the source files' fingerprints match, so workers skip the build.
+"""
+import difflib
+import hashlib
+import heapq
+import json
+import os
+import pickle
+import tempfile
+from bisect import bisect_left
+from collections import Counter
+from pathlib import Path
+
+_MAX_CHAR = '\U0010ffff'
+
+# Bump when the pickled layout of FoodData changes.
+SNAPSHOT_FORMAT = 5
+
+# Weights of the composite similarity used by the fuzzy fallbacks.
+SEQ_WEIGHT = 0.6
+JACCARD_WEIGHT = 0.4
+
+
+def _ngrams(s: str) -> set[str]:
+    return {s[i:i+2] for i in range(len(s)-1)} if len(s) > 1 else {s}
+
+
+def similarity(a: str, b: str) -> float:
+    """Composite similarity: sequence ratio * Jaccard of 2-gram sets."""
+    if not a or not b:
+        return 0.0
+    seq = difflib.SequenceMatcher(None, a, b).ratio()
+    A = _ngrams(a)
+    B = _ngrams(b)
+    inter = len(A & B)
+    union = len(A | B) or 1
+    jac = inter / union
+    # Weighted blend
+    return (seq * SEQ_WEIGHT) + (jac * JACCARD_WEIGHT)
+
+
+class NgramIndex:
+    """Bigram inverted index that shortlists candidates for ``similarity``.
+
+    A key sharing no bigram with the query scores at most ``SEQ_WEIGHT``, and
+    in general a score >= ``cutoff`` needs a Jaccard of at least
+    ``(cutoff - SEQ_WEIGHT) / JACCARD_WEIGHT``. Candidates are therefore
+    filtered by exact Jaccard (computed from posting-list overlap counts),
+    scored best-first, and scoring stops once no remaining candidate can beat
+    the current best.
+    """
+
+    def __init__(self, keys: list[str], limit: int | None = 64):
+        self.keys = keys
+        self.limit = limit
+        self._sizes = []
+        self._postings: dict[str, list[int]] = {}
+        for i, key in enumerate(keys):
+            grams = _ngrams(key) if key else set()
+            self._sizes.append(len(grams))
+            for g in grams:
+                self._postings.setdefault(g, []).append(i)
+
+    def best_match(self, query: str, cutoff: float) -> int | None:
+        """Position of the best-scoring key (first one on ties), if >= cutoff."""
+        if not query or not self.keys:
+            return None
+        grams = _ngrams(query)
+        overlap: dict[int, int] = {}
+        for g in grams:
+            for i in self._postings.get(g, ()):
+                overlap[i] = overlap.get(i, 0) + 1
+        min_jac = (cutoff - SEQ_WEIGHT) / JACCARD_WEIGHT - 1e-9
+        candidates = []
+        for i, inter in overlap.items():
+            jac = inter / (len(grams) + self._sizes[i] - inter)
+            if jac >= min_jac:
+                candidates.append((-jac, i))
+        candidates.sort()
+        if self.limit:
+            candidates = candidates[:self.limit]
+
+        best = None
+        best_score = 0.0
+        for neg_jac, i in candidates:
+            if SEQ_WEIGHT + JACCARD_WEIGHT * -neg_jac < best_score - 1e-9:
+                break
+            sc = similarity(query, self.keys[i])
+            if sc > best_score or (sc == best_score and best is not None and i < best):
+                best = i
+                best_score = sc
+        if best is not None and best_score >= cutoff:
+            return best
+        return None
+
+
+class FoodIndex:
+    """Hash maps plus a sorted suffix array over normalized food names.
+
+    ``norm_keys`` / ``canon_keys`` are parallel to the dataset rows (the output
+    of ``normalize_food_name`` / ``canonicalize_name`` for each row name).
+    ``substrings`` is the one suffix array over the rows; ``Autocomplete``
+    reuses it for ranked search instead of building a second one.
+    """
+
+    def __init__(self, norm_keys: list[str], canon_keys: list[str]):
+        self.size = len(norm_keys)
+        self.by_norm: dict[str, int] = {}
+        self.by_canon: dict[str, int] = {}
+        for i, key in enumerate(norm_keys):
+            self.by_norm.setdefault(key, i)
+        for i, key in enumerate(canon_keys):
+            self.by_canon.setdefault(key, i)
+        self.max_key_len = max((len(k) for k in self.by_norm), default=0)
+
+        self.substrings = SubstringIndex(norm_keys)
+
+        # Distinct keys in first-occurrence order for the fuzzy stage.
+        self._distinct_rows = list(self.by_norm.values())
+        self.fuzzy = NgramIndex(list(self.by_norm.keys()))
+
+    def exact(self, key: str) -> int | None:
+        return self.by_norm.get(key)
+
+    def canonical(self, key: str) -> int | None:
+        return self.by_canon.get(key)
+
+    def containing(self, key: str) -> set[int]:
+        """Rows whose normalized name contains ``key``."""
+        return set(self.substrings.occurrences(key))
+
+    def contained_in(self, key: str) -> set[int]:
+        """Rows whose normalized name is a substring of ``key``."""
+        found = set()
+        n = len(key)
+        for start in range(n):
+            for end in range(start + 1, min(n, start + self.max_key_len) + 1):
+                i = self.by_norm.get(key[start:end])
+                if i is not None:
+                    found.add(i)
+        return found
+
+    def substring(self, key: str) -> int | None:
+        """First row where the name contains ``key`` or ``key`` contains the name."""
+        if not self.size:
+            return None
+        rows = self.containing(key) | self.contained_in(key)
+        return min(rows) if rows else None
+
+    def similar(self, key: str, cutoff: float) -> int | None:
+        """Row with the highest ``similarity`` to ``key``, if it reaches ``cutoff``."""
+        i = self.fuzzy.best_match(key, cutoff)
+        return self._distinct_rows[i] if i is not None else None
+
+
+class SubstringIndex:
+    """Sorted suffix array over every key (duplicates included).
+
+    The suffixes starting at position 0 are the keys themselves, so a prefix
+    query is the same contiguous ``bisect`` range a prefix trie would walk,
+    and mid-word matches come from the same range. Work is proportional to
+    the number of occurrences, not to the number of keys.
+    """
+
+    def __init__(self, keys: list[str]):
+        self.keys = keys
+        triples = sorted((key[start:], i, start) for i, key in enumerate(keys) for start in range(len(key)))
+        self._suffixes = [t[0] for t in triples]
+        self._owners = [t[1] for t in triples]
+        self._starts = [t[2] for t in triples]
+
+    def occurrences(self, query: str) -> dict[int, int]:
+        """``{key position: first offset of query in that key}``."""
+        if not query:
+            return {i: 0 for i in range(len(self.keys))}
+        lo = bisect_left(self._suffixes, query)
+        hi = bisect_left(self._suffixes, query + _MAX_CHAR, lo)
+        found: dict[int, int] = {}
+        for i, start in zip(self._owners[lo:hi], self._starts[lo:hi]):
+            if start < found.get(i, start + 1):
+                found[i] = start
+        return found
+
+    def containing(self, query: str) -> list[int]:
+        """Positions of keys containing ``query``, in key order."""
+        return sorted(self.occurrences(query))
+
+    def ranked(self, query: str, limit: int | None = None) -> list[int]:
+        """Keys containing ``query``: exact, then prefix, then by match offset, length, position."""
+        found = self.occurrences(query)
+        keys = self.keys
+
+        def rank(i):
+            pos = found[i]
+            priority = 0 if keys[i] == query else (1 if pos == 0 else 2)
+            return (priority, pos, len(keys[i]), i)
+
+        if limit is not None and limit > 0:
+            return heapq.nsmallest(limit, found, key=rank)
+        return sorted(found, key=rank)
+
+
+class CloseMatchIndex:
+    """``difflib.get_close_matches`` over a fixed list, with identical results.
+
+    ``SequenceMatcher.ratio()`` never exceeds ``quick_ratio()``, the multiset
+    character overlap, which is computed here for every key at once from
+    per-character postings. Only keys whose overlap can reach ``cutoff`` are
+    handed to ``SequenceMatcher``.
+    """
+
+    def __init__(self, keys: list[str]):
+        self.keys = keys
+        self._postings: dict[str, list[tuple[int, int]]] = {}
+        for i, key in enumerate(keys):
+            for ch, count in Counter(key).items():
+                self._postings.setdefault(ch, []).append((i, count))
+
+    def close_matches(self, word: str, n: int = 3, cutoff: float = 0.6) -> list[str]:
+        if not word or cutoff <= 0.0 or n <= 0 or cutoff > 1.0:
+            return difflib.get_close_matches(word, self.keys, n=n, cutoff=cutoff)
+        overlap: dict[int, int] = {}
+        for ch, count in Counter(word).items():
+            for i, c in self._postings.get(ch, ()):
+                overlap[i] = overlap.get(i, 0) + min(count, c)
+        s = difflib.SequenceMatcher()
+        s.set_seq2(word)
+        result = []
+        for i, matches in overlap.items():
+            x = self.keys[i]
+            if 2.0 * matches / (len(word) + len(x)) < cutoff:
+                continue
+            s.set_seq1(x)
+            if s.real_quick_ratio() >= cutoff and s.quick_ratio() >= cutoff and s.ratio() >= cutoff:
+                result.append((s.ratio(), x))
+        return [x for score, x in heapq.nlargest(n, result)]
+
+
+class Autocomplete:
+    """Indexes behind ``search_foods`` / ``suggest_nutrition``.
+
+    ``rows`` is the row ``FoodIndex.substrings`` (normalized names parallel to
+    the dataset rows); ``alias_names`` the alias map keys in order with
+    ``alias_keys`` their normalized forms.
+    """
+
+    def __init__(self, rows: 'SubstringIndex', alias_names: list[str], alias_keys: list[str]):
+        self.rows = rows
+        self.close = CloseMatchIndex(rows.keys)
+        self.alias_names = alias_names
+        self.aliases = SubstringIndex(alias_keys)
+
+
+class FoodData:
+    """The merged dataset, alias map and their indexes, built and published together.
+
+    ``table`` is the ``NutrientTable`` of the merged rows (food id = row
+    position). ``sources`` are the (path, mtime_ns, size) fingerprints of the
+    files it was built from, used only to detect changes. ``version`` is a
+    digest of the content itself (see ``content_version``), so replicas
+    serving the same data agree on it and touching a file does not change it.
+    """
+
+    def __init__(self, table, match_index, index, alias_map, alias_norm, alias_keys, alias_index, sources=(),
+                 autocomplete: Autocomplete | None = None):
+        self.table = table
+        self.match_index = match_index
+        self.index = index
+        self.alias_map = alias_map
+        self.alias_norm = alias_norm
+        self.alias_keys = alias_keys
+        self.alias_index = alias_index
+        self.autocomplete = autocomplete
+        self.sources = list(sources)
+        self.version = content_version(table, match_index, alias_map, alias_keys)
+
+
+def content_version(table, row_keys: list[str], alias_map: dict, alias_keys: list[str]) -> str:
+    """Short digest of the served rows, their normalized keys and the alias map.
+
+    The normalized keys cover changes to the normalization code; the snapshot
+    format covers changes to the stored layout.
+    """
+    payload = json.dumps(
+        [SNAPSHOT_FORMAT, table.rows(), row_keys, list(alias_map.items()), alias_keys], ensure_ascii=False,
+    )
+    return hashlib.sha1(payload.encode('utf-8')).hexdigest()[:12]
+
+
+def save_snapshot(path, data: FoodData) -> bool:
+    """Atomically write ``data`` as a pickle; failures are ignored (the snapshot is only a cache)."""
+    path = Path(path)
+    tmp = None
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=str(path.parent), prefix=path.name, suffix='.tmp')
+        with os.fdopen(fd, 'wb') as fh:
+            pickle.dump((SNAPSHOT_FORMAT, data), fh, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, path)
+        return True
+    except Exception:
+        if tmp:
+            try:
+                os.unlink(tmp)
+            except OSError:
+                pass
+        return False
+
+
+def load_snapshot(path, sources) -> FoodData | None:
+    """Load a snapshot if it exists, has the current format and matches ``sources``."""
+    try:
+        with open(path, 'rb') as fh:
+            fmt, data = pickle.load(fh)
+    except Exception:
+        return None
+    if fmt != SNAPSHOT_FORMAT or not isinstance(data, FoodData) or data.sources != list(sources):
+        return None
+    return data
@@ -0,0 +1,178 @@
+"""Column-oriented storage for the merged food dataset's nutrient values.
+
+Rows are addressed by integer food id (their position in the dataset). Each
+macro is a contiguous ``array('d')`` instead of a float inside a nested dict
+per food, and per-unit data is stored in the same columns with NaN marking
+"absent". ``FoodRecord`` is the small ``__slots__`` view handed to request
+code for one resolved food.
+"""
+import math
+from array import array
+
+MACROS = ('calories', 'protein', 'fat', 'carbs')
+_NAN = float('nan')
+
+
+def _opt(value: float):
+    return None if math.isnan(value) else value
+
+
+class FoodRecord:
+    """Nutrients of one resolved food: per-100 g/ml macros plus optional per-unit data.
+
+    ``food_id`` is the dataset row for CSV hits and ``None`` for foods that
+    came from FDC or the offline table. ``per_unit`` keeps the former
+    ``{'grams', 'label', 'nutrients'}`` shape.
+    """
+
+    __slots__ = ('food_id', 'per', 'calories', 'protein', 'fat', 'carbs', 'source', 'per_unit')
+
+    def __init__(self, food_id=None, per=None, calories=None, protein=None, fat=None, carbs=None,
+                 source=None, per_unit=None):
+        self.food_id = food_id
+        self.per = per
+        self.calories = calories
+        self.protein = protein
+        self.fat = fat
+        self.carbs = carbs
+        self.source = source
+        self.per_unit = per_unit
+
+    @classmethod
+    def from_base(cls, base: dict, source: str | None = None, food_id=None) -> 'FoodRecord':
+        """Wrap a legacy ``base`` dict (FDC, offline table); ``source`` overrides its tag."""
+        return cls(
+            food_id, base.get('per'), base.get('calories'), base.get('protein'), base.get('fat'),
+            base.get('carbs'), source or base.get('source'), base.get('per_unit') or None,
+        )
+
+    def as_base(self) -> dict:
+        """The legacy ``base`` dict; keys that were absent are left out."""
+        base = {k: getattr(self, k) for k in ('per',) + MACROS + ('source',) if getattr(self, k) is not None}
+        if self.per_unit:
+            base['per_unit'] = self.per_unit
+        return base
+
+    def macros(self) -> tuple:
+        """Per-100 g/ml macros in ``MACROS`` order; absent values are 0."""
+        return (self.calories or 0.0, self.protein or 0.0, self.fat or 0.0, self.carbs or 0.0)
+
+    def unit_macros(self) -> tuple:
+        """Macros of one unit serving: the unit's own values, else scaled from per-100 g."""
+        nutrients = self.per_unit.get('nutrients') or {}
+        unit_scale = (self.per_unit.get('grams') or 100.0) / 100.0
+        return tuple(
+            float(nutrients[k]) if nutrients.get(k) is not None else (getattr(self, k) or 0.0) * unit_scale
+            for k in MACROS
+        )
+
+    def __repr__(self):
+        return f'FoodRecord({self.as_base()!r}, food_id={self.food_id!r})'
+
+
+def scale_macros(vectors: list[tuple], multipliers: list[float], ndigits: int = 1) -> list[tuple]:
+    """``round(v * m, ndigits)`` for every macro vector ``v`` and its serving multiplier ``m``."""
+    return [
+        (round(c * m, ndigits), round(p * m, ndigits), round(f * m, ndigits), round(cb * m, ndigits))
+        for (c, p, f, cb), m in zip(vectors, multipliers)
+    ]
+
+
+def macro_totals(rows: list[tuple], ndigits: int = 1) -> dict:
+    """Column sums of ``scale_macros`` output, keyed by macro.
+
+    Accumulated left to right (not ``sum()``/``fsum``) so totals match the
+    per-item running sums the API has always reported.
+    """
+    c = p = f = cb = 0.0
+    for rc, rp, rf, rcb in rows:
+        c += rc
+        p += rp
+        f += rf
+        cb += rcb
+    return {'calories': round(c, ndigits), 'protein': round(p, ndigits), 'fat': round(f, ndigits), 'carbs': round(cb, ndigits)}
+
+
+class NutrientTable:
+    """Parallel columns built from ``[{'name', 'base'}]`` rows; ``row(i)`` rebuilds row ``i``.
+
+    ``per`` and ``source`` are small integer codes into interned string lists.
+    Per-unit grams and per-unit macros are NaN for foods without a unit
+    serving; unit labels are kept sparsely.
+    """
+
+    def __init__(self, rows: list[dict]):
+        self.names: list[str] = []
+        self.per_values: list = []
+        self.source_values: list = []
+        self.per = array('B')
+        self.source = array('B')
+        self.columns = {k: array('d') for k in MACROS}
+        self.unit_grams = array('d')
+        self.unit_columns = {k: array('d') for k in MACROS}
+        self.unit_labels: dict[int, str] = {}
+        for i, row in enumerate(rows):
+            base = row.get('base') or {}
+            self.names.append(row['name'])
+            self.per.append(self._code(self.per_values, base.get('per')))
+            self.source.append(self._code(self.source_values, base.get('source')))
+            for k in MACROS:
+                v = base.get(k)
+                self.columns[k].append(_NAN if v is None else v)
+            unit = base.get('per_unit') or {}
+            grams = unit.get('grams')
+            self.unit_grams.append(_NAN if grams is None else grams)
+            nutrients = unit.get('nutrients') or {}
+            for k in MACROS:
+                v = nutrients.get(k)
+                self.unit_columns[k].append(_NAN if v is None else v)
+            if unit.get('label') is not None:
+                self.unit_labels[i] = unit['label']
+        self._has_unit = bytes(
+            1 if (not math.isnan(self.unit_grams[i]) or i in self.unit_labels
+                  or any(not math.isnan(self.unit_columns[k][i]) for k in MACROS)) else 0
+            for i in range(len(self.names))
+        )
+
+    @staticmethod
+    def _code(values: list, value) -> int:
+        try:
+            return values.index(value)
+        except ValueError:
+            values.append(value)
+            return len(values) - 1
+
+    def __len__(self):
+        return len(self.names)
+
+    def macro(self, i: int, key: str):
+        return _opt(self.columns[key][i])
+
+    def per_unit(self, i: int) -> dict | None:
+        if not self._has_unit[i]:
+            return None
+        unit = {}
+        grams = _opt(self.unit_grams[i])
+        if grams is not None:
+            unit['grams'] = grams
+        if i in self.unit_labels:
+            unit['label'] = self.unit_labels[i]
+        nutrients = {k: _opt(self.unit_columns[k][i]) for k in MACROS}
+        if any(v is not None for v in nutrients.values()):
+            unit['nutrients'] = {k: v for k, v in nutrients.items() if v is not None}
+        return unit
+
+    def record(self, i: int, source: str | None = None) -> FoodRecord:
+        return FoodRecord(
+            i, self.per_values[self.per[i]],
+            _opt(self.columns['calories'][i]), _opt(self.columns['protein'][i]),
+            _opt(self.columns['fat'][i]), _opt(self.columns['carbs'][i]),
+            source or self.source_values[self.source[i]], self.per_unit(i),
+        )
+
+    def row(self, i: int) -> dict:
+        """Row ``i`` in the former ``{'name', 'base'}`` shape."""
+        return {'name': self.names[i], 'base': self.record(i).as_base()}
+
+    def rows(self) -> list[dict]:
+        return [self.row(i) for i in range(len(self))]
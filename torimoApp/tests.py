@@ -26,3 +26,1027 @@ class NutritionAnalyzeViewTests(TestCase):
 			data = resp.json()
 			self.assertIn('totals', data)
 			self.assertIn('items', data)
+
+
+class SupabaseHttpClientTests(TestCase):
+	def tearDown(self):
+		from torimo import supabase_http
+		supabase_http.close_client()
+
+	def test_client_is_reused_within_process(self):
+		from torimo import supabase_http
+		self.assertIs(supabase_http.get_client(), supabase_http.get_client())
+
+	def test_client_is_recreated_after_fork(self):
+		from torimo import supabase_http
+		first = supabase_http.get_client()
+		supabase_http._client_pid = -1  # simulate a forked worker
+		self.assertIsNot(supabase_http.get_client(), first)
+
+	async def test_async_client_is_shared_within_event_loop(self):
+		from torimo import supabase_http
+		client = supabase_http.get_async_client()
+		self.assertIs(supabase_http.get_async_client(), client)
+		await supabase_http.aclose_client()
+		self.assertTrue(client.is_closed)
+		self.assertIsNot(supabase_http.get_async_client(), client)
+		await supabase_http.aclose_client()
+
+
+class FoodIndexTests(TestCase):
+	def test_lookups_return_first_matching_row(self):
+		from torimoApp.food_index import FoodIndex
+		norm = ['ご飯', '鶏胸肉', 'ご飯', '鶏胸肉ステーキ']
+		index = FoodIndex(norm, norm)
+		self.assertEqual(index.exact('ご飯'), 0)
+		self.assertEqual(index.canonical('鶏胸肉'), 1)
+		# both "key in name" and "name in key" directions
+		self.assertEqual(index.substring('胸肉'), 1)
+		self.assertEqual(index.substring('ご飯大盛り'), 0)
+		self.assertEqual(index.substring('ステーキ'), 3)
+		self.assertIsNone(index.substring('パン'))
+
+	def test_ngram_index_matches_brute_force_similarity(self):
+		from torimoApp.food_index import NgramIndex, similarity
+		keys = ['鶏胸肉', '鶏もも肉', '豚ひき肉', 'ご飯', 'みそ汁', '焼き鳥', 'さば味噌煮']
+		index = NgramIndex(keys)
+		for query in ['鶏胸にく', '豚ひき', 'みそしる', 'さば味噌', 'パン', 'ご']:
+			scores = [similarity(query, k) for k in keys]
+			best = max(range(len(keys)), key=lambda i: (scores[i], -i))
+			expected = best if scores[best] >= 0.68 else None
+			self.assertEqual(index.best_match(query, 0.68), expected, query)
+
+
+class ResolveFoodsBatchTests(TestCase):
+	def test_dedupes_and_runs_fdc_fallbacks_concurrently(self):
+		import os
+		import time
+		from unittest import mock
+		from torimoApp import api_views
+
+		calls = []
+
+		def slow_fdc(name):
+			calls.append(name)
+			time.sleep(0.3)
+			return {'per': '100g', 'calories': 100.0, 'protein': 1.0, 'fat': 1.0, 'carbs': 1.0}
+
+		names = ['未知食品A', '未知食品B', '未知食品C', '未知食品A']
+		with mock.patch.dict(os.environ, {'FOODDATA_API_KEY': 'test'}), \
+				mock.patch.object(api_views, 'csv_lookup', return_value=None), \
+				mock.patch.object(api_views, 'fdc_lookup', side_effect=slow_fdc):
+			started = time.monotonic()
+			resolved = api_views.resolve_foods_batch(names)
+			elapsed = time.monotonic() - started
+
+		self.assertEqual(len(calls), 3)
+		self.assertLess(elapsed, 0.8)
+		self.assertEqual(resolved['未知食品B'][1].source, 'fdc')
+
+	def test_deadline_drops_slow_fallbacks(self):
+		import os
+		import time
+		from unittest import mock
+		from torimoApp import api_views
+
+		def slow_fdc(name):
+			time.sleep(0.5)
+			return {'per': '100g', 'calories': 1.0}
+
+		with mock.patch.dict(os.environ, {'FOODDATA_API_KEY': 'test'}), \
+				mock.patch.object(api_views, 'csv_lookup', return_value=None), \
+				mock.patch.object(api_views, 'fdc_lookup', side_effect=slow_fdc):
+			resolved = api_views.resolve_foods_batch(['未知食品'], deadline=time.monotonic() + 0.05)
+		self.assertEqual(resolved['未知食品'], ('未知食品', None))
+
+	def test_slow_fdc_leaves_budget_for_ai_fallback(self):
+		import os
+		import time
+		from unittest import mock
+		from torimoApp import api_views
+
+		def slow_fdc(name):
+			time.sleep(1.0)
+			return None
+
+		ai_calls = []
+
+		def normalize(name, max_wait=None):
+			ai_calls.append(max_wait)
+			return 'ご飯'
+
+		csv_lookup, unknown = api_views.csv_lookup, api_views.canonicalize_name('謎のごはん')
+		with mock.patch.dict(os.environ, {'FOODDATA_API_KEY': 'test'}), \
+				mock.patch.object(api_views, '_gemini_configured', return_value=True), \
+				mock.patch.object(api_views, 'csv_lookup', side_effect=lambda n: None if n == unknown else csv_lookup(n)), \
+				mock.patch.object(api_views, 'fdc_lookup', side_effect=slow_fdc), \
+				mock.patch.object(api_views, 'offline_lookup', return_value=None), \
+				mock.patch.object(api_views, 'ai_normalize_name', side_effect=normalize):
+			started = time.monotonic()
+			resolved = api_views.resolve_foods_batch(['謎のごはん'], deadline=started + 0.6)
+			elapsed = time.monotonic() - started
+
+		self.assertEqual(len(ai_calls), 1)
+		self.assertGreater(ai_calls[0], 0.2)  # about half of the 0.6 s budget was kept for Gemini
+		self.assertEqual(resolved['謎のごはん'][0], 'ご飯')
+		self.assertIsNotNone(resolved['謎のごはん'][1])
+		self.assertLess(elapsed, 0.7)
+
+
+class TTLCacheTests(TestCase):
+	def test_lru_eviction_and_expiry_are_counted(self):
+		from torimo.ttl_cache import TTLCache
+		now = [1000.0]
+		cache = TTLCache(maxsize=2, clock=lambda: now[0])
+		cache.set('a', 1, expires_at=1010)
+		cache.set('b', 2, expires_at=2000)
+		self.assertEqual(cache.get('a'), 1)  # 'a' becomes most recently used
+		cache.set('c', 3, expires_at=2000)  # evicts 'b'
+		self.assertIsNone(cache.get('b'))
+		now[0] = 1011.0
+		self.assertIsNone(cache.get('a'))  # expired
+		stats = cache.stats()
+		self.assertEqual((stats['hits'], stats['misses']), (1, 2))
+		self.assertEqual((stats['evictions'], stats['expirations'], stats['size']), (1, 1, 1))
+
+	def test_tiered_cache_purges_expired_disk_rows(self):
+		import os
+		import sqlite3
+		import tempfile
+		from torimo.ttl_cache import TieredCache
+		now = [1000.0]
+		path = os.path.join(tempfile.mkdtemp(), 'cache.sqlite3')
+		cache = TieredCache(ttl=60, path=path, table='t', clock=lambda: now[0], purge_interval=300)
+		cache.set('old', 1)
+		cache.set('keep', 2, ttl=3600)
+		now[0] = 1100.0  # 'old' expired, but the purge interval has not elapsed
+		cache.set('new', 3)
+		rows = lambda: sorted(k for (k,) in sqlite3.connect(path).execute('SELECT key FROM t'))
+		self.assertEqual(rows(), ['keep', 'new', 'old'])
+		now[0] = 1400.0
+		cache.set('newer', 4)
+		self.assertEqual(rows(), ['keep', 'newer'])
+		self.assertEqual(cache.stats()['disk_purged'], 2)
+		self.assertIsNone(cache.get('old'))
+
+	def test_token_cache_expiry_follows_exp_claim(self):
+		import time
+		import jwt
+		from torimo.middleware import supabase_auth
+		now = time.time()
+		token = jwt.encode({'sub': 'u1', 'exp': int(now) + 5}, 'secret', algorithm='HS256')
+		self.assertEqual(supabase_auth._token_expiry(token, now), int(now) + 5)
+		token = jwt.encode({'sub': 'u1', 'exp': int(now) + 3600}, 'secret', algorithm='HS256')
+		self.assertEqual(supabase_auth._token_expiry(token, now), now + supabase_auth.CACHE_SECONDS)
+
+
+class TokenValidatorSingleFlightTests(TestCase):
+	def _patched(self, fake_get):
+		from unittest import mock
+		from torimo.middleware import supabase_auth
+		return mock.patch.multiple(
+			supabase_auth,
+			USERINFO_ENDPOINT='https://example.supabase.co/auth/v1/user',
+			SUPABASE_SERVICE_ROLE_KEY='service',
+			SUPABASE_JWT_SECRET=None,
+		), mock.patch.object(supabase_auth.supabase_http, 'get', side_effect=fake_get)
+
+	def test_concurrent_validations_share_one_request(self):
+		import threading
+		import time
+		from unittest import mock
+		from torimo.middleware.supabase_auth import SupabaseTokenValidator
+
+		calls = []
+
+		def fake_get(url, **kwargs):
+			calls.append(url)
+			time.sleep(0.2)
+			return mock.Mock(status_code=200, json=lambda: {'id': 'u1'})
+
+		validator = SupabaseTokenValidator()
+		results = []
+		env, get = self._patched(fake_get)
+		with env, get:
+			threads = [threading.Thread(target=lambda: results.append(validator.validate('tok'))) for _ in range(5)]
+			for t in threads:
+				t.start()
+			for t in threads:
+				t.join()
+		self.assertEqual(len(calls), 1)
+		self.assertEqual(results, [{'id': 'u1'}] * 5)
+
+	def test_rejected_tokens_are_negatively_cached(self):
+		from unittest import mock
+		from torimo.middleware.supabase_auth import SupabaseTokenValidator, SupabaseTokenError
+
+		calls = []
+
+		def fake_get(url, **kwargs):
+			calls.append(url)
+			return mock.Mock(status_code=401, text='invalid JWT')
+
+		validator = SupabaseTokenValidator()
+		env, get = self._patched(fake_get)
+		with env, get:
+			for _ in range(3):
+				with self.assertRaises(SupabaseTokenError):
+					validator.validate('bad')
+		self.assertEqual(len(calls), 1)
+
+
+class JWKSVerificationTests(TestCase):
+	def test_asymmetric_tokens_are_verified_without_network(self):
+		import json
+		import tempfile
+		import time
+		from unittest import mock
+		import jwt
+		from cryptography.hazmat.primitives.asymmetric import ec, rsa
+		from jwt.algorithms import ECAlgorithm, RSAAlgorithm
+		from torimo.middleware import supabase_auth
+
+		rsa_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+		ec_key = ec.generate_private_key(ec.SECP256R1())
+		rsa_jwk = json.loads(RSAAlgorithm.to_jwk(rsa_key.public_key())) | {'kid': 'rsa-1'}
+		ec_jwk = json.loads(ECAlgorithm.to_jwk(ec_key.public_key())) | {'kid': 'ec-1'}
+		with tempfile.NamedTemporaryFile('w', suffix='.json', delete=False) as fh:
+			json.dump({'keys': [rsa_jwk, ec_jwk]}, fh)
+
+		store = supabase_auth.JWKSKeyStore(path=fh.name)
+		claims = {'sub': 'u1', 'aud': 'authenticated', 'exp': int(time.time()) + 60}
+		rs_token = jwt.encode(claims, rsa_key, algorithm='RS256', headers={'kid': 'rsa-1'})
+		es_token = jwt.encode(claims, ec_key, algorithm='ES256', headers={'kid': 'ec-1'})
+		wrong_kid = jwt.encode(claims, rsa_key, algorithm='RS256', headers={'kid': 'ec-1'})
+
+		validator = supabase_auth.SupabaseTokenValidator()
+		with mock.patch.object(supabase_auth, '_jwks', store), \
+				mock.patch.object(supabase_auth.supabase_http, 'get', side_effect=AssertionError('network used')):
+			self.assertEqual(validator._decode_locally(rs_token)['sub'], 'u1')
+			self.assertEqual(validator._decode_locally(es_token)['sub'], 'u1')
+			self.assertIsNone(validator._decode_locally(wrong_kid))
+
+
+class FdcCacheTests(TestCase):
+	def test_hits_and_misses_are_cached_and_persisted(self):
+		import os
+		import tempfile
+		from unittest import mock
+		from torimo.ttl_cache import TieredCache
+		from torimoApp import api_views
+
+		path = os.path.join(tempfile.mkdtemp(), 'fdc.sqlite3')
+		macros = {'per': '100g', 'calories': 52.0, 'protein': 0.3, 'fat': 0.2, 'carbs': 14.0}
+		fetch = mock.Mock(side_effect=lambda name, key: macros if name == 'apple' else None)
+		with mock.patch.dict(os.environ, {'FOODDATA_API_KEY': 'test'}), \
+				mock.patch.object(api_views, 'FDC_CACHE', TieredCache(path=path, ttl=60, table='fdc_search')), \
+				mock.patch.object(api_views, '_fdc_fetch', fetch):
+			self.assertEqual(api_views.fdc_lookup('apple'), macros)
+			self.assertEqual(api_views.fdc_lookup('Apple '), macros)
+			self.assertIsNone(api_views.fdc_lookup('unknownfood'))
+			self.assertIsNone(api_views.fdc_lookup('unknownfood'))
+			self.assertEqual(fetch.call_count, 2)
+
+			# A fresh process (empty memory tier) is served from the SQLite file.
+			api_views.FDC_CACHE = TieredCache(path=path, ttl=60, table='fdc_search')
+			self.assertEqual(api_views.fdc_lookup('apple'), macros)
+			self.assertEqual(fetch.call_count, 2)
+			self.assertEqual(api_views.FDC_CACHE.stats()['disk_hits'], 1)
+
+	def test_transport_errors_are_not_cached(self):
+		import os
+		from unittest import mock
+		from torimo.ttl_cache import TieredCache
+		from torimoApp import api_views
+
+		fetch = mock.Mock(side_effect=TimeoutError)
+		with mock.patch.dict(os.environ, {'FOODDATA_API_KEY': 'test'}), \
+				mock.patch.object(api_views, 'FDC_CACHE', TieredCache(ttl=60)), \
+				mock.patch.object(api_views, '_fdc_fetch', fetch):
+			self.assertIsNone(api_views.fdc_lookup('apple'))
+			self.assertIsNone(api_views.fdc_lookup('apple'))
+		self.assertEqual(fetch.call_count, 2)
+
+
+class GeminiMemoTests(TestCase):
+	def test_deterministic_prompts_are_memoized(self):
+		from unittest import mock
+		import google.generativeai as genai
+		from torimo import gemini_client
+		from torimo.ttl_cache import TieredCache
+		from torimoApp import api_views
+
+		gemini_client.reset()
+		self.addCleanup(gemini_client.reset)
+		model = mock.Mock()
+		model.generate_content.return_value = mock.Mock(text='ご飯')
+		with mock.patch.object(api_views, '_gemini_configured', return_value=True), \
+				mock.patch.object(api_views, 'GEMINI_CACHE', TieredCache(ttl=60)) as cache, \
+				mock.patch.object(genai, 'configure'), \
+				mock.patch.object(genai, 'GenerativeModel', return_value=model):
+			self.assertEqual(api_views.ai_normalize_name('ライス'), 'ご飯')
+			self.assertEqual(api_views.ai_normalize_name('ライス'), 'ご飯')
+			self.assertEqual(model.generate_content.call_count, 1)
+			# Free-form chat is not deterministic and must not be memoized.
+			api_views._gemini_generate_text('hello')
+			api_views._gemini_generate_text('hello')
+			self.assertEqual(model.generate_content.call_count, 3)
+			self.assertEqual(cache.stats()['hits'], 1)
+
+
+class GeminiModelRegistryTests(TestCase):
+	def test_models_are_configured_once_and_reused(self):
+		import os
+		from unittest import mock
+		import google.generativeai as genai
+		from torimo import gemini_client
+
+		gemini_client.reset()
+		self.addCleanup(gemini_client.reset)
+		with mock.patch.dict(os.environ, {'GOOGLE_API_KEY': 'k1'}), \
+				mock.patch.object(genai, 'configure') as configure, \
+				mock.patch.object(genai, 'GenerativeModel', side_effect=lambda *a, **kw: mock.Mock()) as factory:
+			config = {'max_output_tokens': 16, 'temperature': 0.0}
+			first = gemini_client.get_model('gemini-1.5-flash', config)
+			self.assertIs(gemini_client.get_model('gemini-1.5-flash', dict(reversed(config.items()))), first)
+			self.assertIsNot(gemini_client.get_model('gemini-1.5-flash'), first)
+			self.assertEqual((configure.call_count, factory.call_count), (1, 2))
+			factory.assert_any_call('gemini-1.5-flash', generation_config=config)
+
+			os.environ['GOOGLE_API_KEY'] = 'k2'  # key rotation rebuilds the handles
+			self.assertIsNot(gemini_client.get_model('gemini-1.5-flash', config), first)
+			configure.assert_called_with(api_key='k2')
+			gemini_client._models_key = (-1, 'k2')  # simulate a forked worker
+			gemini_client.get_model('gemini-1.5-flash', config)
+			self.assertEqual(configure.call_count, 3)
+
+
+class GeminiRateLimitTests(TestCase):
+	def test_token_bucket_books_future_tokens_within_wait_budget(self):
+		from torimo.rate_limit import TokenBucket
+
+		now = [0.0]
+		bucket = TokenBucket(rate=2, burst=2, clock=lambda: now[0])
+		self.assertEqual(bucket.reserve(0), (True, 0.0))
+		self.assertEqual(bucket.reserve(0), (True, 0.0))
+		self.assertEqual(bucket.reserve(0.4), (False, 0.5))
+		self.assertEqual(bucket.reserve(1), (True, 0.5))  # queued behind the refill
+		self.assertEqual(bucket.reserve(1), (True, 1.0))
+		now[0] = 10.0
+		self.assertEqual(bucket.reserve(0), (True, 0.0))
+
+	def test_full_queue_sheds_immediately_and_reports_metrics(self):
+		import asyncio
+		import threading
+		import time
+		from torimo.rate_limit import Overloaded, RateLimiter, TokenBucket
+
+		limiter = RateLimiter(TokenBucket(rate=20, burst=1), max_queue=1, max_wait=1)
+		self.assertEqual(limiter.acquire(), 0.0)
+		waiter = threading.Thread(target=limiter.acquire)
+		waiter.start()
+		while limiter.queue_depth < 1:
+			time.sleep(0.001)
+		with self.assertRaises(Overloaded) as ctx:
+			limiter.acquire()
+		self.assertEqual(ctx.exception.reason, 'queue full')
+		waiter.join()
+		self.assertGreater(asyncio.run(limiter.acquire_async()), 0)
+		with self.assertRaises(Overloaded):
+			limiter.acquire(max_wait=0)
+
+		stats = limiter.stats()
+		self.assertEqual(stats['queue_depth'], 0)
+		self.assertEqual(stats['queue_depth_max'], 1)
+		self.assertEqual((stats['admitted'], stats['queued'], stats['shed_queue_full'], stats['shed_wait']), (3, 2, 1, 1))
+		self.assertGreater(stats['wait_ms']['max'], 0)
+
+	def test_shared_bucket_is_reserved_outside_lock_and_event_loop(self):
+		import asyncio
+		import threading
+		from torimo.rate_limit import RateLimiter, TokenBucket
+
+		calls = []
+
+		class SharedBucket(TokenBucket):
+			shared = True
+
+			def reserve(self, max_wait):
+				calls.append((limiter._lock.locked(), threading.current_thread() is threading.main_thread()))
+				return super().reserve(max_wait)
+
+		limiter = RateLimiter(SharedBucket(rate=100, burst=1), max_queue=4, max_wait=1)
+		limiter.acquire()
+		asyncio.run(limiter.acquire_async())
+		self.assertEqual(calls, [(False, True), (False, False)])
+		self.assertEqual(limiter.stats()['queue_depth'], 0)
+
+	def test_sqlite_bucket_is_shared_between_instances(self):
+		import os
+		import tempfile
+		from torimo.rate_limit import SQLiteTokenBucket
+
+		path = os.path.join(tempfile.mkdtemp(), 'limits.sqlite3')
+		first = SQLiteTokenBucket(rate=1, burst=1, path=path, name='gemini')
+		second = SQLiteTokenBucket(rate=1, burst=1, path=path, name='gemini')
+		self.assertEqual(first.reserve(0), (True, 0.0))
+		granted, wait = second.reserve(0)
+		self.assertFalse(granted)
+		self.assertGreater(wait, 0.9)
+		self.assertEqual(second.errors, 0)
+
+	def test_shed_chat_answers_503_and_normalization_degrades(self):
+		from unittest import mock
+		from torimo.rate_limit import RateLimiter, TokenBucket
+		from torimoApp import api_views
+
+		limiter = RateLimiter(TokenBucket(rate=0.5, burst=1), max_queue=0)
+		limiter.acquire()
+		model = mock.Mock()
+		body = {'messages': [{'role': 'user', 'content': '夕食は？'}], 'profile': {}}
+		with mock.patch.object(api_views, 'GEMINI_LIMITER', limiter), \
+				mock.patch.object(api_views, '_gemini_configured', return_value=True), \
+				mock.patch.object(api_views, '_gemini_model', return_value=model):
+			res = Client().post(reverse('assistant-chat'), data=json.dumps(body), content_type='application/json')
+			self.assertIsNone(api_views.ai_normalize_name('未知の料理'))
+			status = self.client.get(reverse('assistant-status')).json()['gemini_limiter']
+		self.assertEqual(res.status_code, 503)
+		self.assertEqual(res.json()['error'], 'gemini_busy')
+		self.assertEqual(res['Retry-After'], '2')
+		model.generate_content.assert_not_called()
+		self.assertEqual(status['shed_queue_full'], 2)
+
+
+class VisionImagePrepTests(TestCase):
+	def _jpeg(self, size, orientation=None) -> bytes:
+		import io
+		from PIL import Image
+
+		options = {}
+		if orientation:
+			exif = Image.Exif()
+			exif[0x0112] = orientation
+			exif[0x8825] = {1: 'N'}  # GPS IFD
+			options['exif'] = exif.tobytes()
+		out = io.BytesIO()
+		Image.linear_gradient('L').resize(size).convert('RGB').save(out, 'JPEG', quality=95, **options)
+		return out.getvalue()
+
+	def test_prepare_downscales_rotates_and_strips_exif(self):
+		import io
+		from PIL import Image
+		from torimo import image_prep
+
+		data = self._jpeg((4000, 3000), orientation=6)
+		out, mime = image_prep.prepare(data, 'image/jpeg', max_edge=1024)
+		img = Image.open(io.BytesIO(out))
+		self.assertEqual((mime, img.size), ('image/jpeg', (768, 1024)))
+		self.assertEqual(dict(img.getexif()), {})
+		self.assertLess(len(out), len(data))
+
+		small = self._jpeg((64, 48))
+		out, _ = image_prep.prepare(small, 'image/jpeg', max_edge=1024)
+		self.assertEqual(Image.open(io.BytesIO(out)).size, (64, 48))
+		self.assertLessEqual(len(out), len(small))  # never larger than what was uploaded
+		self.assertEqual(image_prep.prepare(b'not an image', 'image/png'), (b'not an image', 'image/png'))
+		self.assertEqual(image_prep.prepare(data, 'image/jpeg', max_edge=0), (data, 'image/jpeg'))
+
+	def test_vision_view_sends_prepared_image(self):
+		import base64
+		import io
+		from unittest import mock
+		from PIL import Image
+		from torimoApp import api_views
+
+		model = mock.Mock()
+		model.generate_content.return_value = mock.Mock(text='{"items":[{"name":"ご飯","calories":250,"protein":4,"fat":0.5,"carbs":55}]}')
+		data_url = 'data:image/png;base64,' + base64.b64encode(self._jpeg((3000, 2000))).decode('ascii')
+		with mock.patch.object(api_views, '_vision_model', return_value=(model, None)), \
+				mock.patch.object(api_views, 'VISION_IMAGE_MAX_EDGE', 600):
+			res = self.client.post(reverse('nutrition-vision-analyze'), data=json.dumps({'image_base64': data_url}), content_type='application/json')
+		self.assertEqual(res.status_code, 200)
+		self.assertEqual(res.json()['totals']['calories'], 250)
+		sent = model.generate_content.call_args.args[0][1]
+		self.assertEqual(sent['mime_type'], 'image/jpeg')
+		self.assertEqual(Image.open(io.BytesIO(sent['data'])).size, (600, 400))
+
+
+class FoodSnapshotTests(TestCase):
+	def test_snapshot_is_reused_only_while_sources_match(self):
+		import os
+		import tempfile
+		from torimoApp import api_views, food_index
+
+		path = os.path.join(tempfile.mkdtemp(), 'food.pickle')
+		built = api_views.build_food_snapshot(path)
+		sources = api_views._dataset_sources()
+		loaded = food_index.load_snapshot(path, sources)
+		self.assertIsNotNone(loaded)
+		self.assertEqual(loaded.version, built.version)
+		self.assertEqual(loaded.table.names, built.table.names)
+		self.assertEqual(loaded.index.exact('ご飯'), built.index.exact('ご飯'))
+
+		changed = [(p, (m or 0) + 1, size) for p, m, size in sources]
+		self.assertIsNone(food_index.load_snapshot(path, changed))
+
+
+class FoodDataReadinessTests(TestCase):
+	def test_ready_endpoint_reports_loaded_indexes(self):
+		from unittest import mock
+		from torimoApp import api_views
+
+		with mock.patch.object(api_views, 'FOOD_DATA', None):
+			res = self.client.get('/api/health/ready/')
+			self.assertEqual(res.status_code, 503)
+			self.assertFalse(res.json()['ready'])
+
+		data = api_views.warm_up_food_data()
+		self.assertIsNotNone(data)
+		res = self.client.get('/api/health/ready/')
+		self.assertEqual(res.status_code, 200)
+		body = res.json()
+		self.assertTrue(body['ready'])
+		self.assertEqual(body['dataset_version'], data.version)
+		self.assertEqual(body['foods'], len(data.table))
+
+	def test_ready_endpoint_reports_token_cache_counters(self):
+		from unittest import mock
+		from torimo.middleware import supabase_auth
+
+		validator = supabase_auth.SupabaseTokenValidator()
+		validator._cache.set('token', {'id': 'u1'}, expires_at=None)
+		validator._cache.get('token')
+		validator._cache.get('other')
+		with mock.patch.object(supabase_auth, '_validator', validator):
+			stats = self.client.get('/api/health/ready/').json()['auth_token_cache']
+		self.assertEqual((stats['hits'], stats['misses'], stats['evictions']), (1, 1, 0))
+		self.assertEqual(stats['coalesced'], 0)
+
+
+class FoodDataReloadTests(TestCase):
+	def test_changed_sources_swap_in_a_new_dataset(self):
+		from unittest import mock
+		from torimoApp import api_views
+
+		original = api_views.get_food_data()
+		changed = [(p, (m or 0) + 1, size) for p, m, size in original.sources]
+		try:
+			with mock.patch.object(api_views, 'FOOD_SNAPSHOT_PATH', ''):
+				self.assertIsNone(api_views.reload_food_data(list(original.sources)))
+				self.assertIs(api_views.get_food_data(), original)
+
+				with mock.patch.object(api_views, '_dataset_sources', return_value=changed):
+					reloaded = api_views.reload_food_data()
+			self.assertIsNotNone(reloaded)
+			self.assertIsNot(reloaded, original)
+			# Same content under new mtimes: the version (and so every ETag) is unchanged.
+			self.assertEqual(reloaded.version, original.version)
+			self.assertIs(api_views.FOOD_DATA, reloaded)
+			self.assertIs(api_views.CSV_INDEX, reloaded.index)
+			# The old object is left intact for requests still holding it.
+			self.assertEqual(original.index.exact('ご飯'), reloaded.index.exact('ご飯'))
+		finally:
+			api_views._install_food_data(original)
+
+	def test_version_follows_content_not_file_fingerprints(self):
+		from unittest import mock
+		from torimoApp import api_views
+
+		sources = api_views._dataset_sources()
+		built = api_views._build_food_data(sources)
+		moved = [('/elsewhere' + p, 1, size) for p, m, size in sources]
+		self.assertEqual(api_views._build_food_data(moved).version, built.version)
+
+		rows = api_views._read_csv_rows() + [{'name': 'テスト食品', 'base': {'per': '100g', 'calories': 1.0}}]
+		with mock.patch.object(api_views, '_read_csv_rows', return_value=rows):
+			self.assertNotEqual(api_views._build_food_data(sources).version, built.version)
+
+	def test_poll_starts_background_reload_only_on_change(self):
+		from unittest import mock
+		from torimoApp import api_views
+
+		data = api_views.get_food_data()
+		changed = [(p, (m or 0) + 1, size) for p, m, size in data.sources]
+		with mock.patch.object(api_views, '_food_data_checked_at', 0.0), \
+				mock.patch.object(api_views.threading, 'Thread') as thread:
+			with mock.patch.object(api_views, '_dataset_sources', return_value=list(data.sources)):
+				api_views._maybe_reload_food_data(data)
+			thread.assert_not_called()
+			api_views._food_data_checked_at = 0.0
+			with mock.patch.object(api_views, '_dataset_sources', return_value=changed):
+				api_views._maybe_reload_food_data(data)
+			thread.assert_called_once()
+			self.assertEqual(thread.call_args.kwargs['kwargs'], {'sources': changed})
+
+
+class AutocompleteIndexTests(TestCase):
+	def test_ranked_search_matches_linear_scan_order(self):
+		from torimoApp.food_index import SubstringIndex
+
+		keys = ['ごはん', 'ごはんだいもり', 'たまご', 'ごま', 'ゆでたまご', 'ごはん']
+		index = SubstringIndex(keys)
+		# exact (both duplicates) -> prefix by length -> mid-word by offset
+		self.assertEqual(index.ranked('ご'), [3, 0, 5, 1, 2, 4])
+		self.assertEqual(index.ranked('ご', 2), [3, 0])
+		self.assertEqual(index.ranked('ごはん'), [0, 5, 1])
+		self.assertEqual(index.containing('たま'), [2, 4])
+		self.assertEqual(index.containing('x'), [])
+
+	def test_close_matches_identical_to_difflib(self):
+		import difflib
+		from torimoApp.food_index import CloseMatchIndex
+
+		keys = ['ごはん', 'ごはん', 'ごまあえ', 'たまごやき', 'ゆでたまご', 'とりむね', 'とりもも', '']
+		index = CloseMatchIndex(keys)
+		for word in ['ごはむ', 'たまごやぎ', 'とりむ', 'ん', 'xyz', '']:
+			for n, cutoff in [(3, 0.6), (8, 0.6), (2, 0.3), (3, 0.0)]:
+				self.assertEqual(
+					index.close_matches(word, n=n, cutoff=cutoff),
+					difflib.get_close_matches(word, keys, n=n, cutoff=cutoff),
+				)
+
+	def test_search_and_suggest_endpoints(self):
+		res = self.client.get('/api/nutrition/search/', {'q': 'ご飯', 'limit': 3})
+		self.assertEqual(res.status_code, 200)
+		self.assertLessEqual(len(res.json()), 3)
+		self.assertTrue(all('ご飯' in r['name'] or 'ごはん' in r['name'] for r in res.json()))
+		res = self.client.get('/api/nutrition/suggest/', {'q': 'ご飯', 'limit': 5})
+		self.assertEqual(res.status_code, 200)
+		self.assertLessEqual(len(res.json()['suggestions']), 5)
+		self.assertTrue(res.json()['suggestions'])
+
+
+class SearchHttpCachingTests(TestCase):
+	def test_etag_round_trip_and_dataset_version(self):
+		from unittest import mock
+		from torimoApp import api_views
+
+		for url in ('/api/nutrition/search/', '/api/nutrition/suggest/'):
+			res = self.client.get(url, {'q': 'ご飯'})
+			self.assertEqual(res.status_code, 200)
+			etag = res['ETag']
+			self.assertTrue(etag.startswith('"') and etag.endswith('"'))
+			self.assertIn('max-age=', res['Cache-Control'])
+
+			res = self.client.get(url, {'q': 'ご飯'}, HTTP_IF_NONE_MATCH=etag)
+			self.assertEqual(res.status_code, 304)
+			self.assertEqual(res['ETag'], etag)
+			self.assertEqual(res.content, b'')
+			res = self.client.get(url, {'q': 'ご飯'}, HTTP_IF_NONE_MATCH=f'"other", W/{etag}')
+			self.assertEqual(res.status_code, 304)
+
+			other = self.client.get(url, {'q': '卵'})
+			self.assertNotEqual(other['ETag'], etag)
+
+			data = api_views.get_food_data()
+			with mock.patch.object(data, 'version', 'changed'):
+				res = self.client.get(url, {'q': 'ご飯'}, HTTP_IF_NONE_MATCH=etag)
+			self.assertEqual(res.status_code, 200)
+			self.assertNotEqual(res['ETag'], etag)
+
+
+class AnalyzeResultCacheTests(TestCase):
+	def setUp(self):
+		from django.core.cache import caches
+		caches['nutrition'].clear()
+
+	def _post(self, text):
+		return self.client.post('/api/nutrition/analyze/', data=json.dumps({'text': text}), content_type='application/json')
+
+	def test_same_items_are_served_from_cache(self):
+		from unittest import mock
+		from torimoApp import api_views
+
+		first = self._post('ご飯150g、卵2個')
+		self.assertEqual(first.status_code, 200)
+		before = api_views.analyze_cache_stats()
+		with mock.patch.object(api_views, 'resolve_foods_batch', side_effect=AssertionError('not cached')):
+			# Different separators/spacing parse to the same item list.
+			second = self._post('ご飯 150g, 卵 2個')
+		self.assertEqual(second.status_code, 200)
+		self.assertEqual(second.json(), first.json())
+		after = api_views.analyze_cache_stats()
+		self.assertEqual(after['hits'], before['hits'] + 1)
+		self.assertGreaterEqual(after['size'], 1)
+
+	def test_key_depends_on_quantity_and_dataset_version(self):
+		from torimoApp import api_views
+
+		foods = [{'name': 'ご飯', 'quantity': 150, 'unit': 'g'}]
+		key = api_views._analyze_cache_key(foods, 'v1')
+		self.assertEqual(key, api_views._analyze_cache_key([{'name': ' ご飯 ', 'quantity': '150', 'unit': 'g'}], 'v1'))
+		self.assertNotEqual(key, api_views._analyze_cache_key([{'name': 'ご飯', 'quantity': 200, 'unit': 'g'}], 'v1'))
+		self.assertNotEqual(key, api_views._analyze_cache_key(foods, 'v2'))
+
+	def test_locmem_backend_counts_evictions(self):
+		from torimo.cache_backends import StatsLocMemCache
+
+		cache = StatsLocMemCache('stats-test', {'OPTIONS': {'MAX_ENTRIES': 4, 'CULL_FREQUENCY': 2}})
+		cache.clear()
+		for i in range(10):
+			cache.set(f'k{i}', i)
+		stats = cache.stats()
+		self.assertLessEqual(stats['size'], 4)
+		self.assertGreater(stats['evictions'], 0)
+
+
+class NormalizationPipelineTests(TestCase):
+	"""The compiled/memoized normalizers must match the former implementations exactly."""
+
+	@staticmethod
+	def _legacy_normalize(name):
+		import re
+		import unicodedata
+		if not name:
+			return ''
+		s = unicodedata.normalize('NFKC', name.strip().lower())
+		return re.sub(r'[\s　]+', '', s)
+
+	@staticmethod
+	def _legacy_canonicalize(name):
+		import re
+		import unicodedata
+		if not name:
+			return ''
+		s = unicodedata.normalize('NFKC', name.strip())
+		s = re.sub(r'[\s　・._\-—－‐]+', '', s)
+		repl = {
+			'ごはん': 'ご飯', '白ごはん': 'ご飯', '白飯': 'ご飯', 'ライス': 'ご飯', '飯': 'ご飯',
+			'焼鳥': '焼き鳥', 'やきとり': '焼き鳥', 'やき鳥': '焼き鳥', '焼きとり': '焼き鳥',
+			'チキンステーキ': '鶏肉ステーキ', 'みそスープ': 'みそ汁', '味噌スープ': 'みそ汁',
+			'鶏胸': '鶏胸肉', '鶏むね肉': '鶏胸肉', '胸肉': '鶏胸肉',
+			'鶏もも': '鶏もも肉', 'もも肉': '鶏もも肉', 'ささみ': '鶏ささみ',
+			'挽肉': 'ひき肉', 'ﾐﾝﾁ': 'ミンチ', 'ミンチ': 'ひき肉',
+		}
+		for k, v in repl.items():
+			if k in s:
+				s = s.replace(k, v)
+		return s
+
+	def _legacy_alias_key(self, s):
+		import re
+		import unicodedata
+		base = unicodedata.normalize('NFKC', self._legacy_canonicalize(s))
+		return re.sub(r'[\s　・_\-—－‐]+', '', base).lower()
+
+	def test_identical_output(self):
+		from torimoApp import api_views
+
+		data = api_views.get_food_data()
+		inputs = list(data.table.names) + list(data.alias_map)
+		inputs += [
+			'', '  ご飯  ', 'ごはん', '白ごはん', '白飯', 'ﾁｷﾝｽﾃｰｷ', 'ﾐﾝﾁ', '豚 ミンチ', '鶏むね肉',
+			'Ｃｈｉｃｋｅｎ　Ｓｔｅａｋ', 'miso-soup', 'か ゛', 'ぱ', 'やき・とり',
+		]
+		for name in inputs:
+			self.assertEqual(api_views.normalize_food_name(name), self._legacy_normalize(name), name)
+			self.assertEqual(api_views.canonicalize_name(name), self._legacy_canonicalize(name), name)
+			self.assertEqual(api_views._norm_alias_key(name), self._legacy_alias_key(name), name)
+
+
+class MextCsvParserTests(TestCase):
+	def test_streams_mext_layout(self):
+		import os
+		import tempfile
+		from pathlib import Path
+		from unittest import mock
+		from torimoApp import api_views
+
+		lines = [
+			'日本食品標準成分表2020年版（八訂）',
+			'食品群,食品番号,索引番号,食品名,廃棄率,エネルギー,,たんぱく質,脂質,炭水化物',
+			'成分識別子,REFUSE,ENERC,ENERC_KCAL,PROT-,FAT-,CHOAVL,CHOCDF-,WATER,ASH',
+			'01,01088,1,こめ ［水稲めし］ 精白米 うるち米,0,663,156,2.5,0.3,(34.6),37.1,60.0,0.1',
+			'04,04032,2,"だいず ［豆腐・油揚げ類］ 木綿豆腐, 凝固剤：塩化マグネシウム",0,303,73,(6.7),4.5,0.8*,Tr,85.9,0.7',
+			'12,12004,3,鶏卵 全卵 生,15,594,142,-,10.2,(0.4),(Tr),75.0,1.0',
+			'注）成分値は可食部100g当たり',
+		]
+		path = Path(tempfile.mkdtemp()) / 'mext.csv'
+		path.write_text('\n'.join(lines) + '\n', encoding='cp932')
+		with mock.patch.dict(os.environ, {'FOOD_CSV_PATH': str(path)}):
+			rows = {r['name']: r['base'] for r in api_views._read_csv_rows()}
+
+		rice = rows['こめ ［水稲めし］ 精白米 うるち米']
+		self.assertEqual(
+			{k: rice[k] for k in ('per', 'calories', 'protein', 'fat', 'carbs', 'source')},
+			{'per': '100g', 'calories': 156.0, 'protein': 2.5, 'fat': 0.3, 'carbs': 37.1, 'source': 'jp-standard'},
+		)
+		# quoted comma in the name, "(6.7)" estimated values, "*" marks, Tr -> 0
+		tofu = rows['だいず ［豆腐・油揚げ類］ 木綿豆腐, 凝固剤：塩化マグネシウム']
+		self.assertEqual((tofu['protein'], tofu['fat'], tofu['carbs']), (6.7, 4.5, 0.8))
+		egg = rows['鶏卵 全卵 生']
+		self.assertEqual((egg['calories'], egg['protein'], egg['carbs']), (142.0, 0.0, 0.4))
+		self.assertNotIn('注）成分値は可食部100g当たり', rows)
+
+
+class NutrientTableTests(TestCase):
+	def test_round_trips_rows_and_builds_records(self):
+		from torimoApp.nutrients import FoodRecord, NutrientTable
+
+		rows = [
+			{'name': 'ご飯', 'base': {'per': '100g', 'calories': 156.0, 'protein': 2.5, 'fat': 0.3, 'carbs': 37.1, 'source': 'custom-csv'}},
+			{'name': '卵', 'base': {
+				'per': '100g', 'calories': 142.0, 'protein': 12.2, 'fat': 10.2, 'carbs': 0.4, 'source': 'custom-csv',
+				'per_unit': {'grams': 50.0, 'label': '個', 'nutrients': {'calories': 71.0, 'protein': 6.1, 'fat': 5.1, 'carbs': 0.2}},
+			}},
+			{'name': '牛乳', 'base': {'per': '100ml', 'calories': 61.0, 'protein': 3.3, 'fat': 3.8, 'carbs': 4.8, 'source': 'fruits-csv'}},
+		]
+		table = NutrientTable(rows)
+		self.assertEqual(len(table), 3)
+		self.assertEqual(table.rows(), rows)
+
+		egg = table.record(1, source='csv')
+		self.assertIsInstance(egg, FoodRecord)
+		self.assertEqual((egg.food_id, egg.source, egg.per_unit['label']), (1, 'csv', '個'))
+		self.assertIsNone(table.record(0).per_unit)
+		self.assertEqual(table.record(2).per, '100ml')
+		with self.assertRaises(AttributeError):
+			egg.extra = 1  # __slots__
+
+		fdc = FoodRecord.from_base({'per': '100g', 'calories': 52.0, 'protein': 0.3, 'fat': 0.2, 'carbs': 14.0}, 'fdc')
+		self.assertEqual((fdc.food_id, fdc.source, fdc.per_unit), (None, 'fdc', None))
+		self.assertEqual(fdc.as_base()['source'], 'fdc')
+
+	def test_dataset_table_matches_parsed_rows(self):
+		from torimoApp import api_views
+
+		rows = api_views._read_csv_rows()
+		self.assertEqual(api_views.get_food_data().table.rows(), rows)
+
+
+class MacroScalingTests(TestCase):
+	def test_batch_scaling_matches_per_item_rounding(self):
+		from torimoApp import api_views
+		from torimoApp.nutrients import FoodRecord, macro_totals, scale_macros
+
+		egg = FoodRecord.from_base({
+			'per': '100g', 'calories': 142.0, 'protein': 12.2, 'fat': 10.2, 'carbs': 0.4,
+			'per_unit': {'grams': 50.0, 'label': '個', 'nutrients': {'calories': 71.0, 'protein': 6.1}},
+		}, 'csv')
+		rice = FoodRecord.from_base({'per': '100g', 'calories': 156.0, 'protein': 2.5, 'fat': 0.3, 'carbs': 37.1}, 'csv')
+		foods = [
+			{'name': '卵', 'quantity': 3},
+			{'name': 'ご飯', 'quantity': 150, 'unit': 'g'},
+			{'name': '謎の食べ物'},
+		]
+		resolved = {'卵': ('卵', egg), 'ご飯': ('ご飯', rice), '謎の食べ物': ('謎の食べ物', None)}
+		items, totals = api_views.analyze_items(foods, resolved)
+
+		# Missing per-unit macros fall back to per-100 g scaled by the unit's grams.
+		expected_egg = (round(71.0 * 3, 1), round(6.1 * 3, 1), round(10.2 * 0.5 * 3, 1), round(0.4 * 0.5 * 3, 1))
+		expected_rice = tuple(round(v * 1.5, 1) for v in (156.0, 2.5, 0.3, 37.1))
+		self.assertEqual(items[0]['per'], '3個')
+		self.assertEqual(tuple(items[0][k] for k in ('calories', 'protein', 'fat', 'carbs')), expected_egg)
+		self.assertEqual((items[1]['per'], items[1]['grams']), ('150g', 150.0))
+		self.assertEqual(tuple(items[1][k] for k in ('calories', 'protein', 'fat', 'carbs')), expected_rice)
+		self.assertEqual((items[2]['found'], items[2]['suggestions'] is not None), (False, True))
+		self.assertEqual(totals, {
+			k: round(a + b, 1) for k, a, b in zip(('calories', 'protein', 'fat', 'carbs'), expected_egg, expected_rice)
+		})
+
+		rows = scale_macros([(0.1, 0.2, 0.3, 0.4)] * 3, [1.0, 1.0, 1.0])
+		self.assertEqual(macro_totals(rows), {'calories': 0.3, 'protein': 0.6, 'fat': 0.9, 'carbs': 1.2})
+
+
+class AsyncViewTests(TestCase):
+	def _request(self, method, path, data=None):
+		from django.test import AsyncRequestFactory
+
+		factory = AsyncRequestFactory()
+		if data is None:
+			request = getattr(factory, method)(path)
+		else:
+			request = getattr(factory, method)(path, data=json.dumps(data), content_type='application/json')
+		request.supabase_user_id = 'u1'
+		request.supabase_user = {'id': 'u1'}
+		request.supabase_token = 'tok'
+		return request
+
+	def _patched(self, **http):
+		from unittest import mock
+		from torimoApp import api_views
+
+		return mock.patch.multiple(
+			api_views, SUPABASE_REST_URL='https://example.supabase.co/rest/v1', SUPABASE_ANON_KEY='anon',
+		), mock.patch.multiple(api_views.supabase_http, **http)
+
+	async def test_proxy_list_uses_viewset_filters_and_async_client(self):
+		from unittest import mock
+		from torimoApp import async_views
+
+		aget = mock.AsyncMock(return_value=mock.Mock(status_code=200, json=lambda: [{'id': 1}]))
+		env, http = self._patched(aget=aget)
+		with env, http:
+			response = await async_views.meals.collection(self._request('get', '/api/meals/?date=2024-01-01'))
+		self.assertEqual(response.status_code, 200)
+		self.assertEqual(json.loads(response.content), [{'id': 1}])
+		url = aget.call_args.args[0]
+		self.assertEqual(url, 'https://example.supabase.co/rest/v1/meals')
+		self.assertEqual(aget.call_args.kwargs['params']['consumed_at'], 'eq.2024-01-01')
+		self.assertEqual(aget.call_args.kwargs['headers']['Authorization'], 'Bearer tok')
+
+	async def test_errors_match_the_sync_views(self):
+		from unittest import mock
+		from torimoApp import async_views
+
+		apost = mock.AsyncMock(side_effect=async_views.supabase_http.SupabaseHTTPError('down'))
+		env, http = self._patched(apost=apost)
+		with env, http:
+			missing_title = await async_views.notes_collection(self._request('post', '/api/notes/', {'body': 'x'}))
+			upstream_down = await async_views.notes_collection(self._request('post', '/api/notes/', {'title': 't'}))
+			not_allowed = await async_views.note_detail(self._request('get', '/api/notes/1/'), note_id='1')
+			invalid = await async_views.barcode_meal_create(self._request('post', '/api/meals/barcode/', {}))
+		self.assertEqual((missing_title.status_code, json.loads(missing_title.content)), (400, {'detail': 'title は必須です'}))
+		self.assertEqual((upstream_down.status_code, json.loads(upstream_down.content)), (502, {'detail': async_views.UPSTREAM_FAILED}))
+		self.assertEqual(not_allowed.status_code, 405)
+		self.assertEqual(invalid.status_code, 400)
+		self.assertIn('barcode', json.loads(invalid.content))
+
+	async def test_async_token_validation_is_single_flight(self):
+		import asyncio
+		from unittest import mock
+		from torimo.middleware import supabase_auth
+
+		async def fake_aget(url, **kwargs):
+			await asyncio.sleep(0.05)
+			return mock.Mock(status_code=200, json=lambda: {'id': 'u1'})
+
+		aget = mock.AsyncMock(side_effect=fake_aget)
+		validator = supabase_auth.SupabaseTokenValidator()
+		with mock.patch.multiple(
+			supabase_auth,
+			USERINFO_ENDPOINT='https://example.supabase.co/auth/v1/user',
+			SUPABASE_SERVICE_ROLE_KEY='service',
+			SUPABASE_JWT_SECRET=None,
+		), mock.patch.object(supabase_auth.supabase_http, 'aget', aget):
+			results = await asyncio.gather(*(validator.avalidate('tok') for _ in range(5)))
+		self.assertEqual(aget.await_count, 1)
+		self.assertEqual(results, [{'id': 'u1'}] * 5)
+		self.assertEqual(validator.coalesced, 4)
+
+
+class AssistantChatStreamTests(TestCase):
+	def _fake_model(self, chunks):
+		from unittest import mock
+
+		def generate_content(prompt, stream=False, **kwargs):
+			self.assertTrue(stream)
+			return iter([mock.Mock(text=c) for c in chunks])
+
+		async def generate_content_async(prompt, stream=False, **kwargs):
+			self.assertTrue(stream)
+
+			async def gen():
+				for c in chunks:
+					yield mock.Mock(text=c)
+
+			return gen()
+
+		return mock.Mock(generate_content=generate_content, generate_content_async=generate_content_async)
+
+	def _events(self, body: str) -> list:
+		events = []
+		for block in body.strip().split('\n\n'):
+			event, data = block.split('\n')
+			events.append((event.removeprefix('event: '), json.loads(data.removeprefix('data: '))))
+		return events
+
+	def test_stream_forwards_chunks_then_done(self):
+		from unittest import mock
+		from torimoApp import api_views
+
+		body = {'messages': [{'role': 'user', 'content': '朝食は？'}], 'profile': {'weight_kg': 60}, 'stream': True}
+		with mock.patch.object(api_views, '_gemini_configured', return_value=True), \
+				mock.patch.object(api_views, '_gemini_model', return_value=self._fake_model([' おにぎり', 'と', 'みそ汁'])):
+			response = Client().post(reverse('assistant-chat'), data=json.dumps(body), content_type='application/json')
+			content = b''.join(response.streaming_content).decode('utf-8')
+		self.assertEqual(response['Content-Type'], 'text/event-stream; charset=utf-8')
+		self.assertEqual(self._events(content), [
+			('delta', {'text': ' おにぎり'}),
+			('delta', {'text': 'と'}),
+			('delta', {'text': 'みそ汁'}),
+			('done', {'reply': 'おにぎりとみそ汁', 'profile_used': {'weight_kg': 60}}),
+		])
+
+	def test_rule_based_reply_is_not_streamed(self):
+		from unittest import mock
+		from torimoApp import api_views
+
+		body = {'messages': [{'role': 'user', 'content': 'hi'}], 'profile': {}, 'stream': True}
+		with mock.patch.object(api_views, '_gemini_configured', return_value=False):
+			response = Client().post(reverse('assistant-chat'), data=json.dumps(body), content_type='application/json')
+		self.assertEqual(response.status_code, 200)
+		self.assertTrue(response.json()['reply'].startswith('[ルールベース回答]'))
+
+	async def test_async_view_streams(self):
+		from unittest import mock
+		from django.test import AsyncRequestFactory
+		from torimoApp import api_views, async_views
+
+		request = AsyncRequestFactory().post('/api/assistant/chat/?stream=1', data=json.dumps({'messages': [{'content': 'q'}]}), content_type='application/json')
+		with mock.patch.object(api_views, '_gemini_configured', return_value=True), \
+				mock.patch.object(api_views, '_gemini_model', return_value=self._fake_model(['a', 'b'])):
+			response = await async_views.assistant_chat(request)
+			content = b''.join([chunk async for chunk in response.streaming_content]).decode('utf-8')
+		self.assertEqual([e for e, _ in self._events(content)], ['delta', 'delta', 'done'])
+		self.assertEqual(self._events(content)[-1][1]['reply'], 'ab')